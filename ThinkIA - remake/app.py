@@ -0,0 +1,192 @@
+import startup  # Primeiro import: marca o início da medição do tempo de abertura
+import customtkinter as ctk  # Importar ctk
+import importlib
+import os
+from collections import OrderedDict
+import db
+import log_acoes
+from worker import tarefas_longas, worker
+
+startup.marcar("imports")
+
+# Telas do menu lateral: (módulo, classe). O módulo de cada tela (e o que ele
+# importa) só é carregado na primeira visita; depois a tela é só escondida/reexibida
+TELAS = {
+    "dashboard": ("views.dashboard_view", "DashboardFrame"),
+    "clientes": ("views.clientes_view", "ClientesFrame"),
+    "produtos": ("views.produtos_view", "ProdutosFrame"),
+    "pedidos": ("views.pedidos_view", "PedidosFrame"),
+    "relatorios": ("views.relatorios_view", "RelatoriosFrame"),
+    "historico": ("views.historico_view", "HistoricoView"),
+    "ia": ("views.ia_view", "IAView"),
+}
+
+# Telas com listas grandes: só as MAX_TELAS_PESADAS usadas mais recentemente
+# ficam em memória; as demais são destruídas e reconstruídas ao voltar
+TELAS_PESADAS = {"clientes", "produtos", "pedidos", "relatorios"}
+MAX_TELAS_PESADAS = 3
+
+
+# Subclasse de ctk.CTk (o objeto principal da janela)
+class App(ctk.CTk):
+    def __init__(self):
+        super().__init__()
+        self.title("ThinkIA — Gestão de Clientes e Pedidos")
+        self.geometry("1000x650")
+        self.minsize(900, 550)
+
+        # --- Configurações Nativas do CustomTkinter ---
+        ctk.set_appearance_mode("Dark")  # Define o modo de aparência (Dark, Light, System)
+        ctk.set_default_color_theme("blue")  # Define o tema de cores
+        # -----------------------------------------------
+
+        os.makedirs("logs", exist_ok=True)
+        db.init_db()
+        startup.marcar("init_db")
+
+        # O menu bar Tkinter padrão é mais complexo de estilizar.
+        # Você pode usar ctk.CTkButton para um menu lateral, como na imagem,
+        # ou manter o menu superior padrão por enquanto, sabendo que ele
+        # terá o visual padrão do SO.
+
+        # Vamos simular o menu lateral visto na imagem (Image of ThinkIA Dashboard)
+        self.grid_columnconfigure(1, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        self.create_sidebar()
+
+        self.current_frame = None
+        self.frames: "OrderedDict[str, ctk.CTkFrame]" = OrderedDict()  # Do menos para o mais recente
+        self.show_dashboard()
+        startup.marcar("interface")
+
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        # Primeira pintura: a fila do Tk é processada antes dos callbacks de ocioso
+        self.after_idle(self._on_primeira_pintura)
+
+    def _on_primeira_pintura(self):
+        self.update_idletasks()
+        startup.primeira_pintura()
+
+    def on_close(self):
+        """Libera recursos (tarefas em segundo plano, conexões do banco e log de ações) antes de fechar a janela."""
+        worker.shutdown()
+        tarefas_longas.shutdown()
+        db.dump_query_stats()
+        db.close_connections()
+        log_acoes.escritor.close()  # Grava as ações ainda na fila
+        self.destroy()
+
+    # 🧭 Menu Lateral (Sidebar)
+    def create_sidebar(self):
+        self.sidebar_frame = ctk.CTkFrame(self, width=140, corner_radius=0)
+        self.sidebar_frame.grid(row=0, column=0, sticky="nswe")
+        self.sidebar_frame.grid_rowconfigure(7, weight=1)
+
+        ctk.CTkLabel(self.sidebar_frame, text="ThinkIA", font=ctk.CTkFont(size=20, weight="bold")).grid(row=0, column=0,
+                                                                                                        padx=20,
+                                                                                                        pady=(20, 10))
+
+        # --- Botões de Navegação ---
+
+        # Dashboard
+        self.dashboard_button = ctk.CTkButton(self.sidebar_frame, text="Dashboard", command=self.show_dashboard)
+        self.dashboard_button.grid(row=1, column=0, padx=10, pady=(10, 5), sticky="ew")
+
+        # Clientes
+        self.clientes_button = ctk.CTkButton(self.sidebar_frame, text="Clientes", command=self.show_clientes)
+        self.clientes_button.grid(row=2, column=0, padx=10, pady=5, sticky="ew")
+
+        # Produtos
+        self.produtos_button = ctk.CTkButton(self.sidebar_frame, text="Produtos", command=self.show_produtos)
+        self.produtos_button.grid(row=3, column=0, padx=10, pady=5, sticky="ew")
+
+        # Pedidos
+        self.pedidos_button = ctk.CTkButton(self.sidebar_frame, text="Pedidos", command=self.show_pedidos)
+        self.pedidos_button.grid(row=4, column=0, padx=10, pady=5, sticky="ew")
+
+        # Relatórios
+        self.relatorios_button = ctk.CTkButton(self.sidebar_frame, text="Relatórios", command=self.show_relatorios)
+        self.relatorios_button.grid(row=5, column=0, padx=10, pady=5, sticky="ew")
+
+        # Histórico/Log
+        self.historico_button = ctk.CTkButton(self.sidebar_frame, text="Histórico/Log", command=self.show_historico)
+        self.historico_button.grid(row=6, column=0, padx=10, pady=5, sticky="ew")
+
+        # Análise IA
+        self.ia_button = ctk.CTkButton(self.sidebar_frame, text="Análise IA", command=self.show_ia)
+        self.ia_button.grid(row=7, column=0, padx=10, pady=5, sticky="ew")
+
+    # 🧩 Navegação entre frames (na coluna 1)
+    def show_frame(self, nome: str):
+        """
+        Exibe a tela nome. Ela é construída só na primeira visita (ou depois de
+        descartada); nas seguintes é apenas reexibida e se atualiza sozinha
+        (on_show), recarregando só o que mudou enquanto estava oculta.
+        """
+        frame = self.frames.get(nome)
+        if frame is not None and frame is self.current_frame:
+            return
+
+        if self.current_frame is not None:
+            self.current_frame.grid_remove()
+            if hasattr(self.current_frame, "on_hide"):
+                self.current_frame.on_hide()
+
+        if frame is None:
+            frame = self._classe_tela(nome)(self)
+            self.frames[nome] = frame
+            frame.grid(row=0, column=1, sticky="nsew", padx=10, pady=10)
+        else:
+            frame.grid()  # Restaura as opções de grid guardadas pelo grid_remove
+            if hasattr(frame, "on_show"):
+                frame.on_show()
+
+        self.frames.move_to_end(nome)
+        self.current_frame = frame
+        self.evict_frames()
+
+    @staticmethod
+    def _classe_tela(nome: str):
+        modulo, classe = TELAS[nome]
+        return getattr(importlib.import_module(modulo), classe)
+
+    def evict_frames(self):
+        """
+        Destrói as telas pesadas menos usadas recentemente além de MAX_TELAS_PESADAS.
+        Uma tela com tarefa longa em curso (ex.: exportação) é mantida e a próxima
+        candidata é descartada no lugar; ela volta a ser candidata nas próximas trocas.
+        """
+        pesadas = [nome for nome in self.frames if nome in TELAS_PESADAS]
+        excesso = len(pesadas) - MAX_TELAS_PESADAS
+        for nome in pesadas:
+            if excesso <= 0:
+                break
+            frame = self.frames[nome]
+            if frame is self.current_frame or tarefas_longas.pending(frame):
+                continue
+            excesso -= 1
+            del self.frames[nome]
+            # Descarta consultas em segundo plano da tela descartada
+            worker.cancel_owner(frame)
+            frame.destroy()
+
+    def show_dashboard(self):
+        self.show_frame("dashboard")
+
+    def show_clientes(self):
+        self.show_frame("clientes")
+
+    def show_produtos(self):
+        self.show_frame("produtos")
+
+    def show_pedidos(self):
+        self.show_frame("pedidos")
+
+    def show_relatorios(self):
+        self.show_frame("relatorios")
+
+    def show_historico(self):
+        self.show_frame("historico")
+
+    def show_ia(self):
+        self.show_frame("ia")
\ No newline at end of file
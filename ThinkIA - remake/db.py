@@ -1,104 +1,486 @@
+import os
+import re
+import json
+import time
 import sqlite3
 import logging
+import threading
+from collections import OrderedDict
+from itertools import chain
 from contextlib import contextmanager
-from typing import Any, Iterable, Optional, List, Tuple
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, List, Tuple
+from models import Pedido
 
 DB_PATH = "app.db"
 
+# Ajustes aplicados uma única vez, quando a conexão é aberta
+PRAGMAS_CONEXAO = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -8000",  # ~8 MB de cache de páginas
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA foreign_keys = ON",
+)
+
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
 
+# --------------------------
+# POOL DE CONEXÕES (UMA POR THREAD)
+# --------------------------
+
+class ConnectionPool:
+    """
+    Mantém uma conexão SQLite de longa duração por thread e por arquivo de banco.
+    As conexões são criadas sob demanda, ajustadas uma vez com PRAGMAS_CONEXAO
+    e reutilizadas em todas as chamadas seguintes da mesma thread.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conexoes: Dict[Tuple[int, str], sqlite3.Connection] = {}
+        self._criadas = 0
+        self._reutilizadas = 0
+
+    def acquire(self, db_path: str) -> sqlite3.Connection:
+        """Retorna a conexão da thread atual para db_path, criando-a se necessário."""
+        conexoes = getattr(self._local, "conexoes", None)
+        if conexoes is None:
+            conexoes = self._local.conexoes = {}
+
+        conn = conexoes.get(db_path)
+        if conn is not None:
+            with self._lock:
+                self._reutilizadas += 1
+            return conn
+
+        conn = self._connect(db_path)
+        conexoes[db_path] = conn
+        with self._lock:
+            self._descartar_threads_mortas()
+            self._conexoes[(threading.get_ident(), db_path)] = conn
+            self._criadas += 1
+        return conn
+
+    def _connect(self, db_path: str) -> sqlite3.Connection:
+        # isolation_level=None para gerenciar o commit manualmente.
+        # check_same_thread=False apenas para permitir o close_all no encerramento;
+        # cada conexão continua sendo usada somente pela thread que a criou.
+        conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        # Permite acessar colunas por nome (dicionário)
+        conn.row_factory = sqlite3.Row
+        for pragma in PRAGMAS_CONEXAO:
+            conn.execute(pragma)
+        logger.info("Nova conexão aberta para %s (thread %s)", db_path, threading.current_thread().name)
+        return conn
+
+    def _descartar_threads_mortas(self) -> None:
+        """Fecha conexões de threads que já terminaram. Deve ser chamado com o lock."""
+        vivas = {t.ident for t in threading.enumerate()}
+        for chave in [k for k in self._conexoes if k[0] not in vivas]:
+            try:
+                self._conexoes.pop(chave).close()
+            except sqlite3.Error:
+                pass
+
+    def close_all(self) -> None:
+        """Fecha todas as conexões abertas (encerramento da aplicação)."""
+        with self._lock:
+            conexoes = list(self._conexoes.values())
+            self._conexoes.clear()
+        for conn in conexoes:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+    def stats(self) -> Dict[str, int]:
+        """Retorna quantas conexões estão abertas e quantas vezes foram reutilizadas."""
+        with self._lock:
+            return {
+                "conexoes_abertas": len(self._conexoes),
+                "conexoes_criadas": self._criadas,
+                "reutilizacoes": self._reutilizadas,
+            }
+
+
+pool = ConnectionPool()
+
+
 @contextmanager
 def get_connection(db_path: str = DB_PATH):
-    """Context Manager para gerenciar a conexão com o banco de dados."""
-    conn = None
+    """
+    Context Manager que entrega a conexão persistente da thread atual. Não
+    desfaz nada em caso de erro: a transação aberta pertence a transaction()
+    ou read_transaction(), que decidem entre ROLLBACK e ROLLBACK TO (um erro
+    em uma unidade aninhada não pode derrubar a transação externa).
+    """
+    conn = pool.acquire(db_path)
     try:
-        # isolation_level=None para gerenciar o commit manualmente
-        conn = sqlite3.connect(db_path, isolation_level=None)
-        # Permite acessar colunas por nome (dicionário)
-        conn.row_factory = sqlite3.Row
         yield conn
     except sqlite3.Error as e:
         logger.error("Erro na conexão com o banco de dados: %s", e)
-        if conn:
-            conn.rollback()
         raise
-    finally:
-        if conn:
-            conn.close()
+
+
+def get_pool_stats() -> Dict[str, int]:
+    """Estatísticas do pool de conexões (abertas, criadas e reutilizações)."""
+    return pool.stats()
+
+
+def close_connections() -> None:
+    """Fecha todas as conexões do pool. Chamar ao encerrar a aplicação."""
+    pool.close_all()
+
+
+# --------------------------
+# MIGRAÇÕES DE ESQUEMA (PRAGMA user_version)
+# --------------------------
+
+# Cada migração é (versão, descrição, script). São aplicadas em ordem, uma única
+# vez, e a versão aplicada fica gravada em PRAGMA user_version. Nunca altere uma
+# migração já publicada: acrescente uma nova no final da lista.
+MIGRACOES: List[Tuple[int, str, str]] = [
+    (1, "Tabelas base", """
+        CREATE TABLE IF NOT EXISTS clientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            email TEXT,
+            telefone TEXT
+        );
+
+        CREATE TABLE IF NOT EXISTS produtos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            preco_unit REAL NOT NULL DEFAULT 0
+        );
+
+        CREATE TABLE IF NOT EXISTS pedidos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            total REAL NOT NULL DEFAULT 0,
+            FOREIGN KEY (cliente_id) REFERENCES clientes(id) ON DELETE CASCADE
+        );
+
+        CREATE TABLE IF NOT EXISTS itens_pedido (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pedido_id INTEGER NOT NULL,
+            produto TEXT NOT NULL,
+            quantidade INTEGER NOT NULL,
+            preco_unit REAL NOT NULL,
+            FOREIGN KEY (pedido_id) REFERENCES pedidos(id) ON DELETE CASCADE
+        );
+    """),
+    (2, "Índices para filtros de relatório, joins e listagens", """
+        -- Filtro por período (query_relatorio_pedidos) e ORDER BY p.data
+        CREATE INDEX IF NOT EXISTS idx_pedidos_data ON pedidos (data);
+        -- Join/filtro por cliente e filtro por cliente + período
+        CREATE INDEX IF NOT EXISTS idx_pedidos_cliente_data ON pedidos (cliente_id, data);
+        -- Busca dos itens de um pedido e ON DELETE CASCADE
+        CREATE INDEX IF NOT EXISTS idx_itens_pedido_pedido ON itens_pedido (pedido_id);
+        -- Índice de cobertura para o GROUP BY produto do dashboard
+        CREATE INDEX IF NOT EXISTS idx_itens_pedido_produto ON itens_pedido (produto, quantidade);
+        -- ORDER BY nome nas listagens e comboboxes
+        CREATE INDEX IF NOT EXISTS idx_clientes_nome ON clientes (nome);
+        CREATE INDEX IF NOT EXISTS idx_produtos_nome ON produtos (nome);
+    """),
+    (3, "Tabelas de resumo do dashboard mantidas por triggers", """
+        CREATE TABLE resumo_global (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total_clientes INTEGER NOT NULL DEFAULT 0,
+            total_pedidos INTEGER NOT NULL DEFAULT 0,
+            faturamento_total REAL NOT NULL DEFAULT 0
+        );
+        INSERT INTO resumo_global (id) VALUES (1);
+
+        CREATE TABLE resumo_produtos (
+            produto TEXT PRIMARY KEY,
+            quantidade INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX idx_resumo_produtos_quantidade ON resumo_produtos (quantidade);
+
+        CREATE TABLE resumo_clientes (
+            cliente_id INTEGER PRIMARY KEY,
+            total_gasto REAL NOT NULL DEFAULT 0
+        );
+        CREATE INDEX idx_resumo_clientes_total ON resumo_clientes (total_gasto);
+
+        CREATE TABLE resumo_diario (
+            data TEXT PRIMARY KEY,
+            pedidos INTEGER NOT NULL DEFAULT 0,
+            faturamento REAL NOT NULL DEFAULT 0
+        );
+
+        -- clientes
+        CREATE TRIGGER trg_clientes_ai AFTER INSERT ON clientes BEGIN
+            UPDATE resumo_global SET total_clientes = total_clientes + 1 WHERE id = 1;
+        END;
+        CREATE TRIGGER trg_clientes_ad AFTER DELETE ON clientes BEGIN
+            UPDATE resumo_global SET total_clientes = total_clientes - 1 WHERE id = 1;
+            DELETE FROM resumo_clientes WHERE cliente_id = OLD.id;
+        END;
+
+        -- pedidos
+        CREATE TRIGGER trg_pedidos_ai AFTER INSERT ON pedidos BEGIN
+            UPDATE resumo_global
+               SET total_pedidos = total_pedidos + 1, faturamento_total = faturamento_total + NEW.total
+             WHERE id = 1;
+            INSERT INTO resumo_clientes (cliente_id, total_gasto) VALUES (NEW.cliente_id, NEW.total)
+                ON CONFLICT (cliente_id) DO UPDATE SET total_gasto = total_gasto + excluded.total_gasto;
+            INSERT INTO resumo_diario (data, pedidos, faturamento) VALUES (NEW.data, 1, NEW.total)
+                ON CONFLICT (data) DO UPDATE SET pedidos = pedidos + 1, faturamento = faturamento + excluded.faturamento;
+        END;
+        CREATE TRIGGER trg_pedidos_ad AFTER DELETE ON pedidos BEGIN
+            UPDATE resumo_global
+               SET total_pedidos = total_pedidos - 1, faturamento_total = faturamento_total - OLD.total
+             WHERE id = 1;
+            UPDATE resumo_clientes SET total_gasto = total_gasto - OLD.total WHERE cliente_id = OLD.cliente_id;
+            UPDATE resumo_diario SET pedidos = pedidos - 1, faturamento = faturamento - OLD.total WHERE data = OLD.data;
+            DELETE FROM resumo_diario WHERE data = OLD.data AND pedidos <= 0;
+        END;
+        CREATE TRIGGER trg_pedidos_au AFTER UPDATE OF cliente_id, data, total ON pedidos BEGIN
+            UPDATE resumo_global SET faturamento_total = faturamento_total - OLD.total + NEW.total WHERE id = 1;
+            UPDATE resumo_clientes SET total_gasto = total_gasto - OLD.total WHERE cliente_id = OLD.cliente_id;
+            INSERT INTO resumo_clientes (cliente_id, total_gasto) VALUES (NEW.cliente_id, NEW.total)
+                ON CONFLICT (cliente_id) DO UPDATE SET total_gasto = total_gasto + excluded.total_gasto;
+            UPDATE resumo_diario SET pedidos = pedidos - 1, faturamento = faturamento - OLD.total WHERE data = OLD.data;
+            DELETE FROM resumo_diario WHERE data = OLD.data AND pedidos <= 0;
+            INSERT INTO resumo_diario (data, pedidos, faturamento) VALUES (NEW.data, 1, NEW.total)
+                ON CONFLICT (data) DO UPDATE SET pedidos = pedidos + 1, faturamento = faturamento + excluded.faturamento;
+        END;
+
+        -- itens_pedido
+        CREATE TRIGGER trg_itens_pedido_ai AFTER INSERT ON itens_pedido BEGIN
+            INSERT INTO resumo_produtos (produto, quantidade) VALUES (NEW.produto, NEW.quantidade)
+                ON CONFLICT (produto) DO UPDATE SET quantidade = quantidade + excluded.quantidade;
+        END;
+        CREATE TRIGGER trg_itens_pedido_ad AFTER DELETE ON itens_pedido BEGIN
+            UPDATE resumo_produtos SET quantidade = quantidade - OLD.quantidade WHERE produto = OLD.produto;
+        END;
+        CREATE TRIGGER trg_itens_pedido_au AFTER UPDATE OF produto, quantidade ON itens_pedido BEGIN
+            UPDATE resumo_produtos SET quantidade = quantidade - OLD.quantidade WHERE produto = OLD.produto;
+            INSERT INTO resumo_produtos (produto, quantidade) VALUES (NEW.produto, NEW.quantidade)
+                ON CONFLICT (produto) DO UPDATE SET quantidade = quantidade + excluded.quantidade;
+        END;
+
+        -- Carga inicial a partir dos dados existentes
+        UPDATE resumo_global SET
+            total_clientes = (SELECT COUNT(*) FROM clientes),
+            total_pedidos = (SELECT COUNT(*) FROM pedidos),
+            faturamento_total = (SELECT COALESCE(SUM(total), 0) FROM pedidos)
+        WHERE id = 1;
+        INSERT INTO resumo_produtos (produto, quantidade)
+            SELECT produto, SUM(quantidade) FROM itens_pedido GROUP BY produto;
+        INSERT INTO resumo_clientes (cliente_id, total_gasto)
+            SELECT cliente_id, SUM(total) FROM pedidos GROUP BY cliente_id;
+        INSERT INTO resumo_diario (data, pedidos, faturamento)
+            SELECT data, COUNT(*), SUM(total) FROM pedidos GROUP BY data;
+    """),
+    (4, "itens_pedido referencia produtos por id", """
+        -- O nome em itens_pedido.produto continua como registro histórico do item
+        ALTER TABLE itens_pedido ADD COLUMN produto_id INTEGER REFERENCES produtos (id) ON DELETE SET NULL;
+        UPDATE itens_pedido
+           SET produto_id = (SELECT MIN(p.id) FROM produtos p WHERE p.nome = itens_pedido.produto);
+        CREATE INDEX idx_itens_pedido_produto_id ON itens_pedido (produto_id, quantidade);
+        DROP INDEX IF EXISTS idx_itens_pedido_produto;
+
+        -- resumo_produtos passa a ser chaveado pelo id do produto
+        DROP TRIGGER trg_itens_pedido_ai;
+        DROP TRIGGER trg_itens_pedido_ad;
+        DROP TRIGGER trg_itens_pedido_au;
+        DROP TABLE resumo_produtos;
+
+        CREATE TABLE resumo_produtos (
+            produto_id INTEGER PRIMARY KEY,
+            quantidade INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX idx_resumo_produtos_quantidade ON resumo_produtos (quantidade);
+
+        CREATE TRIGGER trg_itens_pedido_ai AFTER INSERT ON itens_pedido
+        WHEN NEW.produto_id IS NOT NULL BEGIN
+            INSERT INTO resumo_produtos (produto_id, quantidade) VALUES (NEW.produto_id, NEW.quantidade)
+                ON CONFLICT (produto_id) DO UPDATE SET quantidade = quantidade + excluded.quantidade;
+        END;
+        CREATE TRIGGER trg_itens_pedido_ad AFTER DELETE ON itens_pedido
+        WHEN OLD.produto_id IS NOT NULL BEGIN
+            UPDATE resumo_produtos SET quantidade = quantidade - OLD.quantidade WHERE produto_id = OLD.produto_id;
+        END;
+        CREATE TRIGGER trg_itens_pedido_au AFTER UPDATE OF produto_id, quantidade ON itens_pedido BEGIN
+            UPDATE resumo_produtos SET quantidade = quantidade - OLD.quantidade WHERE produto_id = OLD.produto_id;
+            INSERT INTO resumo_produtos (produto_id, quantidade)
+                SELECT NEW.produto_id, NEW.quantidade WHERE NEW.produto_id IS NOT NULL
+                ON CONFLICT (produto_id) DO UPDATE SET quantidade = quantidade + excluded.quantidade;
+        END;
+        CREATE TRIGGER trg_produtos_ad AFTER DELETE ON produtos BEGIN
+            DELETE FROM resumo_produtos WHERE produto_id = OLD.id;
+        END;
+
+        INSERT INTO resumo_produtos (produto_id, quantidade)
+            SELECT produto_id, SUM(quantidade) FROM itens_pedido WHERE produto_id IS NOT NULL GROUP BY produto_id;
+    """),
+    (5, "cache de respostas da IA", """
+        -- Chave: hash do modelo e do prompt (que contém os pedidos analisados)
+        CREATE TABLE ia_cache (
+            chave TEXT PRIMARY KEY,
+            modelo TEXT NOT NULL,
+            resposta TEXT NOT NULL,
+            criado_em REAL NOT NULL,
+            usado_em REAL NOT NULL
+        );
+        CREATE INDEX idx_ia_cache_usado_em ON ia_cache (usado_em);
+    """),
+]
+
+# Tabelas mantidas pelos triggers da migração 3 e as tabelas de origem de cada uma
+TABELAS_RESUMO: Dict[str, Tuple[str, ...]] = {
+    "resumo_global": ("clientes", "pedidos"),
+    "resumo_produtos": ("itens_pedido", "produtos"),
+    "resumo_clientes": ("pedidos",),
+    "resumo_diario": ("pedidos",),
+}
+
+SCHEMA_VERSION = MIGRACOES[-1][0]
+
+
+def get_schema_version(db_path: str = DB_PATH) -> int:
+    """Retorna a versão de esquema gravada no banco (PRAGMA user_version)."""
+    with get_connection(db_path) as conn:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
 
 
 def init_db(db_path: str = DB_PATH) -> None:
-    """Inicializa o banco SQLite criando tabelas necessárias."""
-    logger.info("Inicializando banco de dados em %s", db_path)
+    """Inicializa o banco SQLite aplicando as migrações pendentes."""
+    versao = get_schema_version(db_path)
+    if versao >= SCHEMA_VERSION:
+        logger.info("Esquema do banco %s já está na versão %s.", db_path, versao)
+        return
+
+    logger.info("Migrando banco de dados em %s da versão %s para %s", db_path, versao, SCHEMA_VERSION)
     with get_connection(db_path) as conn:
-        cur = conn.cursor()
-        cur.executescript(
-            """
-            PRAGMA foreign_keys = ON;
-
-            CREATE TABLE IF NOT EXISTS clientes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL,
-                email TEXT,
-                telefone TEXT
-            );
-
-            CREATE TABLE IF NOT EXISTS produtos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL,
-                preco_unit REAL NOT NULL DEFAULT 0
-            );
-
-            CREATE TABLE IF NOT EXISTS pedidos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                cliente_id INTEGER NOT NULL,
-                data TEXT NOT NULL,
-                total REAL NOT NULL DEFAULT 0,
-                FOREIGN KEY (cliente_id) REFERENCES clientes(id) ON DELETE CASCADE
-            );
-
-            CREATE TABLE IF NOT EXISTS itens_pedido (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                pedido_id INTEGER NOT NULL,
-                produto TEXT NOT NULL,
-                quantidade INTEGER NOT NULL,
-                preco_unit REAL NOT NULL,
-                FOREIGN KEY (pedido_id) REFERENCES pedidos(id) ON DELETE CASCADE
-            );
-            """
-        )
-        conn.commit()
+        for numero, descricao, script in MIGRACOES:
+            if numero <= versao:
+                continue
+            logger.info("Aplicando migração %s: %s", numero, descricao)
+            try:
+                # Script e nova versão na mesma transação: ou aplica tudo ou nada
+                conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {numero};\nCOMMIT;")
+            except sqlite3.Error:
+                if conn.in_transaction:
+                    conn.rollback()
+                logger.exception("Falha na migração %s (%s)", numero, descricao)
+                raise
+            finally:
+                # Mudança de esquema: nenhum resultado em cache continua confiável
+                query_cache.invalidate(db_path)
     logger.info("Inicialização do banco de dados concluída.")
 
 
+@contextmanager
+def transaction(db_path: str = DB_PATH):
+    """
+    Unidade de trabalho: tudo que for executado no bloco (pela conexão entregue
+    ou por execute/executemany da mesma thread) é gravado com um único COMMIT,
+    ou desfeito por completo em caso de erro. Blocos aninhados viram SAVEPOINTs.
+    """
+    with get_connection(db_path) as conn:
+        if conn.in_transaction:
+            marca = _marcar_eventos(db_path)
+            conn.execute("SAVEPOINT unidade_trabalho")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK TO unidade_trabalho")
+                conn.execute("RELEASE unidade_trabalho")
+                _descartar_eventos(db_path, marca)
+                raise
+            conn.execute("RELEASE unidade_trabalho")
+            return
+
+        # IMMEDIATE reserva a escrita já no início e evita upgrade de lock no meio do bloco
+        conn.execute("BEGIN IMMEDIATE")
+        confirmada = False
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        else:
+            conn.commit()
+            confirmada = True
+        finally:
+            # Só depois do COMMIT/ROLLBACK os caches podem ser invalidados com segurança;
+            # os eventos de alteração só são publicados se houve COMMIT
+            _flush_escritas(db_path, confirmada)
+
+
+@contextmanager
+def read_transaction(db_path: str = DB_PATH):
+    """
+    Leitura consistente (somente leitura): todas as consultas do bloco feitas
+    pela mesma thread enxergam o mesmo instantâneo do banco (WAL), mesmo que
+    outras conexões gravem no meio. Dentro de uma transação já aberta apenas
+    participa dela.
+    """
+    with get_connection(db_path) as conn:
+        if conn.in_transaction:
+            yield conn
+            return
+
+        # DEFERRED não reserva escrita: o instantâneo é fixado na primeira leitura
+        conn.execute("BEGIN DEFERRED")
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+
+
 def execute(sql: str, params: Optional[Iterable[Any]] = None, db_path: str = DB_PATH, commit: bool = True) -> int:
     """
-    Executa comando parametrizado. Retorna lastrowid quando aplicável ou rowcount.
+    Executa comando parametrizado. Retorna o id da linha inserida (INSERT/REPLACE
+    que gravou uma linha) ou rowcount.
+    Dentro de transaction() participa da transação aberta (sem commit próprio).
     Trata erros e loga exceções.
     """
     params = params or ()
     try:
         with get_connection(db_path) as conn:
+            em_transacao = conn.in_transaction
+            inicio = time.perf_counter()
             cur = conn.cursor()
             cur.execute(sql, tuple(params))
-            if commit:
+            if commit and not em_transacao:
                 conn.commit()
-            lastrowid = cur.lastrowid if cur.lastrowid else cur.rowcount
-            return lastrowid
+            profiler.record(conn, sql, params, time.perf_counter() - inicio, max(cur.rowcount, 0))
+            inserido = id_inserido(sql, cur)
+            eventos = eventos_de_escrita(db_path, sql, params, inserido)
+        registrar_escrita(db_path, tabelas_escritas(sql), eventos)
+        return inserido if inserido is not None else cur.rowcount
     except Exception as e:
         logger.exception("Erro executando SQL: %s | params=%s", sql, params)
         raise
 
 
 def executemany(sql: str, seq_of_params: Iterable[Iterable[Any]], db_path: str = DB_PATH) -> None:
-    """Executa many com tratamento de erro."""
+    """Executa many em uma única transação (ou na transação já aberta), com tratamento de erro."""
     try:
-        with get_connection(db_path) as conn:
-            cur = conn.cursor()
-            cur.executemany(sql, seq_of_params)
-            conn.commit()
+        # Guarda o primeiro conjunto de parâmetros para o EXPLAIN de consultas lentas
+        seq_of_params = iter(seq_of_params)
+        primeiro = next(seq_of_params, None)
+        if primeiro is None:
+            return
+        with transaction(db_path) as conn:
+            inicio = time.perf_counter()
+            cur = conn.executemany(sql, chain((primeiro,), seq_of_params))
+            profiler.record(conn, sql, primeiro, time.perf_counter() - inicio, max(cur.rowcount, 0))
+            # Várias linhas: os eventos saem sem id (assinantes recarregam a entidade)
+            registrar_escrita(db_path, tabelas_escritas(sql), eventos_de_escrita(db_path, sql, None, None))
     except Exception:
         logger.exception("Erro em executemany SQL")
         raise
@@ -109,15 +491,787 @@ def query(sql: str, params: Optional[Iterable[Any]] = None, db_path: str = DB_PA
     params = params or ()
     try:
         with get_connection(db_path) as conn:
+            inicio = time.perf_counter()
             cur = conn.cursor()
             cur.execute(sql, tuple(params))
             # Retorna uma lista de tuplas (conversão do Row para tupla)
-            return [tuple(row) for row in cur.fetchall()]
+            rows = [tuple(row) for row in cur.fetchall()]
+            profiler.record(conn, sql, params, time.perf_counter() - inicio, len(rows))
+            return rows
     except Exception:
         logger.exception("Erro em query SQL: %s | params=%s", sql, params)
         raise
 
 
+STREAM_BATCH_SIZE = 500  # Linhas buscadas por vez nas consultas em streaming
+
+
+def iter_query_batches(sql: str, params: Optional[Iterable[Any]] = None, db_path: str = DB_PATH,
+                       batch_size: int = STREAM_BATCH_SIZE) -> Iterator[List[Tuple]]:
+    """
+    Executa a query e entrega os resultados em lotes de até batch_size tuplas,
+    lendo do cursor sob demanda (sem fetchall). O consumo deve acontecer na
+    mesma thread que iniciou a iteração.
+    """
+    params = params or ()
+    with get_connection(db_path) as conn:
+        cur = conn.cursor()
+        # Conta apenas o tempo gasto no banco, não o do consumidor entre os lotes
+        gasto = 0.0
+        total_linhas = 0
+        try:
+            inicio = time.perf_counter()
+            cur.execute(sql, tuple(params))
+            while True:
+                rows = cur.fetchmany(batch_size)
+                gasto += time.perf_counter() - inicio
+                if not rows:
+                    break
+                total_linhas += len(rows)
+                yield [tuple(row) for row in rows]
+                inicio = time.perf_counter()
+        except Exception:
+            logger.exception("Erro em query SQL (streaming): %s | params=%s", sql, params)
+            raise
+        finally:
+            cur.close()
+            profiler.record(conn, sql, params, gasto, total_linhas)
+
+
+def iter_query(sql: str, params: Optional[Iterable[Any]] = None, db_path: str = DB_PATH,
+               batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Tuple]:
+    """Versão em streaming de query(): gera uma tupla por linha com memória constante."""
+    for lote in iter_query_batches(sql, params, db_path=db_path, batch_size=batch_size):
+        yield from lote
+
+
+# --------------------------
+# PROFILER E LOG DE CONSULTAS LENTAS
+# --------------------------
+
+SLOW_QUERY_MS = float(os.getenv("THINKIA_SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_PATH = "logs/slow_queries.log"
+QUERY_STATS_PATH = "logs/query_stats.json"
+
+# Limites superiores (ms) das faixas do histograma de tempos por statement
+FAIXAS_HISTOGRAMA_MS = (1, 5, 20, 100, 500, 2000)
+
+_RE_STRING = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTA_IN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_RE_ESPACOS = re.compile(r"\s+")
+_RE_EXPLICAVEL = re.compile(r"^\s*(?:SELECT|WITH|INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+slow_logger = logging.getLogger(__name__ + ".slow")
+
+
+def normalizar_sql(sql: str) -> str:
+    """Reduz o SQL à sua forma estrutural (literais viram ?, listas IN colapsadas)."""
+    sql = _RE_STRING.sub("?", sql)
+    sql = _RE_NUMERO.sub("?", sql)
+    sql = _RE_LISTA_IN.sub("(?, ...)", sql)
+    return _RE_ESPACOS.sub(" ", sql).strip()
+
+
+class QueryProfiler:
+    """
+    Registra tempo, linhas e número de execuções por SQL normalizado, com um
+    histograma de tempos por statement. Statements acima de slow_ms vão para o
+    log de consultas lentas junto com o EXPLAIN QUERY PLAN.
+    """
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, enabled: bool = True):
+        self.slow_ms = slow_ms
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._slow_handler_ok = False
+
+    def record(self, conn: sqlite3.Connection, sql: str, params: Optional[Iterable[Any]],
+               segundos: float, linhas: int) -> None:
+        if not self.enabled:
+            return
+        ms = segundos * 1000
+        chave = normalizar_sql(sql)
+        faixa = next((f"<{limite}ms" for limite in FAIXAS_HISTOGRAMA_MS if ms < limite),
+                     f">={FAIXAS_HISTOGRAMA_MS[-1]}ms")
+        with self._lock:
+            st = self._stats.get(chave)
+            if st is None:
+                st = self._stats[chave] = {
+                    "sql": chave, "chamadas": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "linhas": 0, "lentas": 0, "histograma": {},
+                }
+            st["chamadas"] += 1
+            st["total_ms"] += ms
+            st["max_ms"] = max(st["max_ms"], ms)
+            st["linhas"] += linhas
+            st["histograma"][faixa] = st["histograma"].get(faixa, 0) + 1
+            if ms >= self.slow_ms:
+                st["lentas"] += 1
+
+        if ms >= self.slow_ms:
+            self._log_slow(conn, sql, params, ms, linhas)
+
+    def _log_slow(self, conn: sqlite3.Connection, sql: str, params: Optional[Iterable[Any]],
+                  ms: float, linhas: int) -> None:
+        self._configurar_slow_log()
+        plano = ""
+        if _RE_EXPLICAVEL.match(sql):
+            try:
+                detalhes = conn.execute(f"EXPLAIN QUERY PLAN {sql}", tuple(params or ())).fetchall()
+                plano = "\n".join(f"    {row[3]}" for row in detalhes)
+            except sqlite3.Error as e:
+                plano = f"    (plano indisponível: {e})"
+        slow_logger.warning("%.1f ms | %s linhas | %s | params=%s%s",
+                            ms, linhas, normalizar_sql(sql), params, "\n" + plano if plano else "")
+
+    def _configurar_slow_log(self) -> None:
+        if self._slow_handler_ok:
+            return
+        with self._lock:
+            if self._slow_handler_ok:
+                return
+            os.makedirs(os.path.dirname(SLOW_QUERY_LOG_PATH), exist_ok=True)
+            handler = logging.FileHandler(SLOW_QUERY_LOG_PATH, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S"))
+            slow_logger.addHandler(handler)
+            self._slow_handler_ok = True
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Estatísticas por SQL normalizado, da maior para a menor soma de tempo."""
+        with self._lock:
+            copia = [dict(st, histograma=dict(st["histograma"])) for st in self._stats.values()]
+        for st in copia:
+            st["media_ms"] = st["total_ms"] / st["chamadas"]
+        return sorted(copia, key=lambda st: st["total_ms"], reverse=True)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+    def dump(self, path: str = QUERY_STATS_PATH) -> None:
+        """Grava as estatísticas em JSON (chamado no encerramento da aplicação)."""
+        stats = self.stats()
+        if not stats:
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"slow_query_ms": self.slow_ms, "consultas": stats}, f, ensure_ascii=False, indent=2)
+        logger.info("Estatísticas de consultas gravadas em %s", path)
+
+
+profiler = QueryProfiler()
+
+
+def get_query_stats() -> List[Dict[str, Any]]:
+    """Tempo total/médio/máximo, linhas, chamadas e histograma por SQL normalizado."""
+    return profiler.stats()
+
+
+def dump_query_stats(path: str = QUERY_STATS_PATH) -> None:
+    """Grava as estatísticas de consultas em JSON."""
+    profiler.dump(path)
+
+
+# --------------------------
+# CACHE DE CONSULTAS (LRU COM INVALIDAÇÃO POR TABELA)
+# --------------------------
+
+CACHE_MAX_ENTRADAS = 128
+
+# Tabelas afetadas indiretamente (ON DELETE CASCADE) por escritas em outra tabela
+CASCATAS: Dict[str, Tuple[str, ...]] = {
+    "clientes": ("pedidos", "itens_pedido"),
+    "pedidos": ("itens_pedido",),
+    "produtos": ("itens_pedido",),  # ON DELETE SET NULL em itens_pedido.produto_id
+}
+
+_RE_TABELAS_LEITURA = re.compile(r"\b(?:FROM|JOIN)\s+[\"`\[]?(\w+)", re.IGNORECASE)
+_RE_TABELA_ESCRITA = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?|DELETE\s+FROM)\s+[\"`\[]?(\w+)",
+    re.IGNORECASE)
+_RE_SOMENTE_LEITURA = re.compile(r"^\s*(?:SELECT|WITH|EXPLAIN)\b", re.IGNORECASE)
+_RE_INSERCAO = re.compile(r"^\s*(?:INSERT|REPLACE)\b", re.IGNORECASE)
+
+
+def id_inserido(sql: str, cur: sqlite3.Cursor) -> Optional[int]:
+    """
+    Id da linha gravada por um INSERT/REPLACE, ou None (outro statement, ou
+    INSERT OR IGNORE que não inseriu nada). A conexão do pool é reaproveitada,
+    então lastrowid sozinho pode ser o de um INSERT anterior.
+    """
+    if _RE_INSERCAO.match(sql) and cur.rowcount > 0:
+        return cur.lastrowid
+    return None
+
+
+def tabelas_lidas(sql: str) -> frozenset:
+    """Tabelas citadas em FROM/JOIN de uma consulta."""
+    return frozenset(t.lower() for t in _RE_TABELAS_LEITURA.findall(sql))
+
+
+def expandir_tabelas(tabelas: Iterable[str]) -> frozenset:
+    """Acrescenta às tabelas escritas as afetadas por cascata e as de resumo (triggers)."""
+    afetadas = set()
+    for tabela in tabelas:
+        tabela = tabela.lower()
+        afetadas.add(tabela)
+        afetadas.update(CASCATAS.get(tabela, ()))
+    afetadas.update(resumo for resumo, origens in TABELAS_RESUMO.items() if afetadas.intersection(origens))
+    return frozenset(afetadas)
+
+
+def tabelas_escritas(sql: str) -> Optional[frozenset]:
+    """
+    Tabelas alteradas por um comando (incluindo as afetadas por cascata).
+    Retorna frozenset() para leituras e None quando não é possível determinar
+    (ex.: DDL), caso em que todo o cache deve ser invalidado.
+    """
+    m = _RE_TABELA_ESCRITA.match(sql)
+    if m:
+        return expandir_tabelas((m.group(1),))
+    if _RE_SOMENTE_LEITURA.match(sql):
+        return frozenset()
+    return None
+
+
+class QueryCache:
+    """
+    Cache LRU de resultados de consultas, chaveado por (db_path, sql, params).
+    Cada entrada guarda as tabelas que leu e é descartada quando uma delas é
+    escrita via execute/executemany/transaction ou quando PRAGMA data_version
+    indica um commit feito por outra conexão.
+
+    Cada invalidação avança a geração das tabelas afetadas: quem lê do banco
+    anota a geração antes da consulta (geracao) e o put é ignorado se ela
+    mudou no meio, para que um resultado lido antes de uma escrita (ex.: em
+    outra thread) não volte ao cache depois da invalidação.
+    """
+
+    def __init__(self, max_entradas: int = CACHE_MAX_ENTRADAS):
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._entradas: "OrderedDict[Tuple, Tuple[List[Tuple], frozenset]]" = OrderedDict()
+        self._data_versions: Dict[Tuple[int, str], int] = {}
+        self._geracoes: Dict[Tuple[str, Optional[str]], int] = {}  # (db_path, tabela); tabela None = todas
+        self.hits = 0
+        self.misses = 0
+        self.invalidacoes = 0
+
+    def get(self, chave: Tuple) -> Optional[List[Tuple]]:
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.hits += 1
+            return entrada[0]
+
+    def _geracao(self, db_path: str, tabelas: frozenset) -> Tuple[int, ...]:
+        # Deve ser chamado com o lock
+        return (self._geracoes.get((db_path, None), 0),) + tuple(
+            self._geracoes.get((db_path, tabela), 0) for tabela in sorted(tabelas))
+
+    def geracao(self, db_path: str, tabelas: frozenset) -> Tuple[int, ...]:
+        """Geração atual das tabelas de db_path; muda a cada invalidação que as atinge."""
+        with self._lock:
+            return self._geracao(db_path, tabelas)
+
+    def put(self, chave: Tuple, resultado: List[Tuple], tabelas: frozenset,
+            geracao: Optional[Tuple[int, ...]] = None) -> None:
+        """Guarda o resultado, exceto se as tabelas foram invalidadas desde geracao (lida antes da consulta)."""
+        with self._lock:
+            if geracao is not None and geracao != self._geracao(chave[0], tabelas):
+                return
+            self._entradas[chave] = (resultado, tabelas)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidate(self, db_path: str, tabelas: Optional[Iterable[str]] = None) -> None:
+        """Remove as entradas de db_path que leem alguma das tabelas (todas, se None)."""
+        alvo = None if tabelas is None else frozenset(tabelas)
+        with self._lock:
+            for tabela in (None,) if alvo is None else alvo:
+                self._geracoes[(db_path, tabela)] = self._geracoes.get((db_path, tabela), 0) + 1
+            remover = [
+                chave for chave, (_, lidas) in self._entradas.items()
+                if chave[0] == db_path and (alvo is None or lidas & alvo)
+            ]
+            for chave in remover:
+                del self._entradas[chave]
+            self.invalidacoes += len(remover)
+
+    def check_data_version(self, conn: sqlite3.Connection, db_path: str) -> None:
+        """Invalida o cache de db_path se outra conexão fez commit desde a última verificação."""
+        versao = conn.execute("PRAGMA data_version").fetchone()[0]
+        chave = (threading.get_ident(), db_path)
+        with self._lock:
+            anterior = self._data_versions.get(chave)
+            self._data_versions[chave] = versao
+        if anterior is not None and anterior != versao:
+            self.invalidate(db_path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entradas": len(self._entradas),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidacoes": self.invalidacoes,
+            }
+
+
+query_cache = QueryCache()
+_escritas_local = threading.local()
+
+
+def registrar_escrita(db_path: str, tabelas: Optional[Iterable[str]],
+                      eventos: Iterable["ChangeEvent"] = ()) -> None:
+    """
+    Informa que tabelas de db_path foram alteradas (None = desconhecidas/todas)
+    e publica os eventos correspondentes no change_bus.
+    Dentro de transaction() a notificação é adiada até o COMMIT/ROLLBACK.
+    """
+    with get_connection(db_path) as conn:
+        em_transacao = conn.in_transaction
+    if tabelas is not None and not tabelas:
+        return
+    if tabelas is not None:
+        tabelas = expandir_tabelas(tabelas)
+    if em_transacao:
+        pendentes = getattr(_escritas_local, "pendentes", None)
+        if pendentes is None:
+            pendentes = _escritas_local.pendentes = {}
+        atuais = pendentes.get(db_path, frozenset())
+        pendentes[db_path] = None if (tabelas is None or atuais is None) else atuais | frozenset(tabelas)
+        _eventos_pendentes(db_path).extend(eventos)
+    else:
+        query_cache.invalidate(db_path, tabelas)
+        change_bus.publish(eventos)
+
+
+def _eventos_pendentes(db_path: str) -> List["ChangeEvent"]:
+    eventos = getattr(_escritas_local, "eventos", None)
+    if eventos is None:
+        eventos = _escritas_local.eventos = {}
+    return eventos.setdefault(db_path, [])
+
+
+def _marcar_eventos(db_path: str) -> int:
+    """Posição atual da fila de eventos da transação (início de um SAVEPOINT)."""
+    return len(_eventos_pendentes(db_path))
+
+
+def _descartar_eventos(db_path: str, marca: int) -> None:
+    """Descarta os eventos registrados depois de marca (ROLLBACK TO de um SAVEPOINT)."""
+    del _eventos_pendentes(db_path)[marca:]
+
+
+def _flush_escritas(db_path: str, publicar: bool = True) -> None:
+    """
+    Aplica as invalidações adiadas pela transação de db_path na thread atual e,
+    se ela foi confirmada, publica seus eventos de alteração.
+    """
+    pendentes = getattr(_escritas_local, "pendentes", None)
+    if pendentes and db_path in pendentes:
+        query_cache.invalidate(db_path, pendentes.pop(db_path))
+    eventos = getattr(_escritas_local, "eventos", {}).pop(db_path, [])
+    if publicar:
+        change_bus.publish(eventos)
+
+
+def cached_query(sql: str, params: Optional[Iterable[Any]] = None, db_path: str = DB_PATH) -> List[Tuple]:
+    """
+    Igual a query(), mas reaproveita o resultado enquanto nenhuma das tabelas
+    lidas for alterada. Use para leituras repetidas (listas de combos, métricas).
+    """
+    params = tuple(params or ())
+    with get_connection(db_path) as conn:
+        query_cache.check_data_version(conn, db_path)
+    chave = (db_path, sql, params)
+    resultado = query_cache.get(chave)
+    if resultado is None:
+        tabelas = tabelas_lidas(sql)
+        # Anotada antes da leitura: uma invalidação durante a consulta impede o put
+        geracao = query_cache.geracao(db_path, tabelas)
+        resultado = query(sql, params, db_path=db_path)
+        query_cache.put(chave, resultado, tabelas, geracao)
+    return list(resultado)
+
+
+def get_cache_stats() -> Dict[str, int]:
+    """Contadores do cache de consultas (entradas, hits, misses e invalidações)."""
+    return query_cache.stats()
+
+
+def get_data_version(db_path: str = DB_PATH) -> int:
+    """
+    PRAGMA data_version da conexão desta thread. O valor muda quando outra
+    conexão (outro processo ou outra thread) faz commit, mas não com as
+    escritas feitas pela própria conexão; serve para detectar alterações
+    externas às feitas pela tela.
+    """
+    with get_connection(db_path) as conn:
+        return conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+# --------------------------
+# BARRAMENTO DE ALTERAÇÕES (PUBLICAÇÃO/ASSINATURA)
+# --------------------------
+
+OP_INSERT = "insert"
+OP_UPDATE = "update"
+OP_DELETE = "delete"
+
+_OPERACOES_SQL = {"INSERT": OP_INSERT, "REPLACE": OP_INSERT, "UPDATE": OP_UPDATE, "DELETE": OP_DELETE}
+
+# UPDATE/DELETE de uma única linha pela chave primária: o id é o último parâmetro
+_RE_WHERE_ID = re.compile(r"\bWHERE\s+id\s*=\s*\?\s*;?\s*$", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """
+    Alteração confirmada no banco. entity é a tabela (None = desconhecida, ou
+    seja, qualquer uma) e id a linha afetada (None = várias ou desconhecidas).
+    """
+    db_path: str
+    entity: Optional[str]
+    id: Optional[int]
+    operation: str
+
+
+class ChangeBus:
+    """
+    Publicação/assinatura de ChangeEvent para as escritas feitas via db.py.
+    Os callbacks rodam na thread que fez a escrita, logo após o COMMIT; quem
+    mexe em widgets deve repassar o evento para a thread do Tk (ver
+    AsyncViewMixin.subscribe_changes).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._assinantes: Dict[int, Tuple[Callable[[ChangeEvent], None], Optional[frozenset]]] = {}
+        self._proximo = 0
+
+    def subscribe(self, callback: Callable[[ChangeEvent], None], entities: Optional[Iterable[str]] = None) -> int:
+        """
+        Assina os eventos das tabelas em entities (todas, se None). Eventos de
+        entidade desconhecida são entregues a todos. Retorna o token de unsubscribe.
+        """
+        with self._lock:
+            self._proximo += 1
+            self._assinantes[self._proximo] = (callback, None if entities is None else frozenset(entities))
+            return self._proximo
+
+    def unsubscribe(self, token: int) -> None:
+        with self._lock:
+            self._assinantes.pop(token, None)
+
+    def publish(self, eventos: Iterable[ChangeEvent]) -> None:
+        eventos = list(eventos)
+        if not eventos:
+            return
+        with self._lock:
+            assinantes = list(self._assinantes.values())
+        for evento in eventos:
+            for callback, entidades in assinantes:
+                if entidades is None or evento.entity is None or evento.entity in entidades:
+                    try:
+                        callback(evento)
+                    except Exception:
+                        logger.exception("Erro em assinante do change_bus para %s", evento)
+
+
+change_bus = ChangeBus()
+
+
+def eventos_de_escrita(db_path: str, sql: str, params: Optional[Iterable[Any]],
+                       lastrowid: Optional[int]) -> List[ChangeEvent]:
+    """
+    Deduz os eventos de um INSERT/UPDATE/DELETE: a tabela escrita, o id
+    (lastrowid, o de id_inserido, no INSERT; o parâmetro de "WHERE id = ?" no
+    UPDATE/DELETE, se params for informado) e, em DELETE, as tabelas apagadas
+    em cascata (sem id). Leituras não geram eventos; outros statements geram um
+    evento sem entidade.
+    """
+    m = _RE_TABELA_ESCRITA.match(sql)
+    if m is None:
+        return [] if _RE_SOMENTE_LEITURA.match(sql) else [ChangeEvent(db_path, None, None, OP_UPDATE)]
+
+    tabela = m.group(1).lower()
+    operacao = _OPERACOES_SQL[sql.split(None, 1)[0].upper()]
+    linha_id = None
+    if params is not None:
+        params = tuple(params)
+        if operacao == OP_INSERT:
+            linha_id = lastrowid or None
+        elif params and _RE_WHERE_ID.search(sql):
+            linha_id = params[-1]
+
+    eventos = [ChangeEvent(db_path, tabela, linha_id, operacao)]
+    if operacao == OP_DELETE:
+        eventos.extend(ChangeEvent(db_path, t, None, OP_DELETE) for t in CASCATAS.get(tabela, ()))
+    return eventos
+
+
+def subscribe_changes(callback: Callable[[ChangeEvent], None], entities: Optional[Iterable[str]] = None) -> int:
+    """Assina o change_bus (ver ChangeBus.subscribe)."""
+    return change_bus.subscribe(callback, entities)
+
+
+def unsubscribe_changes(token: int) -> None:
+    change_bus.unsubscribe(token)
+
+
+# --------------------------
+# REPOSITÓRIO (PEDIDOS)
+# --------------------------
+
+def _salvar_pedido(conn: sqlite3.Connection, pedido: Pedido) -> int:
+    """Grava o pedido e substitui seus itens usando a conexão da transação."""
+    if pedido.id:
+        conn.execute(
+            "UPDATE pedidos SET cliente_id = ?, data = ?, total = ? WHERE id = ?",
+            (pedido.cliente_id, pedido.data, pedido.total, pedido.id)
+        )
+        conn.execute("DELETE FROM itens_pedido WHERE pedido_id = ?", (pedido.id,))
+        pedido_id = pedido.id
+    else:
+        cur = conn.execute(
+            "INSERT INTO pedidos (cliente_id, data, total) VALUES (?, ?, ?)",
+            (pedido.cliente_id, pedido.data, pedido.total)
+        )
+        pedido_id = cur.lastrowid
+
+    itens = pedido.itens or []
+    if itens:
+        # Sem produto_id (ex.: importação), o produto é resolvido pelo nome
+        conn.executemany(
+            """
+            INSERT INTO itens_pedido (pedido_id, produto, quantidade, preco_unit, produto_id)
+            VALUES (?, ?, ?, ?, COALESCE(?, (SELECT MIN(id) FROM produtos WHERE nome = ?)))
+            """,
+            [(pedido_id, i.produto, i.quantidade, i.preco_unit, i.produto_id, i.produto) for i in itens]
+        )
+    return pedido_id
+
+
+def _eventos_pedido(db_path: str, pedido_id: int, operacao: str) -> List["ChangeEvent"]:
+    """Eventos de um pedido gravado: o próprio pedido e seus itens (substituídos por inteiro)."""
+    return [ChangeEvent(db_path, "pedidos", pedido_id, operacao),
+            ChangeEvent(db_path, "itens_pedido", None, OP_UPDATE)]
+
+
+def salvar_pedido(pedido: Pedido, db_path: str = DB_PATH) -> int:
+    """
+    Insere (id None) ou atualiza o pedido junto com seus itens em uma única
+    transação. Retorna o id do pedido.
+    """
+    try:
+        with transaction(db_path) as conn:
+            operacao = OP_UPDATE if pedido.id else OP_INSERT
+            pedido_id = _salvar_pedido(conn, pedido)
+            registrar_escrita(db_path, ("pedidos", "itens_pedido"), _eventos_pedido(db_path, pedido_id, operacao))
+            return pedido_id
+    except Exception:
+        logger.exception("Erro ao salvar pedido: %s", pedido)
+        raise
+
+
+def salvar_pedidos(pedidos: Iterable[Pedido], db_path: str = DB_PATH) -> List[int]:
+    """
+    Salva vários pedidos (ex.: importação) com um único COMMIT. Se algum falhar,
+    nenhum é gravado. Retorna os ids na mesma ordem da entrada.
+    """
+    try:
+        with transaction(db_path) as conn:
+            ids = []
+            eventos: List[ChangeEvent] = []
+            for pedido in pedidos:
+                operacao = OP_UPDATE if pedido.id else OP_INSERT
+                ids.append(_salvar_pedido(conn, pedido))
+                eventos.extend(_eventos_pedido(db_path, ids[-1], operacao))
+            registrar_escrita(db_path, ("pedidos", "itens_pedido"), eventos)
+            return ids
+    except Exception:
+        logger.exception("Erro ao salvar lote de pedidos")
+        raise
+
+
+# --------------------------
+# RESUMOS DO DASHBOARD
+# --------------------------
+
+SQL_RECONSTRUIR_RESUMOS = """
+    DELETE FROM resumo_produtos;
+    DELETE FROM resumo_clientes;
+    DELETE FROM resumo_diario;
+    UPDATE resumo_global SET
+        total_clientes = (SELECT COUNT(*) FROM clientes),
+        total_pedidos = (SELECT COUNT(*) FROM pedidos),
+        faturamento_total = (SELECT COALESCE(SUM(total), 0) FROM pedidos)
+    WHERE id = 1;
+    INSERT INTO resumo_produtos (produto_id, quantidade)
+        SELECT produto_id, SUM(quantidade) FROM itens_pedido WHERE produto_id IS NOT NULL GROUP BY produto_id;
+    INSERT INTO resumo_clientes (cliente_id, total_gasto)
+        SELECT cliente_id, SUM(total) FROM pedidos GROUP BY cliente_id;
+    INSERT INTO resumo_diario (data, pedidos, faturamento)
+        SELECT data, COUNT(*), SUM(total) FROM pedidos GROUP BY data;
+"""
+
+
+def rebuild_resumos(db_path: str = DB_PATH) -> None:
+    """
+    Recalcula as tabelas de resumo a partir das tabelas de origem, corrigindo
+    qualquer divergência (ex.: dados alterados com os triggers desativados).
+    """
+    logger.info("Reconstruindo tabelas de resumo em %s", db_path)
+    try:
+        with transaction(db_path) as conn:
+            for comando in SQL_RECONSTRUIR_RESUMOS.split(";"):
+                if comando.strip():
+                    conn.execute(comando)
+            registrar_escrita(db_path, TABELAS_RESUMO.keys())
+    except Exception:
+        logger.exception("Erro ao reconstruir tabelas de resumo")
+        raise
+
+
+def get_dashboard_metrics(db_path: str = DB_PATH) -> Dict[str, Any]:
+    """Lê as métricas do dashboard das tabelas de resumo (custo constante)."""
+    total_clientes, total_pedidos, faturamento_total = cached_query(
+        "SELECT total_clientes, total_pedidos, faturamento_total FROM resumo_global WHERE id = 1",
+        db_path=db_path)[0]
+
+    top_produto = cached_query("""
+                               SELECT p.nome
+                               FROM resumo_produtos r
+                                        JOIN produtos p ON r.produto_id = p.id
+                               WHERE r.quantidade > 0
+                               ORDER BY r.quantidade DESC LIMIT 1
+                               """, db_path=db_path)
+
+    top_cliente = cached_query("""
+                               SELECT c.nome
+                               FROM resumo_clientes r
+                                        JOIN clientes c ON r.cliente_id = c.id
+                               WHERE r.total_gasto > 0
+                               ORDER BY r.total_gasto DESC LIMIT 1
+                               """, db_path=db_path)
+
+    return {
+        'total_clientes': total_clientes,
+        'total_pedidos': total_pedidos,
+        'faturamento_total': faturamento_total or 0.0,
+        'top_produto': top_produto[0][0] if top_produto else "N/A",
+        'top_cliente': top_cliente[0][0] if top_cliente and top_cliente[0][0] else "N/A",
+    }
+
+
+# --------------------------
+# PAGINAÇÃO POR CHAVE (KEYSET)
+# --------------------------
+
+PAGE_SIZE = 200
+
+Pagina = Tuple[List[Tuple], Optional[Tuple]]
+
+# Consultas das listas; get_*_row usa a mesma projeção para atualizar uma linha isolada
+SQL_LISTA_CLIENTES = "SELECT id, nome, email, telefone FROM clientes"
+SQL_LISTA_PRODUTOS = "SELECT id, nome, preco_unit FROM produtos"
+SQL_LISTA_PEDIDOS = "SELECT p.id, c.nome, p.data, p.total FROM pedidos p JOIN clientes c ON p.cliente_id = c.id"
+
+
+def _keyset_page(select_sql: str, chaves: Tuple[str, ...], indices_chave: Tuple[int, ...],
+                 after: Optional[Tuple], limit: int, descendente: bool, db_path: str) -> Pagina:
+    """
+    Busca uma página ordenada pelas colunas em chaves, começando logo após a
+    chave after (None = primeira página). Em vez de OFFSET, filtra pela posição
+    da última linha vista, então o custo de cada página independe da posição.
+    Retorna (linhas, chave_da_próxima_página), com chave None na última página.
+    """
+    sql = select_sql
+    params: List[Any] = []
+    if after is not None:
+        operador = "<" if descendente else ">"
+        sql += f" WHERE ({', '.join(chaves)}) {operador} ({', '.join('?' * len(chaves))})"
+        params.extend(after)
+    ordem = "DESC" if descendente else "ASC"
+    sql += " ORDER BY " + ", ".join(f"{c} {ordem}" for c in chaves) + " LIMIT ?"
+    params.append(limit)
+
+    # Só a primeira página (reaberta a cada visita à tela) vai para o cache; as
+    # seguintes raramente são relidas e tomariam o lugar de combos e métricas no LRU
+    rows = (cached_query if after is None else query)(sql, params, db_path=db_path)
+    if len(rows) < limit:
+        return rows, None
+    ultima = rows[-1]
+    return rows, tuple(ultima[i] for i in indices_chave)
+
+
+def get_clientes_page(after: Optional[Tuple] = None, limit: int = PAGE_SIZE, db_path: str = DB_PATH) -> Pagina:
+    """Página de clientes (id, nome, email, telefone) ordenada por nome."""
+    return _keyset_page(SQL_LISTA_CLIENTES, ("nome", "id"), (1, 0), after, limit, False, db_path)
+
+
+def get_produtos_page(after: Optional[Tuple] = None, limit: int = PAGE_SIZE, db_path: str = DB_PATH) -> Pagina:
+    """Página de produtos (id, nome, preco_unit) ordenada por nome."""
+    return _keyset_page(SQL_LISTA_PRODUTOS, ("nome", "id"), (1, 0), after, limit, False, db_path)
+
+
+def get_pedidos_page(after: Optional[Tuple] = None, limit: int = PAGE_SIZE, db_path: str = DB_PATH) -> Pagina:
+    """Página de pedidos (id, cliente, data, total), dos mais recentes para os mais antigos."""
+    return _keyset_page(SQL_LISTA_PEDIDOS, ("p.data", "p.id"), (2, 0), after, limit, True, db_path)
+
+
+def _linha_por_id(select_sql: str, coluna_id: str, id: int, db_path: str) -> Optional[Tuple]:
+    rows = query(f"{select_sql} WHERE {coluna_id} = ?", (id,), db_path=db_path)
+    return tuple(rows[0]) if rows else None
+
+
+def get_cliente_row(id: int, db_path: str = DB_PATH) -> Optional[Tuple]:
+    """Linha de um cliente no formato de get_clientes_page (None se não existir)."""
+    return _linha_por_id(SQL_LISTA_CLIENTES, "id", id, db_path)
+
+
+def get_produto_row(id: int, db_path: str = DB_PATH) -> Optional[Tuple]:
+    """Linha de um produto no formato de get_produtos_page (None se não existir)."""
+    return _linha_por_id(SQL_LISTA_PRODUTOS, "id", id, db_path)
+
+
+def get_pedido_row(id: int, db_path: str = DB_PATH) -> Optional[Tuple]:
+    """Linha de um pedido no formato de get_pedidos_page (None se não existir)."""
+    return _linha_por_id(SQL_LISTA_PEDIDOS, "p.id", id, db_path)
+
+
+def get_pedido_rows_do_cliente(cliente_id: int, db_path: str = DB_PATH) -> List[Tuple]:
+    """Linhas (formato de get_pedidos_page) dos pedidos de um cliente, para refletir a troca do nome."""
+    return query(f"{SQL_LISTA_PEDIDOS} WHERE p.cliente_id = ?", (cliente_id,), db_path=db_path)
+
+
+def count_clientes(db_path: str = DB_PATH) -> int:
+    """Total de clientes, lido da tabela de resumo (custo constante)."""
+    return cached_query("SELECT total_clientes FROM resumo_global WHERE id = 1", db_path=db_path)[0][0]
+
+
+def count_pedidos(db_path: str = DB_PATH) -> int:
+    """Total de pedidos, lido da tabela de resumo (custo constante)."""
+    return cached_query("SELECT total_pedidos FROM resumo_global WHERE id = 1", db_path=db_path)[0][0]
+
+
+def count_produtos(db_path: str = DB_PATH) -> int:
+    """Total de produtos (tabela pequena; resultado fica em cache até a próxima escrita)."""
+    return cached_query("SELECT COUNT(*) FROM produtos", db_path=db_path)[0][0]
+
+
 # --------------------------
 # REPOSITÓRIO (FUNÇÕES PARA RELATÓRIOS)
 # --------------------------
@@ -125,21 +1279,12 @@ def query(sql: str, params: Optional[Iterable[Any]] = None, db_path: str = DB_PA
 def get_all_clientes_for_combo(db_path: str = DB_PATH) -> List[Tuple]:
     """Retorna ID e Nome de todos os clientes para popular o Combobox."""
     sql = "SELECT id, nome FROM clientes ORDER BY nome"
-    return query(sql, db_path=db_path)
+    return cached_query(sql, db_path=db_path)
 
 
-def query_relatorio_pedidos(data_inicial: str, data_final: str, cliente_id: Optional[int], db_path: str = DB_PATH) -> \
-List[Tuple]:
-    """Busca pedidos com cliente, filtrando por data e cliente."""
-    sql = """
-          SELECT p.id, \
-                 c.nome, \
-                 p.data, \
-                 p.total
-          FROM pedidos p
-                   JOIN clientes c ON p.cliente_id = c.id
-          WHERE 1 = 1 \
-          """
+def _filtros_relatorio(data_inicial: str, data_final: str, cliente_id: Optional[int]) -> Tuple[str, List[Any]]:
+    """Monta as cláusulas WHERE (sobre o alias p de pedidos) comuns aos relatórios."""
+    sql = ""
     params = []
 
     if data_inicial:
@@ -151,11 +1296,47 @@ List[Tuple]:
         params.append(data_final)
 
     if cliente_id:
-        sql += " AND c.id = ?"
+        sql += " AND p.cliente_id = ?"
         params.append(cliente_id)
 
-    # Ordena para melhor visualização
-    sql += " ORDER BY p.data DESC"
+    return sql, params
+
+
+def get_clientes_com_pedidos(data_inicial: str, data_final: str, db_path: str = DB_PATH) -> List[Tuple]:
+    """ID e nome dos clientes com pedidos no período (mesmos filtros de query_relatorio_pedidos)."""
+    sql = """
+          SELECT c.id, c.nome
+          FROM clientes c
+          WHERE EXISTS (SELECT 1 FROM pedidos p WHERE p.cliente_id = c.id \
+          """
+    filtros, params = _filtros_relatorio(data_inicial, data_final, None)
+    sql += filtros
+    sql += ") ORDER BY c.nome"
+    return query(sql, params, db_path=db_path)
+
+
+def query_relatorio_pedidos(data_inicial: str, data_final: str, cliente_id: Optional[int], db_path: str = DB_PATH) -> \
+List[Tuple]:
+    """
+    Busca pedidos com cliente, filtrando por data e cliente:
+    (id, cliente, data, total, quantidade de itens). Os itens em si não são
+    lidos (a contagem usa só o índice de itens_pedido); ver get_itens_pedido.
+    """
+    sql = """
+          SELECT p.id, \
+                 c.nome, \
+                 p.data, \
+                 p.total, \
+                 (SELECT COUNT(*) FROM itens_pedido i WHERE i.pedido_id = p.id)
+          FROM pedidos p
+                   JOIN clientes c ON p.cliente_id = c.id
+          WHERE 1 = 1 \
+          """
+    filtros, params = _filtros_relatorio(data_inicial, data_final, cliente_id)
+    sql += filtros
+
+    # Ordena para melhor visualização (mesma ordem de iter_relatorio_detalhado)
+    sql += " ORDER BY p.data DESC, p.id"
 
     return query(sql, params, db_path=db_path)
 
@@ -163,4 +1344,153 @@ List[Tuple]:
 def get_itens_pedido(pedido_id: int, db_path: str = DB_PATH) -> List[Tuple]:
     """Retorna os itens de um pedido específico."""
     sql = "SELECT produto, quantidade, preco_unit FROM itens_pedido WHERE pedido_id = ?"
-    return query(sql, (pedido_id,), db_path=db_path)
\ No newline at end of file
+    return query(sql, (pedido_id,), db_path=db_path)
+
+
+def _agrupar_itens(rows: Iterable[Tuple]) -> Dict[int, List[Tuple]]:
+    """Agrupa linhas (pedido_id, produto, quantidade, preco_unit) por pedido_id."""
+    itens: Dict[int, List[Tuple]] = {}
+    for pedido_id, produto, quantidade, preco_unit in rows:
+        itens.setdefault(pedido_id, []).append((produto, quantidade, preco_unit))
+    return itens
+
+
+# Margem abaixo do limite de parâmetros por statement do SQLite (999 nas versões antigas)
+MAX_PARAMS_IN = 900
+
+
+def get_itens_por_pedidos(pedido_ids: Iterable[int], db_path: str = DB_PATH) -> Dict[int, List[Tuple]]:
+    """
+    Retorna os itens de vários pedidos de uma vez, agrupados por pedido_id:
+    {pedido_id: [(produto, quantidade, preco_unit), ...]}; pedidos sem itens
+    ficam com lista vazia. Usa uma única query por bloco de MAX_PARAMS_IN ids
+    em vez de uma por pedido.
+    """
+    ids = list(dict.fromkeys(pedido_ids))
+    itens: Dict[int, List[Tuple]] = {pedido_id: [] for pedido_id in ids}
+    for inicio in range(0, len(ids), MAX_PARAMS_IN):
+        bloco = ids[inicio:inicio + MAX_PARAMS_IN]
+        placeholders = ", ".join("?" * len(bloco))
+        sql = f"""
+              SELECT pedido_id, produto, quantidade, preco_unit
+              FROM itens_pedido
+              WHERE pedido_id IN ({placeholders})
+              ORDER BY pedido_id, id
+              """
+        itens.update(_agrupar_itens(query(sql, bloco, db_path=db_path)))
+    return itens
+
+
+def count_relatorio_detalhado(data_inicial: str, data_final: str, cliente_id: Optional[int],
+                              db_path: str = DB_PATH) -> int:
+    """Quantidade de linhas que iter_relatorio_detalhado gera com os mesmos filtros."""
+    sql = """
+          SELECT COUNT(*)
+          FROM pedidos p
+                   JOIN clientes c ON p.cliente_id = c.id
+                   LEFT JOIN itens_pedido i ON i.pedido_id = p.id
+          WHERE 1 = 1 \
+          """
+    filtros, params = _filtros_relatorio(data_inicial, data_final, cliente_id)
+    sql += filtros
+    return query(sql, params, db_path=db_path)[0][0]
+
+
+def iter_relatorio_detalhado(data_inicial: str, data_final: str, cliente_id: Optional[int],
+                             db_path: str = DB_PATH) -> Iterator[Tuple]:
+    """
+    Gera, em streaming, uma linha por item dos pedidos filtrados:
+    (pedido_id, cliente, data, total, produto, quantidade, preco_unit).
+    Pedidos sem itens vêm com produto/quantidade/preco_unit None. As linhas de
+    um mesmo pedido são consecutivas, na ordem de query_relatorio_pedidos.
+    """
+    sql = """
+          SELECT p.id, \
+                 c.nome, \
+                 p.data, \
+                 p.total, \
+                 i.produto, \
+                 i.quantidade, \
+                 i.preco_unit
+          FROM pedidos p
+                   JOIN clientes c ON p.cliente_id = c.id
+                   LEFT JOIN itens_pedido i ON i.pedido_id = p.id
+          WHERE 1 = 1 \
+          """
+    filtros, params = _filtros_relatorio(data_inicial, data_final, cliente_id)
+    sql += filtros
+    sql += " ORDER BY p.data DESC, p.id, i.id"
+
+    return iter_query(sql, params, db_path=db_path)
+
+
+# --------------------------
+# CACHE DE RESPOSTAS DA IA
+# --------------------------
+
+IA_CACHE_TTL_S = float(os.getenv("THINKIA_IA_CACHE_TTL_H", "24")) * 3600  # Validade de uma resposta
+IA_CACHE_MAX_ENTRADAS = int(os.getenv("THINKIA_IA_CACHE_MAX", "50"))  # Além disso, sai a usada há mais tempo
+
+
+def get_resposta_ia(chave: str, ttl_s: float = IA_CACHE_TTL_S, db_path: str = DB_PATH) -> Optional[str]:
+    """
+    Resposta guardada para a chave, se ainda estiver dentro da validade (ttl_s).
+    A consulta não reserva a escrita; só um acerto (usado_em) ou uma resposta
+    vencida (DELETE) abrem depois uma transação de escrita, curta.
+    """
+    agora = time.time()
+    with read_transaction(db_path) as conn:
+        row = conn.execute("SELECT resposta, criado_em FROM ia_cache WHERE chave = ?", (chave,)).fetchone()
+    if row is None:
+        return None
+    if agora - row[1] > ttl_s:
+        with transaction(db_path) as conn:
+            # criado_em na condição: não apaga uma resposta nova gravada depois da leitura
+            conn.execute("DELETE FROM ia_cache WHERE chave = ? AND criado_em = ?", (chave, row[1]))
+        return None
+    try:
+        with transaction(db_path) as conn:
+            conn.execute("UPDATE ia_cache SET usado_em = ? WHERE chave = ?", (agora, chave))
+    except sqlite3.Error:
+        # usado_em só ordena o descarte das excedentes: a resposta lida continua valendo
+        logger.exception("Falha ao atualizar usado_em no cache de respostas da IA")
+    return row[0]
+
+
+def salvar_resposta_ia(chave: str, modelo: str, resposta: str, ttl_s: float = IA_CACHE_TTL_S,
+                       max_entradas: int = IA_CACHE_MAX_ENTRADAS, db_path: str = DB_PATH) -> None:
+    """Guarda a resposta e descarta as vencidas e as excedentes (as usadas há mais tempo)."""
+    agora = time.time()
+    with transaction(db_path) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO ia_cache (chave, modelo, resposta, criado_em, usado_em) VALUES (?, ?, ?, ?, ?)",
+            (chave, modelo, resposta, agora, agora))
+        conn.execute("DELETE FROM ia_cache WHERE criado_em < ?", (agora - ttl_s,))
+        conn.execute("""
+            DELETE FROM ia_cache
+             WHERE chave NOT IN (SELECT chave FROM ia_cache ORDER BY usado_em DESC LIMIT ?)
+        """, (max_entradas,))
+
+
+def limpar_cache_ia(db_path: str = DB_PATH) -> None:
+    with transaction(db_path) as conn:
+        conn.execute("DELETE FROM ia_cache")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manutenção do banco de dados do ThinkIA")
+    parser.add_argument("--db", default=DB_PATH, help="Caminho do arquivo SQLite")
+    parser.add_argument("--rebuild-resumos", action="store_true",
+                        help="Recalcula as tabelas de resumo do dashboard")
+    parser.add_argument("--limpar-cache-ia", action="store_true",
+                        help="Descarta as respostas da IA guardadas em cache")
+    args = parser.parse_args()
+
+    init_db(args.db)
+    if args.rebuild_resumos:
+        rebuild_resumos(args.db)
+    if args.limpar_cache_ia:
+        limpar_cache_ia(args.db)
+    close_connections()
@@ -0,0 +1,386 @@
+"""
+exportacao.py
+Exportação do relatório de pedidos direto do banco.
+
+As linhas saem de uma única consulta (db.iter_relatorio_detalhado) em streaming
+para o csv.writer ou para as páginas do PDF, sem passar pela lista exibida na
+tela e sem acumular o relatório em memória. Contagem e leitura acontecem na
+mesma transação de leitura (db.read_transaction), então o total do progresso e
+as linhas gravadas vêm do mesmo instantâneo do banco. Feito para rodar fora da
+thread do Tk (DbWorker); o PDF é desenhado em um processo separado e os
+relatórios por cliente (exportar_lote) em um pool de processos.
+"""
+
+import csv
+import gzip
+import os
+import re
+import queue
+import time
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import closing
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+import db
+
+Filtros = Tuple[str, str, Optional[int]]  # (data_inicial, data_final, cliente_id)
+
+CABECALHO_RELATORIO = ["ID Pedido", "Cliente", "Data", "Total", "Produto", "Quantidade", "Preço Unitário Item"]
+
+VERIFICAR_A_CADA = 200  # Linhas gravadas entre verificações de cancelamento/progresso
+INTERVALO_PROGRESSO_S = 0.1  # Intervalo mínimo entre avisos de progresso
+
+
+class ExportacaoCancelada(Exception):
+    """Exportação interrompida pelo usuário; o arquivo parcial é removido."""
+
+
+def linhas_relatorio(filtros: Filtros, db_path: str = db.DB_PATH) -> Iterator[List[Any]]:
+    """
+    Gera as linhas de exportação (uma por item, repetindo os dados do pedido)
+    do relatório com os filtros informados, em streaming a partir do banco.
+    """
+    for pedido_id, cliente_nome, data_pedido, total, produto, quantidade, preco_unit in \
+            db.iter_relatorio_detalhado(*filtros, db_path=db_path):
+        if produto is not None:
+            yield [pedido_id, cliente_nome, data_pedido, total, produto, quantidade, preco_unit]
+        else:
+            # Linha para pedidos sem itens (embora não deva acontecer)
+            yield [pedido_id, cliente_nome, data_pedido, total, "N/A", 0, 0.00]
+
+
+def _abrir_csv(file_path: str, compactar: bool):
+    if compactar:
+        return gzip.open(file_path, "wt", newline="", encoding="utf-8", compresslevel=6)
+    return open(file_path, "w", newline="", encoding="utf-8")
+
+
+def exportar_csv(file_path: str, filtros: Filtros, compactar: bool = False, db_path: str = db.DB_PATH,
+                 on_progress: Optional[Callable[[int, int], None]] = None,
+                 cancelado: Optional[Callable[[], bool]] = None) -> int:
+    """
+    Grava o relatório em CSV (delimitador ';'), compactado com gzip se
+    compactar. on_progress(gravadas, total) é chamado periodicamente, na
+    thread que exporta; se cancelado() retornar True a exportação para com
+    ExportacaoCancelada. Retorna a quantidade de linhas gravadas.
+    """
+    gravadas = 0
+    with db.read_transaction(db_path):
+        total = db.count_relatorio_detalhado(*filtros, db_path=db_path)
+        if on_progress:
+            on_progress(0, total)
+
+        try:
+            with _abrir_csv(file_path, compactar) as f, closing(linhas_relatorio(filtros, db_path)) as linhas:
+                # Usando ';' como delimitador para evitar problemas com vírgulas em números e nomes de produtos
+                writer = csv.writer(f, delimiter=';')
+                writer.writerow(CABECALHO_RELATORIO)
+                ultimo_aviso = time.monotonic()
+                for linha in linhas:
+                    writer.writerow(linha)
+                    gravadas += 1
+                    if gravadas % VERIFICAR_A_CADA:
+                        continue
+                    if cancelado and cancelado():
+                        raise ExportacaoCancelada(f"Exportação cancelada após {gravadas} de {total} linhas.")
+                    agora = time.monotonic()
+                    if on_progress and agora - ultimo_aviso >= INTERVALO_PROGRESSO_S:
+                        on_progress(gravadas, total)
+                        ultimo_aviso = agora
+        except BaseException:
+            # Não deixa um arquivo truncado para trás
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+            raise
+
+    if on_progress:
+        on_progress(gravadas, total)
+    return gravadas
+
+
+# --------------------------
+# PDF (PÁGINA A PÁGINA, EM OUTRO PROCESSO)
+# --------------------------
+
+CABECALHO_PDF = ["ID", "Cliente", "Data", "Total Pedido", "Produto", "Qtd", "Preço Unit."]
+LARGURAS_PDF = (40, 115, 62, 72, 120, 34, 72)  # pt; somam a largura útil da A4 retrato
+MARGEM_PDF = 36
+ALTURA_LINHA_PDF = 14
+ALTURA_TITULO_PDF = 50  # Espaço do título na primeira página
+ALTURA_RODAPE_PDF = 20
+FONTE_PDF = ("Helvetica", 8)
+
+ESPERA_PROCESSO_S = 0.2  # Intervalo de verificação do processo do PDF
+ENCERRAMENTO_PROCESSO_S = 5  # Espera pelo fim do processo antes de forçar o término
+
+
+def _moeda(valor: Any) -> str:
+    return f"R$ {float(valor):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _cortar(texto: Any, largura: float) -> str:
+    """Corta o texto com reticências para caber na coluna (as linhas têm altura fixa)."""
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    texto = str(texto)
+    fonte, tamanho = FONTE_PDF
+    limite = largura - 6  # Descontando o padding da célula
+    if stringWidth(texto, fonte, tamanho) <= limite:
+        return texto
+    while texto and stringWidth(texto + "…", fonte, tamanho) > limite:
+        texto = texto[:-1]
+    return texto + "…"
+
+
+def _linha_pdf(row: List[Any]) -> List[str]:
+    # row: [ID Pedido, Cliente, Data, Total, Produto, Quantidade, Preço Unitário Item]
+    valores = [row[0], row[1], row[2], _moeda(row[3]), row[4], row[5], _moeda(row[6])]
+    return [_cortar(valor, largura) for valor, largura in zip(valores, LARGURAS_PDF)]
+
+
+def _capacidade_pagina(altura: float, primeira: bool) -> int:
+    """Linhas de dados que cabem em uma página (descontando o cabeçalho da tabela)."""
+    disponivel = altura - 2 * MARGEM_PDF - ALTURA_RODAPE_PDF - (ALTURA_TITULO_PDF if primeira else 0)
+    return max(1, int(disponivel // ALTURA_LINHA_PDF) - 1)
+
+
+def gerar_pdf(file_path: str, filtros: Filtros, db_path: str = db.DB_PATH,
+              on_progress: Optional[Callable[[int, int], None]] = None,
+              cancelado: Optional[Callable[[], bool]] = None) -> int:
+    """
+    Desenha o relatório em PDF uma página por vez: cada página recebe uma
+    tabela própria, com o cabeçalho repetido e linhas de altura fixa, então o
+    layout custa o mesmo por página e só uma página de linhas fica em memória
+    (além das páginas já compactadas pelo canvas). Retorna as linhas gravadas.
+    """
+    # ReportLab só é carregado na primeira exportação, fora da abertura do app
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
+    from reportlab.platypus import Table, TableStyle
+
+    largura, altura = A4
+    fonte, tamanho = FONTE_PDF
+    estilo = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0078d4')),  # Azul CTk
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, 1), (-1, -1), fonte),
+        ('FONTSIZE', (0, 0), (-1, -1), tamanho),
+        ('TOPPADDING', (0, 0), (-1, -1), 1),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 1),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+    ])
+
+    gravadas = 0
+    with db.read_transaction(db_path):
+        total = db.count_relatorio_detalhado(*filtros, db_path=db_path)
+        primeira, demais = _capacidade_pagina(altura, True), _capacidade_pagina(altura, False)
+        paginas = 1 + -(-max(0, total - primeira) // demais)
+        if on_progress:
+            on_progress(0, total)
+
+        try:
+            pdf = canvas.Canvas(file_path, pagesize=A4, pageCompression=1)
+            pdf.setTitle("Relatório de Pedidos - ThinkIA")
+            ultimo_aviso = time.monotonic()
+            with closing(linhas_relatorio(filtros, db_path)) as linhas:
+                for pagina in range(1, paginas + 1):
+                    topo = altura - MARGEM_PDF
+                    if pagina == 1:
+                        pdf.setFont("Helvetica-Bold", 16)
+                        pdf.drawString(MARGEM_PDF, topo - 18, "Relatório de Pedidos - ThinkIA")
+                        pdf.setFont("Helvetica", 10)
+                        pdf.drawString(MARGEM_PDF, topo - 36, f"Gerado em: {date.today():%Y-%m-%d}")
+                        topo -= ALTURA_TITULO_PDF
+
+                    bloco = [_linha_pdf(row) for row in islice(linhas, primeira if pagina == 1 else demais)]
+                    tabela = Table([CABECALHO_PDF] + bloco, colWidths=LARGURAS_PDF,
+                                   rowHeights=ALTURA_LINHA_PDF, style=estilo)
+                    _, altura_tabela = tabela.wrapOn(pdf, largura - 2 * MARGEM_PDF, topo - MARGEM_PDF)
+                    tabela.drawOn(pdf, MARGEM_PDF, topo - altura_tabela)
+
+                    pdf.setFont("Helvetica", 8)
+                    pdf.drawRightString(largura - MARGEM_PDF, MARGEM_PDF / 2, f"Página {pagina} de {paginas}")
+                    pdf.showPage()
+
+                    gravadas += len(bloco)
+                    if cancelado and cancelado():
+                        raise ExportacaoCancelada(f"Exportação cancelada após {gravadas} de {total} linhas.")
+                    agora = time.monotonic()
+                    if on_progress and agora - ultimo_aviso >= INTERVALO_PROGRESSO_S:
+                        on_progress(gravadas, total)
+                        ultimo_aviso = agora
+            pdf.save()
+        except BaseException:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+            raise
+
+    if on_progress:
+        on_progress(gravadas, total)
+    return gravadas
+
+
+def _processo_pdf(file_path: str, filtros: Filtros, db_path: str,
+                  mensagens: "multiprocessing.Queue", cancelar: Any) -> None:
+    """Ponto de entrada do processo do PDF: relata progresso e resultado pela fila."""
+    try:
+        linhas = gerar_pdf(file_path, filtros, db_path,
+                           on_progress=lambda gravadas, total: mensagens.put(("progresso", gravadas, total)),
+                           cancelado=cancelar.is_set)
+        mensagens.put(("fim", linhas))
+    except ExportacaoCancelada as e:
+        mensagens.put(("cancelado", str(e)))
+    except BaseException as e:
+        mensagens.put(("erro", f"{type(e).__name__}: {e}"))
+    finally:
+        db.close_connections()
+
+
+def exportar_pdf(file_path: str, filtros: Filtros, db_path: str = db.DB_PATH,
+                 on_progress: Optional[Callable[[int, int], None]] = None,
+                 cancelado: Optional[Callable[[], bool]] = None) -> int:
+    """
+    Gera o PDF (gerar_pdf) em um processo separado, para que o layout do
+    ReportLab não dispute o GIL com a interface, e espera por ele repassando o
+    progresso e o cancelamento. Mesmo contrato de exportar_csv.
+    """
+    # spawn: o processo filho não herda as conexões SQLite abertas neste processo
+    contexto = multiprocessing.get_context("spawn")
+    mensagens = contexto.Queue()
+    cancelar = contexto.Event()
+    processo = contexto.Process(target=_processo_pdf, args=(file_path, filtros, db_path, mensagens, cancelar),
+                                name="exportacao-pdf", daemon=True)
+    processo.start()
+    try:
+        while True:
+            if cancelado and cancelado():
+                cancelar.set()
+            try:
+                mensagem = mensagens.get(timeout=ESPERA_PROCESSO_S)
+            except queue.Empty:
+                if not processo.is_alive():
+                    raise RuntimeError(f"O processo do PDF terminou inesperadamente (código {processo.exitcode}).")
+                continue
+
+            tipo, *dados = mensagem
+            if tipo == "progresso":
+                if on_progress:
+                    on_progress(*dados)
+            elif tipo == "fim":
+                return dados[0]
+            elif tipo == "cancelado":
+                raise ExportacaoCancelada(dados[0])
+            else:
+                raise RuntimeError(dados[0])
+    finally:
+        processo.join(ENCERRAMENTO_PROCESSO_S)
+        if processo.is_alive():
+            processo.terminate()
+
+
+# --------------------------
+# LOTE: UM RELATÓRIO POR CLIENTE (POOL DE PROCESSOS)
+# --------------------------
+
+FORMATOS_LOTE = ("PDF", "CSV")
+
+_RE_NOME_ARQUIVO = re.compile(r"[^\w\-]+")
+
+
+@dataclass
+class ResumoLote:
+    """Resultado de exportar_lote: volume gerado, tempo e falhas (cliente, erro)."""
+    processos: int
+    relatorios: int = 0
+    linhas: int = 0
+    segundos: float = 0.0
+    falhas: List[Tuple[str, str]] = field(default_factory=list)
+
+    def texto(self) -> str:
+        """Resumo legível, com a vazão em relatórios e linhas por segundo."""
+        segundos = max(self.segundos, 1e-9)
+        texto = (f"{self.relatorios} relatórios ({self.linhas} linhas) em {self.segundos:.1f} s "
+                 f"com {self.processos} processos: {self.relatorios / segundos:.1f} relatórios/s, "
+                 f"{self.linhas / segundos:.0f} linhas/s.")
+        if self.falhas:
+            texto += f"\n{len(self.falhas)} falhas:\n" + "\n".join(f"- {nome}: {erro}" for nome, erro in self.falhas)
+        return texto
+
+
+def nome_arquivo_cliente(cliente_id: int, nome: str, data_inicial: str, data_final: str, formato: str) -> str:
+    """Ex.: 12_Maria_Silva_2025-01-01_a_2025-01-31.pdf"""
+    nome = _RE_NOME_ARQUIVO.sub("_", nome).strip("_") or "cliente"
+    return f"{cliente_id}_{nome}_{data_inicial or 'inicio'}_a_{data_final or 'fim'}.{formato.lower()}"
+
+
+def _exportar_cliente(formato: str, file_path: str, filtros: Filtros, db_path: str) -> int:
+    """Tarefa do pool: gera o relatório de um cliente no próprio processo do pool."""
+    if formato == "PDF":
+        return gerar_pdf(file_path, filtros, db_path)
+    return exportar_csv(file_path, filtros, db_path=db_path)
+
+
+def exportar_lote(pasta: str, data_inicial: str, data_final: str, clientes: Iterable[Tuple[int, str]],
+                  formato: str = "PDF", db_path: str = db.DB_PATH, max_workers: Optional[int] = None,
+                  on_progress: Optional[Callable[[int, int], None]] = None,
+                  cancelado: Optional[Callable[[], bool]] = None) -> ResumoLote:
+    """
+    Gera em pasta um relatório (PDF ou CSV) por cliente de clientes, (id, nome),
+    com os filtros de período de query_relatorio_pedidos. Os relatórios são
+    distribuídos em um ProcessPoolExecutor (por padrão um processo por núcleo).
+    Falhas de um cliente não interrompem os demais e ficam no ResumoLote.
+    on_progress(concluidos, total) conta relatórios; se cancelado() retornar
+    True, os relatórios ainda não iniciados são descartados e a exportação para
+    com ExportacaoCancelada.
+    """
+    if formato not in FORMATOS_LOTE:
+        raise ValueError(f"Formato inválido: {formato}")
+    clientes = list(clientes)
+    os.makedirs(pasta, exist_ok=True)
+    processos = max(1, min(max_workers or os.cpu_count() or 1, len(clientes)))
+    resumo = ResumoLote(processos=processos)
+    inicio = time.perf_counter()
+    if on_progress:
+        on_progress(0, len(clientes))
+
+    # spawn: os processos do pool não herdam as conexões SQLite abertas neste processo
+    with ProcessPoolExecutor(max_workers=processos, mp_context=multiprocessing.get_context("spawn")) as executor:
+        pendentes = {
+            executor.submit(_exportar_cliente, formato,
+                            os.path.join(pasta, nome_arquivo_cliente(cliente_id, nome, data_inicial, data_final, formato)),
+                            (data_inicial, data_final, cliente_id), db_path): nome
+            for cliente_id, nome in clientes
+        }
+        while pendentes:
+            if cancelado and cancelado():
+                for futuro in pendentes:
+                    futuro.cancel()
+                raise ExportacaoCancelada(
+                    f"Lote cancelado após {resumo.relatorios + len(resumo.falhas)} de {len(clientes)} relatórios.")
+
+            prontos, _ = wait(pendentes, timeout=ESPERA_PROCESSO_S, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                nome = pendentes.pop(futuro)
+                try:
+                    resumo.linhas += futuro.result()
+                    resumo.relatorios += 1
+                except Exception as e:
+                    resumo.falhas.append((nome, f"{type(e).__name__}: {e}"))
+            if prontos and on_progress:
+                on_progress(resumo.relatorios + len(resumo.falhas), len(clientes))
+
+    resumo.segundos = time.perf_counter() - inicio
+    return resumo
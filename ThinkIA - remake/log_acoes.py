@@ -0,0 +1,552 @@
+"""
+log_acoes.py
+Log de ações estruturado (logs/acoes.jsonl), gravado fora da thread do Tk.
+
+Cada ação é um registro JSON por linha (ver registrar):
+    {"ts": "AAAA-MM-DD HH:MM:SS", "tipo": ..., "entidade": ..., "id": ..., "mensagem": ...}
+Ao lado do log fica um índice esparso (<log>.idx): uma linha por bloco de
+~PASSO_INDICE bytes com o trecho do arquivo, o primeiro e o último horário e as
+chaves de entidade presentes ("pedidos", "pedidos:123"). buscar() usa o índice
+para ler só os blocos que podem conter o período ou a entidade pedidos, em vez
+de percorrer o arquivo inteiro.
+
+registrar só coloca o registro em uma fila; uma thread de fundo junta os
+registros e grava em lote, quando o lote passa de LIMITE_LOTE_BYTES ou
+INTERVALO_FLUSH_S depois do primeiro registro pendente. O arquivo fica aberto
+entre os lotes e é rotacionado por tamanho (LOG_MAX_BYTES, verificado a cada
+lote) ou na virada do dia: o atual é compactado em um .gz com data e hora (o
+índice o acompanha, como <arquivo>.gz.idx) e só os LOG_BACKUPS mais recentes
+são mantidos. flush() espera a gravação do que já foi registrado; close() é
+chamado pelo App ao fechar (e no encerramento do interpretador).
+"""
+
+import atexit
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+LOG_PATH = "logs/acoes.jsonl"
+LOG_MAX_BYTES = int(float(os.getenv("THINKIA_LOG_MAX_MB", "5")) * 1024 * 1024)
+LOG_BACKUPS = int(os.getenv("THINKIA_LOG_BACKUPS", "10"))
+
+INTERVALO_FLUSH_S = 0.5  # Atraso máximo entre registrar uma ação e gravá-la
+LIMITE_LOTE_BYTES = 64 * 1024  # Lote gravado imediatamente ao atingir este tamanho
+ESPERA_FLUSH_S = 5  # Tempo máximo de espera em flush()/close()
+PASSO_INDICE = 64 * 1024  # Tamanho aproximado de cada bloco do índice
+PAGINA_BYTES = 64 * 1024  # Tamanho de cada página lida do fim do log (ler_pagina_anterior)
+LOTE_RESULTADOS = 200  # Resultados de pesquisar() entregues de uma vez
+INTERVALO_RESULTADOS_S = 0.2  # Atraso máximo na entrega de resultados já encontrados
+
+FORMATO_TS = "%Y-%m-%d %H:%M:%S"
+
+# Tipos de registro
+TIPO_INFO = "info"
+TIPO_ERRO = "erro"
+TIPO_CRIACAO = "criacao"
+TIPO_ALTERACAO = "alteracao"
+TIPO_EXCLUSAO = "exclusao"
+TIPO_EXPORTACAO = "exportacao"
+TIPO_IA = "ia"
+
+logger = logging.getLogger(__name__)
+
+_PARAR = object()  # Sinal de encerramento da thread de gravação
+
+Registro = Dict[str, Any]
+Bloco = Dict[str, Any]  # Linha do índice: inicio, fim, ts_ini, ts_fim, chaves
+
+
+def chaves_registro(registro: Registro) -> List[str]:
+    """Chaves de entidade de um registro ("entidade" e "entidade:id", também dos relacionados)."""
+    chaves = []
+    entidades = [(registro.get("entidade"), registro.get("id"))]
+    entidades += list((registro.get("relacionados") or {}).items())
+    for entidade, id in entidades:
+        if entidade:
+            chaves.append(entidade)
+            if id is not None:
+                chaves.append(f"{entidade}:{id}")
+    return chaves
+
+
+def caminho_indice(path: str) -> str:
+    return path + ".idx"
+
+
+class EscritorLog:
+    """Gravação em lote, indexação e rotação de um log JSONL, em uma thread própria."""
+
+    def __init__(self, path: str, max_bytes: int = LOG_MAX_BYTES, backups: int = LOG_BACKUPS,
+                 rotacao_diaria: bool = True, passo_indice: int = PASSO_INDICE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.rotacao_diaria = rotacao_diaria
+        self.passo_indice = passo_indice
+        self._fila: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._atexit = False
+        # Usados só pela thread de gravação
+        self._arquivo = None
+        self._dia: Optional[date] = None
+        self._bloco: Optional[Bloco] = None  # Bloco em formação (ainda fora do índice)
+
+    # --- API (qualquer thread) ---
+
+    def escrever(self, registro: Registro) -> None:
+        """Enfileira o registro para gravação em segundo plano."""
+        self._iniciar()
+        self._fila.put(registro)
+
+    def flush(self, timeout: float = ESPERA_FLUSH_S) -> None:
+        """Espera até que os registros já enfileirados estejam gravados no arquivo."""
+        if self._thread is None:
+            return
+        gravado = threading.Event()
+        self._fila.put(gravado)
+        gravado.wait(timeout)
+
+    def close(self, timeout: float = ESPERA_FLUSH_S) -> None:
+        """Grava o que estiver pendente, fecha o arquivo e encerra a thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._fila.put(_PARAR)
+        thread.join(timeout)
+
+    def _iniciar(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="log-acoes", daemon=True)
+                self._thread.start()
+                if not self._atexit:
+                    # Sem o App (ex.: scripts), garante a gravação ao sair do interpretador
+                    atexit.register(self.close)
+                    self._atexit = True
+
+    # --- Thread de gravação ---
+
+    def _executar(self) -> None:
+        lote: List[Registro] = []
+        tamanho = 0
+        prazo = 0.0
+        while True:
+            try:
+                item = self._fila.get(timeout=max(0.0, prazo - time.monotonic()) if lote else None)
+            except queue.Empty:
+                item = None  # Prazo do lote esgotado
+
+            if isinstance(item, dict):
+                if not lote:
+                    prazo = time.monotonic() + INTERVALO_FLUSH_S
+                lote.append(item)
+                # Estimativa: a mensagem mais os campos fixos da linha
+                tamanho += len(item.get("mensagem") or "") + 100
+                if tamanho < LIMITE_LOTE_BYTES:
+                    continue
+
+            self._gravar(lote)
+            lote, tamanho = [], 0
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _PARAR:
+                self._fechar_bloco()
+                self._fechar_arquivo()
+                return
+
+    def _gravar(self, registros: List[Registro]) -> None:
+        if not registros:
+            return
+        try:
+            linhas = [(json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8") for r in registros]
+            self._rotacionar_se_preciso(sum(len(linha) for linha in linhas))
+            arquivo = self._abrir_arquivo()
+            posicao = arquivo.tell()
+            arquivo.write(b"".join(linhas))
+            arquivo.flush()
+            # O índice só recebe um bloco depois que os dados dele estão no arquivo
+            for registro, linha in zip(registros, linhas):
+                self._acumular(posicao, len(linha), registro)
+                posicao += len(linha)
+        except Exception:
+            logger.exception("Falha ao gravar %d registros no log de ações", len(registros))
+
+    # --- Índice ---
+
+    def _acumular(self, posicao: int, tamanho: int, registro: Registro) -> None:
+        """Inclui a linha em posicao no bloco em formação, fechando-o ao atingir passo_indice."""
+        ts = registro.get("ts")
+        bloco = self._bloco
+        if bloco is None:
+            bloco = self._bloco = {"inicio": posicao, "fim": posicao, "ts_ini": ts, "ts_fim": ts, "chaves": set()}
+        bloco["fim"] = posicao + tamanho
+        if ts:
+            bloco["ts_ini"] = min(bloco["ts_ini"] or ts, ts)
+            bloco["ts_fim"] = max(bloco["ts_fim"] or ts, ts)
+        bloco["chaves"].update(chaves_registro(registro))
+        if bloco["fim"] - bloco["inicio"] >= self.passo_indice:
+            self._fechar_bloco()
+
+    def _fechar_bloco(self) -> None:
+        bloco, self._bloco = self._bloco, None
+        if bloco is None:
+            return
+        bloco["chaves"] = sorted(bloco["chaves"])
+        try:
+            with open(caminho_indice(self.path), "a", encoding="utf-8") as f:
+                f.write(json.dumps(bloco, ensure_ascii=False) + "\n")
+        except OSError:
+            logger.exception("Falha ao gravar o índice do log de ações")
+
+    def _indexar_pendente(self, tamanho: int) -> None:
+        """
+        Ao abrir o log, indexa o trecho depois do último bloco do índice
+        (registros da execução anterior que ainda não fecharam um bloco). Um
+        índice que não bate com o arquivo (ex.: log apagado ou substituído à
+        mão) é descartado e refeito do zero.
+        """
+        blocos = ler_indice(self.path)
+        inicio = blocos[-1]["fim"] if blocos else 0
+        with open(self.path, "rb") as f:
+            if inicio:
+                # O último bloco precisa terminar dentro do arquivo, no fim de uma linha
+                f.seek(inicio - 1)
+                if inicio > tamanho or f.read(1) != b"\n":
+                    logger.warning("Índice do log de ações não corresponde a %s; refazendo", self.path)
+                    os.remove(caminho_indice(self.path))
+                    inicio = 0
+            f.seek(inicio)
+            posicao = inicio
+            for linha in f:
+                if not linha.endswith(b"\n"):
+                    break
+                self._acumular(posicao, len(linha), ler_registro(linha) or {})
+                posicao += len(linha)
+
+    # --- Arquivo e rotação ---
+
+    def _abrir_arquivo(self):
+        if self._arquivo is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._arquivo = open(self.path, "ab")
+            tamanho = self._arquivo.tell()
+            # Dia do arquivo: o da última gravação, se ele já existia
+            self._dia = date.fromtimestamp(os.path.getmtime(self.path)) if tamanho else date.today()
+            # Também com o arquivo vazio: um índice que sobrou de outro arquivo é descartado
+            self._indexar_pendente(tamanho)
+        return self._arquivo
+
+    def _fechar_arquivo(self) -> None:
+        if self._arquivo is not None:
+            try:
+                self._arquivo.close()
+            except OSError:
+                logger.exception("Falha ao fechar o log de ações")
+            self._arquivo = None
+
+    def _rotacionar_se_preciso(self, novos_bytes: int) -> None:
+        arquivo = self._abrir_arquivo()
+        tamanho = arquivo.tell()
+        if not tamanho:
+            return
+        if tamanho + novos_bytes > self.max_bytes or (self.rotacao_diaria and self._dia != date.today()):
+            self.rotacionar()
+
+    def rotacionar(self) -> None:
+        """
+        Arquiva o log atual como <path>.AAAA-MM-DD_HHMMSS.gz (e o índice como
+        <arquivo>.gz.idx) e começa um novo. Chamado pela thread de gravação.
+        """
+        self._fechar_bloco()
+        self._fechar_arquivo()
+        if not os.path.exists(self.path):
+            return
+        base = f"{self.path}.{datetime.now():%Y-%m-%d_%H%M%S}"
+        arquivo_gz = base + ".gz"
+        mesmo_segundo = [a for a in arquivos_rotacionados(self.path) if a.startswith(base)]
+        if mesmo_segundo:
+            # Mais de uma rotação no mesmo segundo: o sufixo segue o do mais recente (nunca
+            # reaproveita o de um já removido), para o nome continuar ordenando pela data
+            sufixo = re.search(r"_(\d+)\.gz$", mesmo_segundo[-1])
+            arquivo_gz = f"{base}_{int(sufixo.group(1)) + 1 if sufixo else 1:03d}.gz"
+        temporario = f"{self.path}.rotacionando"
+        os.replace(self.path, temporario)
+        with open(temporario, "rb") as origem, gzip.open(arquivo_gz, "wb") as destino:
+            shutil.copyfileobj(origem, destino)
+        os.remove(temporario)
+        # As posições do índice continuam valendo para o conteúdo descompactado
+        if os.path.exists(caminho_indice(self.path)):
+            os.replace(caminho_indice(self.path), caminho_indice(arquivo_gz))
+        logger.info("Log de ações arquivado em %s", arquivo_gz)
+
+        # Mantém só os backups mais recentes (o nome ordena pela data)
+        for antigo in arquivos_rotacionados(self.path)[:-self.backups or None]:
+            for caminho in (antigo, caminho_indice(antigo)):
+                try:
+                    if os.path.exists(caminho):
+                        os.remove(caminho)
+                except OSError:
+                    logger.exception("Falha ao remover arquivo de log antigo %s", caminho)
+
+
+def arquivos_rotacionados(path: str = LOG_PATH) -> List[str]:
+    """Arquivos .gz gerados pela rotação de path, do mais antigo ao mais recente."""
+    return sorted(glob.glob(glob.escape(path) + ".*.gz"))
+
+
+escritor = EscritorLog(LOG_PATH)
+
+
+def registrar(mensagem: str, tipo: str = TIPO_INFO, entidade: Optional[str] = None, id: Optional[int] = None,
+              relacionados: Optional[Dict[str, int]] = None) -> None:
+    """
+    Registra uma ação. entidade/id identificam o registro afetado (ex.:
+    "pedidos", 123); relacionados, outros registros envolvidos (ex.: o
+    cliente do pedido), também encontrados por buscar().
+    """
+    registro: Registro = {"ts": datetime.now().strftime(FORMATO_TS), "tipo": tipo,
+                          "entidade": entidade, "id": id, "mensagem": mensagem}
+    if relacionados:
+        registro["relacionados"] = relacionados
+    escritor.escrever(registro)
+
+
+# --------------------------
+# LEITURA E BUSCA
+# --------------------------
+
+def ler_registro(linha: bytes) -> Optional[Registro]:
+    """Registro de uma linha do log, ou None se ela não for um registro válido."""
+    try:
+        registro = json.loads(linha)
+    except ValueError:
+        return None
+    return registro if isinstance(registro, dict) else None
+
+
+def formatar_registro(registro: Registro) -> str:
+    """Linha legível de um registro: [ts] mensagem."""
+    return f"[{registro.get('ts', '')}] {registro.get('mensagem', '')}"
+
+
+def ler_indice(path: str = LOG_PATH) -> List[Bloco]:
+    """Blocos do índice de path, na ordem do arquivo ([] se não houver índice)."""
+    blocos = []
+    try:
+        with open(caminho_indice(path), encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    blocos.append(json.loads(linha))
+                except ValueError:
+                    break  # Linha parcial: o resto do log é tratado como não indexado
+    except FileNotFoundError:
+        pass
+    return blocos
+
+
+def abrir_log(path: str):
+    """Abre um log (ou um arquivo rotacionado .gz) em modo binário."""
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def ler_pagina_anterior(path: str, fim: Optional[int] = None,
+                        tamanho: int = PAGINA_BYTES) -> Tuple[int, int, List[bytes]]:
+    """
+    Lê de trás para frente as linhas completas que terminam até fim (o fim do
+    arquivo, se None), em um bloco de ~tamanho bytes (maior só se uma linha não
+    couber nele). Retorna (início, fim, linhas): início é onde começa a
+    primeira linha lida (0 no começo do arquivo) e a página anterior termina
+    nele; fim exclui uma última linha ainda incompleta.
+    """
+    with open(path, "rb") as f:
+        if fim is None:
+            fim = f.seek(0, os.SEEK_END)
+        inicio = fim
+        while True:
+            inicio = max(0, inicio - tamanho)
+            f.seek(inicio)
+            dados = f.read(fim - inicio)
+            ultima = dados.rfind(b"\n")
+            if inicio == 0:
+                primeira = -1
+                break
+            # Precisa de uma quebra antes da última: o começo de uma linha completa
+            primeira = dados.find(b"\n", 0, max(ultima, 0))
+            if primeira >= 0:
+                break
+            tamanho *= 2  # Linha maior que o bloco
+
+    # Descarta o pedaço da linha que começa antes do bloco e a linha ainda sendo gravada
+    return inicio + primeira + 1, inicio + ultima + 1, dados[primeira + 1:ultima + 1].splitlines()
+
+
+def ler_linhas_novas(path: str, inicio: int, limite: int = LIMITE_LOTE_BYTES * 16) -> Tuple[int, List[bytes]]:
+    """
+    Linhas completas gravadas a partir de inicio (no máximo ~limite bytes por
+    chamada). Retorna (fim, linhas); a próxima leitura continua em fim.
+    """
+    with open(path, "rb") as f:
+        f.seek(inicio)
+        dados = f.read(limite)
+    ultima = dados.rfind(b"\n")
+    if ultima < 0:
+        return inicio, []
+    dados = dados[:ultima + 1]
+    return inicio + len(dados), dados.splitlines()
+
+
+def _fim_do_periodo(fim: Optional[str]) -> Optional[str]:
+    # Uma data sem horário inclui o dia inteiro
+    return f"{fim} 23:59:59" if fim and len(fim) == 10 else fim
+
+
+def trechos_candidatos(path: str, inicio: Optional[str] = None, fim: Optional[str] = None,
+                       chave: Optional[str] = None) -> List[Tuple[int, Optional[int]]]:
+    """
+    Trechos (início, fim) de path que podem ter registros do período
+    [inicio, fim] com a chave de entidade, segundo o índice. O trecho depois do
+    último bloco indexado (fim None: até o fim do arquivo) sempre é incluído.
+    """
+    fim = _fim_do_periodo(fim)
+    blocos = ler_indice(path)
+    trechos: List[Tuple[int, Optional[int]]] = []
+    for bloco in blocos:
+        if inicio and bloco["ts_fim"] and bloco["ts_fim"] < inicio:
+            continue
+        if fim and bloco["ts_ini"] and bloco["ts_ini"] > fim:
+            continue
+        if chave and chave not in bloco["chaves"]:
+            continue
+        if trechos and trechos[-1][1] == bloco["inicio"]:
+            trechos[-1] = (trechos[-1][0], bloco["fim"])  # Blocos vizinhos: uma leitura só
+        else:
+            trechos.append((bloco["inicio"], bloco["fim"]))
+    trechos.append((blocos[-1]["fim"] if blocos else 0, None))
+    return trechos
+
+
+def atende(registro: Registro, inicio: Optional[str] = None, fim: Optional[str] = None,
+           chave: Optional[str] = None) -> bool:
+    """True se o registro é do período [inicio, fim] e tem a chave de entidade."""
+    ts = registro.get("ts") or ""
+    if inicio and ts < inicio:
+        return False
+    if fim and ts > _fim_do_periodo(fim):
+        return False
+    return not chave or chave in chaves_registro(registro)
+
+
+def buscar(inicio: Optional[str] = None, fim: Optional[str] = None, entidade: Optional[str] = None,
+           id: Optional[int] = None, path: str = LOG_PATH,
+           cancelado: Optional[Callable[[], bool]] = None) -> Iterator[Registro]:
+    """
+    Registros de path (log atual ou rotacionado) do período [inicio, fim]
+    ("AAAA-MM-DD" ou "AAAA-MM-DD HH:MM:SS") sobre entidade/id, na ordem do
+    arquivo. Só os blocos indicados pelo índice são lidos. Para assim que
+    cancelado() for True, verificado a cada linha lida (não só nas que atendem
+    aos filtros, que podem ser raras).
+    """
+    chave = f"{entidade}:{id}" if entidade and id is not None else entidade
+    try:
+        f = abrir_log(path)
+    except FileNotFoundError:
+        return
+    with f:
+        for inicio_trecho, fim_trecho in trechos_candidatos(path, inicio, fim, chave):
+            f.seek(inicio_trecho)
+            posicao = inicio_trecho
+            for linha in f:
+                if cancelado is not None and cancelado():
+                    return
+                if fim_trecho is not None and posicao >= fim_trecho:
+                    break
+                posicao += len(linha)
+                if not linha.endswith(b"\n"):
+                    break  # Linha ainda sendo gravada
+                registro = ler_registro(linha)
+                if registro is not None and atende(registro, inicio, fim, chave):
+                    yield registro
+
+
+def _data_rotacao(arquivo: str) -> Optional[str]:
+    """Horário (FORMATO_TS) em que um arquivo rotacionado foi arquivado, pelo nome."""
+    try:
+        carimbo = os.path.basename(arquivo).rsplit(".", 2)[-2][:17]
+        return datetime.strptime(carimbo, "%Y-%m-%d_%H%M%S").strftime(FORMATO_TS)
+    except (IndexError, ValueError):
+        return None
+
+
+def pesquisar(texto: str = "", regex: bool = False, inicio: Optional[str] = None, fim: Optional[str] = None,
+              entidade: Optional[str] = None, id: Optional[int] = None, path: str = LOG_PATH,
+              on_resultados: Optional[Callable[[List[Registro]], None]] = None,
+              on_progress: Optional[Callable[[int, int], None]] = None,
+              cancelado: Optional[Callable[[], bool]] = None) -> int:
+    """
+    Pesquisa no log e nos arquivos rotacionados (do mais antigo ao atual) os
+    registros do período/entidade (como em buscar, usando o índice de cada
+    arquivo) cuja linha "[ts] mensagem" contém todas as palavras de texto,
+    sem diferenciar maiúsculas, ou casa com a expressão regular texto.
+
+    Os registros encontrados são entregues em lotes por on_resultados, à
+    medida que aparecem; on_progress(arquivos lidos, total) acompanha a
+    leitura. Retorna o total encontrado, até o ponto em que cancelado() for True.
+    """
+    padrao = re.compile(texto, re.IGNORECASE) if regex else None  # re.error: expressão inválida
+    palavras = texto.casefold().split()
+
+    def casa(linha: str) -> bool:
+        if padrao is not None:
+            return padrao.search(linha) is not None
+        linha = linha.casefold()
+        return all(palavra in linha for palavra in palavras)
+
+    arquivos = arquivos_rotacionados(path) + [path]
+    encontrados = 0
+    lote: List[Registro] = []
+    proxima_entrega = time.monotonic() + INTERVALO_RESULTADOS_S
+
+    def entregar():
+        nonlocal lote, proxima_entrega
+        if lote and on_resultados:
+            on_resultados(lote)
+        lote = []
+        proxima_entrega = time.monotonic() + INTERVALO_RESULTADOS_S
+
+    for feitos, arquivo in enumerate(arquivos):
+        if on_progress:
+            on_progress(feitos, len(arquivos))
+        if cancelado and cancelado():
+            entregar()
+            return encontrados
+        # Tudo o que está em um arquivo rotacionado é anterior à rotação
+        rotacao = _data_rotacao(arquivo) if arquivo != path else None
+        if inicio and rotacao and rotacao < inicio:
+            continue
+        try:
+            for registro in buscar(inicio, fim, entidade, id, arquivo, cancelado):
+                if not casa(formatar_registro(registro)):
+                    continue
+                encontrados += 1
+                lote.append(registro)
+                if len(lote) >= LOTE_RESULTADOS or time.monotonic() >= proxima_entrega:
+                    entregar()
+        except (OSError, EOFError, gzip.BadGzipFile):
+            logger.exception("Falha ao pesquisar no arquivo de log %s", arquivo)
+    entregar()
+    if on_progress:
+        on_progress(len(arquivos), len(arquivos))
+    return encontrados
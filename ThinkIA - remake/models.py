@@ -27,9 +27,10 @@ class Produto:
 class ItemPedido:
     id: Optional[int]
     pedido_id: Optional[int]
-    produto: str
+    produto: str  # Nome do produto no momento da venda (registro histórico)
     quantidade: int
     preco_unit: float
+    produto_id: Optional[int] = None
 
 
 @dataclass
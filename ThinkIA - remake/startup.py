@@ -0,0 +1,168 @@
+"""
+startup.py
+Medição do tempo de abertura do app.
+
+app.py importa este módulo antes de qualquer outro, de modo que INICIO marca o
+começo da abertura. As fases (marcar) e o tempo até a primeira pintura da
+janela (primeira_pintura) são gravados em STARTUP_LOG_PATH, uma linha JSON por
+abertura, e comparados com STARTUP_BUDGET_MS.
+
+Executado diretamente, gera um relatório no estilo de `python -X importtime`
+para `import app` e confere que os módulos de MODULOS_ADIADOS (SDKs pesados,
+carregados só quando usados) não entram na abertura:
+
+    python startup.py [--top 15] [--budget-ms 1500] [--historico 10]
+"""
+
+import os
+import json
+import time
+import logging
+from typing import Dict, List, Tuple
+
+INICIO = time.perf_counter()
+
+STARTUP_BUDGET_MS = float(os.getenv("THINKIA_STARTUP_BUDGET_MS", "1500"))
+STARTUP_LOG_PATH = "logs/startup.jsonl"
+
+# Dependências opcionais que só devem ser importadas quando a função que as usa roda
+MODULOS_ADIADOS = ("google.genai", "reportlab")
+
+logger = logging.getLogger(__name__)
+
+_fases: Dict[str, float] = {}
+
+
+def _decorrido_ms() -> float:
+    return round((time.perf_counter() - INICIO) * 1000, 1)
+
+
+def marcar(fase: str) -> None:
+    """Registra o tempo decorrido (ms) desde o início da abertura até o fim de fase."""
+    _fases[fase] = _decorrido_ms()
+
+
+def primeira_pintura() -> float:
+    """
+    Registra o tempo até a primeira pintura da janela (time-to-first-paint),
+    grava a abertura em STARTUP_LOG_PATH e avisa se passou do orçamento.
+    Retorna o tempo em ms.
+    """
+    ttfp = _decorrido_ms()
+    registro = {
+        "data": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "ttfp_ms": ttfp,
+        "fases": dict(_fases),
+        "budget_ms": STARTUP_BUDGET_MS,
+    }
+    try:
+        os.makedirs(os.path.dirname(STARTUP_LOG_PATH), exist_ok=True)
+        with open(STARTUP_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    except OSError:
+        logger.exception("Falha ao gravar o tempo de abertura")
+
+    if ttfp > STARTUP_BUDGET_MS:
+        logger.warning("Abertura em %.0f ms, acima do orçamento de %.0f ms (fases: %s)",
+                       ttfp, STARTUP_BUDGET_MS, _fases)
+    else:
+        logger.info("Abertura em %.0f ms (orçamento: %.0f ms)", ttfp, STARTUP_BUDGET_MS)
+    return ttfp
+
+
+def historico(limite: int = 10) -> List[dict]:
+    """Últimas aberturas registradas em STARTUP_LOG_PATH (mais antiga primeiro)."""
+    try:
+        with open(STARTUP_LOG_PATH, encoding="utf-8") as f:
+            linhas = f.readlines()[-limite:]
+    except FileNotFoundError:
+        return []
+    registros = []
+    for linha in linhas:
+        try:
+            registros.append(json.loads(linha))
+        except ValueError:
+            continue
+    return registros
+
+
+# --------------------------
+# RELATÓRIO DE IMPORTS (-X importtime)
+# --------------------------
+
+# (módulo, profundidade, próprio em µs, acumulado em µs)
+ImportTime = Tuple[str, int, int, int]
+
+
+def medir_imports(modulo: str = "app") -> List[ImportTime]:
+    """
+    Importa modulo em um interpretador novo com -X importtime e devolve os
+    tempos de cada import, na ordem em que o Python os relata.
+    """
+    import subprocess
+    import sys
+
+    pasta = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+                          cwd=pasta, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Falha ao importar {modulo}:\n{proc.stderr[-2000:]}")
+
+    tempos = []
+    for linha in proc.stderr.splitlines():
+        if not linha.startswith("import time:"):
+            continue
+        partes = linha[len("import time:"):].split("|")
+        if len(partes) != 3 or not partes[0].strip().isdigit():
+            continue  # Cabeçalho ("self [us] | cumulative | imported package")
+        nome = partes[2].rstrip()
+        profundidade = (len(nome) - len(nome.lstrip())) // 2
+        tempos.append((nome.strip(), profundidade, int(partes[0]), int(partes[1])))
+    return tempos
+
+
+def relatorio_imports(modulo: str = "app", top: int = 15) -> Tuple[float, List[ImportTime], List[str]]:
+    """
+    Resume medir_imports: (total em ms, os top imports mais caros pelo tempo
+    acumulado, módulos de MODULOS_ADIADOS que foram importados).
+    """
+    tempos = medir_imports(modulo)
+    # Os imports de primeiro nível (profundidade 0 relativa) somam o tempo total
+    menor = min((t[1] for t in tempos), default=0)
+    total_ms = sum(t[3] for t in tempos if t[1] == menor) / 1000
+    mais_caros = sorted(tempos, key=lambda t: t[3], reverse=True)[:top]
+    adiados = sorted({t[0] for t in tempos
+                      if any(t[0] == m or t[0].startswith(m + ".") for m in MODULOS_ADIADOS)})
+    return total_ms, mais_caros, adiados
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description="Relatório do tempo de abertura do ThinkIA")
+    parser.add_argument("--modulo", default="app", help="Módulo cuja importação é medida")
+    parser.add_argument("--top", type=int, default=15, help="Quantidade de imports listados")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="Orçamento (ms) para os imports da abertura")
+    parser.add_argument("--historico", type=int, default=10, metavar="N",
+                        help="Mostra as N últimas aberturas registradas")
+    args = parser.parse_args()
+
+    total_ms, mais_caros, adiados = relatorio_imports(args.modulo, args.top)
+
+    print(f"Imports de '{args.modulo}': {total_ms:.1f} ms (orçamento: {args.budget_ms:.0f} ms)")
+    print(f"{'acumulado (ms)':>15} {'próprio (ms)':>13}  módulo")
+    for nome, profundidade, proprio, acumulado in mais_caros:
+        print(f"{acumulado / 1000:>15.1f} {proprio / 1000:>13.1f}  {'  ' * profundidade}{nome}")
+
+    if adiados:
+        print("\nMódulos que deveriam ser carregados só quando usados: " + ", ".join(adiados))
+
+    registros = historico(args.historico)
+    if registros:
+        print("\nÚltimas aberturas (time-to-first-paint):")
+        for registro in registros:
+            print(f"  {registro['data']}  {registro['ttfp_ms']:>8.1f} ms  {registro.get('fases', {})}")
+
+    sys.exit(1 if adiados or total_ms > args.budget_ms else 0)
@@ -0,0 +1,30 @@
+"""
+Fixtures dos testes: cada teste usa um banco SQLite temporário (db_path), sem
+tocar no app.db do projeto.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Banco temporário já migrado; as conexões e o cache são descartados no fim do teste."""
+    path = str(tmp_path / "teste.db")
+    db.init_db(path)
+    yield path
+    db.query_cache.invalidate(path)
+    db.close_connections()
+
+
+@pytest.fixture
+def clientes(db_path):
+    """Insere 5 clientes e devolve seus ids."""
+    return [db.execute("INSERT INTO clientes (nome) VALUES (?)", (f"Cliente {i}",), db_path=db_path)
+            for i in range(5)]
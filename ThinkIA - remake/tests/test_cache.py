@@ -0,0 +1,85 @@
+import sqlite3
+
+import db
+
+SQL_NOMES = "SELECT nome FROM clientes ORDER BY id"
+
+
+def test_reaproveita_ate_a_tabela_ser_escrita(db_path, clientes):
+    primeiro = db.cached_query(SQL_NOMES, db_path=db_path)
+    hits = db.query_cache.hits
+    assert db.cached_query(SQL_NOMES, db_path=db_path) == primeiro
+    assert db.query_cache.hits == hits + 1
+
+    db.execute("UPDATE clientes SET nome = ? WHERE id = ?", ("Novo", clientes[0]), db_path=db_path)
+    assert db.cached_query(SQL_NOMES, db_path=db_path)[0] == ("Novo",)
+
+
+def test_escrita_em_outra_tabela_mantem_a_entrada(db_path, clientes):
+    db.cached_query(SQL_NOMES, db_path=db_path)
+    db.execute("INSERT INTO produtos (nome, preco_unit) VALUES (?, ?)", ("P", 1.0), db_path=db_path)
+    hits = db.query_cache.hits
+    db.cached_query(SQL_NOMES, db_path=db_path)
+    assert db.query_cache.hits == hits + 1
+
+
+def test_cascata_invalida_tabelas_dependentes(db_path, clientes):
+    db.execute("INSERT INTO pedidos (cliente_id, data, total) VALUES (?, ?, ?)",
+               (clientes[0], "2025-01-01", 10.0), db_path=db_path)
+    sql = "SELECT COUNT(*) FROM pedidos"
+    assert db.cached_query(sql, db_path=db_path) == [(1,)]
+    db.execute("DELETE FROM clientes WHERE id = ?", (clientes[0],), db_path=db_path)
+    assert db.cached_query(sql, db_path=db_path) == [(0,)]
+
+
+def test_invalidacao_adiada_ate_o_commit(db_path, clientes):
+    db.cached_query(SQL_NOMES, db_path=db_path)
+    with db.transaction(db_path):
+        db.execute("DELETE FROM clientes", db_path=db_path)
+    assert db.cached_query(SQL_NOMES, db_path=db_path) == []
+
+
+def test_resultado_lido_antes_de_uma_invalidacao_nao_entra_no_cache(db_path, clientes, monkeypatch):
+    query_original = db.query
+
+    def query_com_escrita_no_meio(sql, params=None, db_path=db.DB_PATH):
+        resultado = query_original(sql, params, db_path=db_path)
+        # Escrita (e invalidação) entre a leitura e o put, como faria outra thread
+        db.query_cache.invalidate(db_path, {"clientes"})
+        return resultado
+
+    monkeypatch.setattr(db, "query", query_com_escrita_no_meio)
+    db.cached_query(SQL_NOMES, db_path=db_path)
+    assert db.query_cache.get((db_path, SQL_NOMES, ())) is None
+
+
+def test_geracao_muda_so_para_as_tabelas_invalidadas(db_path):
+    tabelas = frozenset({"clientes"})
+    antes = db.query_cache.geracao(db_path, tabelas)
+    db.query_cache.invalidate(db_path, {"produtos"})
+    assert db.query_cache.geracao(db_path, tabelas) == antes
+    db.query_cache.invalidate(db_path)
+    assert db.query_cache.geracao(db_path, tabelas) != antes
+
+
+# --- Cache de respostas da IA ---
+
+def test_resposta_ia_vencida_e_descartada(db_path):
+    db.salvar_resposta_ia("chave", "modelo", "resposta", db_path=db_path)
+    assert db.get_resposta_ia("chave", db_path=db_path) == "resposta"
+    assert db.get_resposta_ia("chave", ttl_s=-1, db_path=db_path) is None
+    assert db.query("SELECT COUNT(*) FROM ia_cache", db_path=db_path) == [(0,)]
+
+
+def test_resposta_ia_e_lida_com_a_escrita_reservada_por_outra_conexao(db_path):
+    db.salvar_resposta_ia("chave", "modelo", "resposta", db_path=db_path)
+    with db.get_connection(db_path) as conn:
+        conn.execute("PRAGMA busy_timeout = 0")
+    outra = sqlite3.connect(db_path)
+    outra.execute("BEGIN IMMEDIATE")
+    try:
+        # A consulta não disputa a escrita; só a atualização de usado_em fica para trás
+        assert db.get_resposta_ia("chave", db_path=db_path) == "resposta"
+    finally:
+        outra.rollback()
+        outra.close()
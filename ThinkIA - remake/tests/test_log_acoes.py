@@ -0,0 +1,264 @@
+import gzip
+import json
+import os
+import re
+
+import pytest
+
+import log_acoes
+from log_acoes import EscritorLog
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "logs" / "acoes.jsonl")
+
+
+@pytest.fixture
+def novo_escritor(log_path):
+    """Cria escritores em log_path (sem rotação diária) e os encerra no fim do teste."""
+    escritores = []
+
+    def criar(**kwargs):
+        kwargs.setdefault("rotacao_diaria", False)
+        escritor = EscritorLog(log_path, **kwargs)
+        escritores.append(escritor)
+        return escritor
+
+    yield criar
+    for escritor in escritores:
+        escritor.close()
+
+
+def _registro(n, entidade="pedidos", id=None, mensagem=None):
+    return {"ts": f"2024-01-{n // 10 + 1:02d} 10:{n % 60:02d}:00", "tipo": log_acoes.TIPO_INFO,
+            "entidade": entidade, "id": n if id is None else id, "mensagem": mensagem or f"Ação {n}"}
+
+
+def _gravar(escritor, registros):
+    for registro in registros:
+        escritor.escrever(registro)
+    escritor.flush()
+
+
+def _todos(path):
+    with log_acoes.abrir_log(path) as f:
+        return [log_acoes.ler_registro(linha) for linha in f]
+
+
+# --- Gravação e índice ---
+
+def test_indice_cobre_o_arquivo_em_blocos_contiguos(novo_escritor, log_path):
+    escritor = novo_escritor(passo_indice=300)
+    registros = [_registro(n, "pedidos" if n % 2 else "clientes") for n in range(30)]
+    _gravar(escritor, registros)
+    escritor.close()
+
+    assert _todos(log_path) == registros
+    blocos = log_acoes.ler_indice(log_path)
+    assert len(blocos) > 1
+    assert blocos[0]["inicio"] == 0
+    assert all(a["fim"] == b["inicio"] for a, b in zip(blocos, blocos[1:]))
+    # close() fecha o bloco em formação: o índice vai até o fim do arquivo
+    assert blocos[-1]["fim"] == os.path.getsize(log_path)
+    assert blocos[0]["ts_ini"] == registros[0]["ts"]
+    assert "pedidos:1" in blocos[0]["chaves"] and "clientes" in blocos[0]["chaves"]
+
+
+def test_log_existente_sem_indice_e_indexado_ao_reabrir(novo_escritor, log_path):
+    antigos = [_registro(n) for n in range(5)]
+    os.makedirs(os.path.dirname(log_path))
+    with open(log_path, "w", encoding="utf-8") as f:
+        f.writelines(json.dumps(r) + "\n" for r in antigos)
+
+    escritor = novo_escritor(passo_indice=10_000)
+    _gravar(escritor, [_registro(5)])
+    escritor.close()
+
+    blocos = log_acoes.ler_indice(log_path)
+    assert [(b["inicio"], b["fim"]) for b in blocos] == [(0, os.path.getsize(log_path))]
+    assert "pedidos:0" in blocos[0]["chaves"] and "pedidos:5" in blocos[0]["chaves"]
+
+
+@pytest.mark.parametrize("substituto", [b"", b"x" * 5000 + b"\n"], ids=["vazio", "maior"])
+def test_indice_de_log_apagado_ou_substituido_e_refeito(novo_escritor, log_path, substituto):
+    escritor = novo_escritor(passo_indice=100)
+    _gravar(escritor, [_registro(n) for n in range(10)])
+    escritor.close()
+    assert log_acoes.ler_indice(log_path)
+
+    # O log é trocado à mão; o .idx antigo fica para trás
+    os.remove(log_path)
+    with open(log_path, "wb") as f:
+        f.write(substituto)
+    novos = [_registro(n, "clientes", mensagem=f"Novo {n}") for n in range(3)]
+    escritor = novo_escritor(passo_indice=100)
+    _gravar(escritor, novos)
+    escritor.close()
+
+    blocos = log_acoes.ler_indice(log_path)
+    assert blocos[0]["inicio"] == 0 and blocos[-1]["fim"] == os.path.getsize(log_path)
+    assert all(a["fim"] == b["inicio"] for a, b in zip(blocos, blocos[1:]))
+    assert not any("pedidos" in b["chaves"] for b in blocos)  # Nada do índice do arquivo antigo
+    assert list(log_acoes.buscar(entidade="clientes", path=log_path)) == novos
+
+
+# --- buscar ---
+
+def test_buscar_por_entidade_e_periodo_le_so_os_blocos_candidatos(novo_escritor, log_path):
+    escritor = novo_escritor(passo_indice=300)
+    registros = [_registro(n, "pedidos" if n % 3 else "clientes", id=n % 4) for n in range(40)]
+    registros[7]["relacionados"] = {"clientes": 99}
+    _gravar(escritor, registros)
+
+    assert list(log_acoes.buscar(entidade="clientes", path=log_path)) == [
+        r for r in registros if r["entidade"] == "clientes" or r.get("relacionados")]
+    assert list(log_acoes.buscar(entidade="pedidos", id=2, path=log_path)) == [
+        r for r in registros if r["entidade"] == "pedidos" and r["id"] == 2]
+    assert list(log_acoes.buscar(entidade="clientes", id=99, path=log_path)) == [registros[7]]
+    # Data sem horário inclui o dia inteiro
+    assert list(log_acoes.buscar("2024-01-02", "2024-01-03", path=log_path)) == registros[10:30]
+
+    trechos = log_acoes.trechos_candidatos(log_path, "2024-01-04")
+    assert trechos[0][0] > 0
+
+
+def test_buscar_em_log_inexistente_nao_encontra_nada(log_path):
+    assert list(log_acoes.buscar(path=log_path)) == []
+
+
+def test_registrar_usa_o_escritor_do_modulo(novo_escritor, log_path, monkeypatch):
+    monkeypatch.setattr(log_acoes, "escritor", novo_escritor())
+    log_acoes.registrar("Pedido 5 salvo", log_acoes.TIPO_ALTERACAO, "pedidos", 5, {"clientes": 2})
+    log_acoes.escritor.flush()
+
+    registros = list(log_acoes.buscar(entidade="clientes", id=2, path=log_path))
+    assert [(r["mensagem"], r["tipo"], r["id"]) for r in registros] == [
+        ("Pedido 5 salvo", log_acoes.TIPO_ALTERACAO, 5)]
+
+
+# --- Rotação ---
+
+def test_rotacao_compacta_com_indice_e_mantem_os_backups_mais_recentes(novo_escritor, log_path):
+    escritor = novo_escritor(max_bytes=400, backups=2, passo_indice=150)
+    registros = [_registro(n) for n in range(20)]
+    for registro in registros:
+        _gravar(escritor, [registro])
+    escritor.close()
+
+    arquivos = log_acoes.arquivos_rotacionados(log_path)
+    assert len(arquivos) == 2
+    for arquivo in arquivos:
+        assert os.path.exists(log_acoes.caminho_indice(arquivo))
+    indices = [p for p in os.listdir(os.path.dirname(log_path)) if p.endswith(".gz.idx")]
+    assert len(indices) == 2  # Os índices dos arquivos removidos vão junto
+
+    # Os arquivos mantidos e o atual têm os registros mais recentes, em ordem
+    lidos = [r for arquivo in arquivos + [log_path] for r in _todos(arquivo)]
+    assert lidos == registros[-len(lidos):]
+    # O índice continua valendo para o conteúdo descompactado
+    antigo = _todos(arquivos[0])
+    assert list(log_acoes.buscar(entidade="pedidos", id=antigo[-1]["id"], path=arquivos[0])) == [antigo[-1]]
+    with gzip.open(arquivos[0], "rb") as f:
+        assert f.read().endswith(b"\n")
+
+
+# --- pesquisar ---
+
+@pytest.fixture
+def log_com_arquivos(novo_escritor, log_path):
+    """Log com arquivos rotacionados: registros de pedidos e clientes, com mensagens variadas."""
+    escritor = novo_escritor(max_bytes=600, backups=50, passo_indice=200)
+    registros = [_registro(n, "pedidos" if n % 2 else "clientes",
+                           mensagem=f"{'Exclusão' if n % 5 == 0 else 'Alteração'} do registro {n}")
+                 for n in range(30)]
+    for registro in registros:
+        _gravar(escritor, [registro])
+    escritor.close()
+    assert log_acoes.arquivos_rotacionados(log_path)
+    return registros
+
+
+def _pesquisar(log_path, **kwargs):
+    lotes = []
+    progresso = []
+    total = log_acoes.pesquisar(path=log_path, on_resultados=lotes.append,
+                                on_progress=lambda feitos, n: progresso.append((feitos, n)), **kwargs)
+    encontrados = [r for lote in lotes for r in lote]
+    assert total == len(encontrados)
+    return encontrados, progresso
+
+
+def test_pesquisar_por_palavras_em_todos_os_arquivos(log_com_arquivos, log_path):
+    encontrados, progresso = _pesquisar(log_path, texto="REGISTRO exclusão")
+    assert encontrados == [r for r in log_com_arquivos if r["mensagem"].startswith("Exclusão")]
+    n = len(log_acoes.arquivos_rotacionados(log_path)) + 1
+    assert progresso[0] == (0, n) and progresso[-1] == (n, n)
+
+
+def test_pesquisar_com_regex_e_entidade(log_com_arquivos, log_path):
+    encontrados, _ = _pesquisar(log_path, texto=r"registro (1|2)\d$", regex=True, entidade="pedidos")
+    assert [r["id"] for r in encontrados] == [11, 13, 15, 17, 19, 21, 23, 25, 27, 29]
+
+
+def test_pesquisar_regex_invalida(log_path):
+    with pytest.raises(re.error):
+        log_acoes.pesquisar("(", regex=True, path=log_path)
+
+
+def test_pesquisar_para_quando_cancelado(log_com_arquivos, log_path):
+    encontrados, progresso = _pesquisar(log_path, cancelado=lambda: True)
+    assert encontrados == []
+    assert len(progresso) == 1  # Nem chega a concluir o primeiro arquivo
+
+
+def test_pesquisar_sem_ocorrencias_verifica_o_cancelamento_a_cada_linha(log_com_arquivos, log_path):
+    chamadas = []
+
+    def cancelado():
+        chamadas.append(1)
+        return len(chamadas) >= 3
+
+    # Nenhuma linha casa com o texto: o cancelamento não pode depender dos resultados
+    encontrados, progresso = _pesquisar(log_path, texto="inexistente", cancelado=cancelado)
+    assert encontrados == []
+    n = len(log_acoes.arquivos_rotacionados(log_path)) + 1
+    assert progresso == [(0, n), (1, n)]
+    # Início do primeiro arquivo, uma linha lida, o pedido de parada e o início do segundo arquivo
+    assert len(chamadas) == 4
+
+
+# --- Leitura paginada do fim do log ---
+
+def test_ler_pagina_anterior_percorre_o_arquivo_de_tras_para_frente(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    linhas = [f"linha {n}".encode() for n in range(50)] + [b"x" * 200]
+    with open(path, "wb") as f:
+        f.write(b"\n".join(linhas) + b"\nincompleta")
+
+    paginas = []
+    fim = None
+    while fim != 0:
+        inicio, fim_pagina, pagina = log_acoes.ler_pagina_anterior(path, fim, tamanho=40)
+        if fim is None:
+            assert fim_pagina == os.path.getsize(path) - len(b"incompleta")
+        paginas.insert(0, pagina)
+        fim = inicio
+    assert [linha for pagina in paginas for linha in pagina] == linhas
+    # A linha maior que o bloco vem inteira na primeira página lida
+    assert paginas[-1][-1] == b"x" * 200
+
+
+def test_ler_linhas_novas_so_entrega_linhas_completas(tmp_path):
+    path = str(tmp_path / "log.jsonl")
+    with open(path, "wb") as f:
+        f.write(b"a\nb\nc")
+
+    fim, linhas = log_acoes.ler_linhas_novas(path, 0)
+    assert (fim, linhas) == (4, [b"a", b"b"])
+    assert log_acoes.ler_linhas_novas(path, fim) == (fim, [])
+
+    with open(path, "ab") as f:
+        f.write(b"d\ne\n")
+    assert log_acoes.ler_linhas_novas(path, fim) == (9, [b"cd", b"e"])
+    assert log_acoes.ler_linhas_novas(path, 0, limite=3) == (2, [b"a"])
@@ -0,0 +1,154 @@
+import sqlite3
+
+import db
+from models import ItemPedido, Pedido
+
+
+def _resumos(db_path):
+    """Estado atual das tabelas de resumo, em estruturas fáceis de comparar."""
+    return {
+        "global": db.query("SELECT total_clientes, total_pedidos, faturamento_total FROM resumo_global",
+                           db_path=db_path)[0],
+        "diario": db.query("SELECT data, pedidos, faturamento FROM resumo_diario ORDER BY data", db_path=db_path),
+        "clientes": dict(db.query("SELECT cliente_id, total_gasto FROM resumo_clientes WHERE total_gasto != 0",
+                                  db_path=db_path)),
+        "produtos": dict(db.query("SELECT produto_id, quantidade FROM resumo_produtos WHERE quantidade != 0",
+                                  db_path=db_path)),
+    }
+
+
+def _produtos(db_path):
+    return [db.execute("INSERT INTO produtos (nome, preco_unit) VALUES (?, ?)", (nome, preco), db_path=db_path)
+            for nome, preco in (("Caneta", 2.0), ("Caderno", 10.0))]
+
+
+# --- Migrações ---
+
+def test_banco_novo_fica_na_ultima_versao(db_path):
+    assert db.get_schema_version(db_path) == db.SCHEMA_VERSION == db.MIGRACOES[-1][0]
+    tabelas = {r[0] for r in db.query("SELECT name FROM sqlite_master WHERE type = 'table'", db_path=db_path)}
+    assert {"clientes", "produtos", "pedidos", "itens_pedido", "ia_cache"} <= tabelas
+    assert set(db.TABELAS_RESUMO) <= tabelas
+
+
+def test_init_db_em_banco_atualizado_nao_reaplica_migracoes(db_path, clientes):
+    db.init_db(db_path)
+    assert db.get_schema_version(db_path) == db.SCHEMA_VERSION
+    assert db.query("SELECT COUNT(*) FROM clientes", db_path=db_path)[0][0] == len(clientes)
+    assert db.query("SELECT COUNT(*) FROM resumo_global", db_path=db_path)[0][0] == 1
+
+
+def test_migra_banco_antigo_preservando_os_dados(tmp_path):
+    path = str(tmp_path / "antigo.db")
+    conn = sqlite3.connect(path)
+    for numero, _, script in db.MIGRACOES[:3]:
+        conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {numero};\nCOMMIT;")
+    conn.executescript("""
+        INSERT INTO clientes (nome) VALUES ('Ana');
+        INSERT INTO produtos (nome, preco_unit) VALUES ('Caneta', 2.0);
+        INSERT INTO pedidos (cliente_id, data, total) VALUES (1, '2024-01-10', 6.0);
+        INSERT INTO itens_pedido (pedido_id, produto, quantidade, preco_unit) VALUES (1, 'Caneta', 3, 2.0);
+        INSERT INTO itens_pedido (pedido_id, produto, quantidade, preco_unit) VALUES (1, 'Sem cadastro', 1, 0);
+    """)
+    conn.close()
+
+    try:
+        db.init_db(path)
+        assert db.get_schema_version(path) == db.SCHEMA_VERSION
+        # A migração 4 liga os itens aos produtos pelo nome e recalcula resumo_produtos
+        assert db.query("SELECT produto, produto_id FROM itens_pedido ORDER BY id", db_path=path) == [
+            ("Caneta", 1), ("Sem cadastro", None)]
+        assert _resumos(path) == {
+            "global": (1, 1, 6.0),
+            "diario": [("2024-01-10", 1, 6.0)],
+            "clientes": {1: 6.0},
+            "produtos": {1: 3},
+        }
+    finally:
+        db.query_cache.invalidate(path)
+        db.close_connections()
+
+
+# --- Triggers das tabelas de resumo ---
+
+def test_triggers_acompanham_insercao_de_pedidos(db_path, clientes):
+    caneta, caderno = _produtos(db_path)
+    db.salvar_pedidos([
+        Pedido(None, clientes[0], "2024-01-10", 14.0, [ItemPedido(None, None, "Caneta", 2, 2.0, caneta),
+                                                     ItemPedido(None, None, "Caderno", 1, 10.0, caderno)]),
+        Pedido(None, clientes[1], "2024-01-10", 4.0, [ItemPedido(None, None, "Caneta", 2, 2.0)]),
+        Pedido(None, clientes[0], "2024-01-11", 10.0, [ItemPedido(None, None, "Caderno", 1, 10.0, caderno)]),
+    ], db_path=db_path)
+
+    assert _resumos(db_path) == {
+        "global": (5, 3, 28.0),
+        "diario": [("2024-01-10", 2, 18.0), ("2024-01-11", 1, 10.0)],
+        "clientes": {clientes[0]: 24.0, clientes[1]: 4.0},
+        # O segundo item sem produto_id é resolvido pelo nome
+        "produtos": {caneta: 4, caderno: 2},
+    }
+
+
+def test_triggers_acompanham_alteracao_de_pedido(db_path, clientes):
+    caneta, caderno = _produtos(db_path)
+    pedido_id = db.salvar_pedido(
+        Pedido(None, clientes[0], "2024-01-10", 6.0, [ItemPedido(None, None, "Caneta", 3, 2.0, caneta)]),
+        db_path=db_path)
+
+    # Muda cliente, data, total e itens de uma vez
+    db.salvar_pedido(
+        Pedido(pedido_id, clientes[1], "2024-02-01", 20.0, [ItemPedido(None, None, "Caderno", 2, 10.0, caderno)]),
+        db_path=db_path)
+
+    assert _resumos(db_path) == {
+        "global": (5, 1, 20.0),
+        "diario": [("2024-02-01", 1, 20.0)],
+        "clientes": {clientes[1]: 20.0},
+        "produtos": {caderno: 2},
+    }
+
+
+def test_triggers_acompanham_exclusoes_em_cascata(db_path, clientes):
+    caneta, _ = _produtos(db_path)
+    db.salvar_pedidos([
+        Pedido(None, clientes[0], "2024-01-10", 6.0, [ItemPedido(None, None, "Caneta", 3, 2.0, caneta)]),
+        Pedido(None, clientes[1], "2024-01-10", 2.0, [ItemPedido(None, None, "Caneta", 1, 2.0, caneta)]),
+    ], db_path=db_path)
+
+    # Excluir o cliente apaga seus pedidos e itens (ON DELETE CASCADE), e os triggers de cada nível
+    db.execute("DELETE FROM clientes WHERE id = ?", (clientes[0],), db_path=db_path)
+
+    assert _resumos(db_path) == {
+        "global": (4, 1, 2.0),
+        "diario": [("2024-01-10", 1, 2.0)],
+        "clientes": {clientes[1]: 2.0},
+        "produtos": {caneta: 1},
+    }
+
+    db.execute("DELETE FROM pedidos", db_path=db_path)
+    assert _resumos(db_path) == {"global": (4, 0, 0.0), "diario": [], "clientes": {}, "produtos": {}}
+
+
+def test_rebuild_resumos_reproduz_o_estado_dos_triggers(db_path, clientes):
+    caneta, caderno = _produtos(db_path)
+    db.salvar_pedidos([
+        Pedido(None, clientes[0], "2024-01-10", 14.0, [ItemPedido(None, None, "Caneta", 2, 2.0, caneta),
+                                                     ItemPedido(None, None, "Caderno", 1, 10.0, caderno)]),
+        Pedido(None, clientes[2], "2024-01-12", 10.0, [ItemPedido(None, None, "Caderno", 1, 10.0, caderno)]),
+    ], db_path=db_path)
+    esperado = _resumos(db_path)
+
+    db.execute("UPDATE resumo_global SET total_pedidos = 99", db_path=db_path)
+    db.execute("DELETE FROM resumo_diario", db_path=db_path)
+    db.rebuild_resumos(db_path)
+
+    assert _resumos(db_path) == esperado
+
+
+def test_dashboard_ignora_cliente_sem_pedidos_restantes(db_path, clientes):
+    pedido_id = db.salvar_pedido(Pedido(None, clientes[0], "2024-01-10", 6.0), db_path=db_path)
+    assert db.get_dashboard_metrics(db_path)["top_cliente"] == "Cliente 0"
+
+    # resumo_clientes mantém a linha zerada do cliente
+    db.execute("DELETE FROM pedidos WHERE id = ?", (pedido_id,), db_path=db_path)
+    assert db.get_dashboard_metrics(db_path)["top_cliente"] == "N/A"
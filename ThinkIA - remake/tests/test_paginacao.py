@@ -0,0 +1,78 @@
+import db
+
+
+def _todas_as_paginas(get_page, db_path, limit):
+    linhas, after, paginas = [], None, 0
+    while True:
+        pagina, after = get_page(after, limit=limit, db_path=db_path)
+        linhas.extend(pagina)
+        paginas += 1
+        if after is None:
+            return linhas, paginas
+
+
+def test_clientes_por_nome_sem_repetir_nem_pular(db_path):
+    # Nomes repetidos: o id desempata a ordem entre páginas
+    nomes = [f"Cliente {i % 7}" for i in range(53)]
+    db.executemany("INSERT INTO clientes (nome) VALUES (?)", [(n,) for n in nomes], db_path=db_path)
+
+    linhas, paginas = _todas_as_paginas(db.get_clientes_page, db_path, limit=10)
+
+    assert paginas == 6
+    assert [(r[1], r[0]) for r in linhas] == sorted((r[1], r[0]) for r in linhas)
+    assert sorted(r[0] for r in linhas) == list(range(1, 54))
+
+
+def test_pedidos_do_mais_recente_para_o_mais_antigo(db_path, clientes):
+    pedidos = [(clientes[i % 5], f"2025-01-{i % 9 + 1:02d}", 1.0) for i in range(40)]
+    db.executemany("INSERT INTO pedidos (cliente_id, data, total) VALUES (?, ?, ?)", pedidos, db_path=db_path)
+
+    linhas, _ = _todas_as_paginas(db.get_pedidos_page, db_path, limit=7)
+
+    chaves = [(r[2], r[0]) for r in linhas]
+    assert chaves == sorted(chaves, reverse=True)
+    assert len(set(chaves)) == 40
+
+
+def test_ultima_pagina_exata_termina_com_pagina_vazia(db_path, clientes):
+    pagina, after = db.get_clientes_page(limit=5, db_path=db_path)
+    assert len(pagina) == 5 and after is not None
+    pagina, after = db.get_clientes_page(after, limit=5, db_path=db_path)
+    assert pagina == [] and after is None
+
+
+def test_so_a_primeira_pagina_fica_no_cache(db_path):
+    db.executemany("INSERT INTO clientes (nome) VALUES (?)", [(f"C{i:03d}",) for i in range(50)], db_path=db_path)
+    db.query_cache.clear()
+
+    _todas_as_paginas(db.get_clientes_page, db_path, limit=10)
+
+    assert db.get_cache_stats()["entradas"] == 1
+
+
+def test_linhas_dos_pedidos_de_um_cliente_no_formato_da_pagina(db_path, clientes):
+    for cliente_id, data in ((clientes[0], "2024-01-01"), (clientes[1], "2024-01-02"), (clientes[0], "2024-01-03")):
+        db.execute("INSERT INTO pedidos (cliente_id, data, total) VALUES (?, ?, 1)", (cliente_id, data),
+                   db_path=db_path)
+    db.execute("UPDATE clientes SET nome = ? WHERE id = ?", ("Renomeado", clientes[0]), db_path=db_path)
+
+    linhas = db.get_pedido_rows_do_cliente(clientes[0], db_path=db_path)
+    pagina, _ = db.get_pedidos_page(db_path=db_path)
+    assert sorted(linhas) == sorted(row for row in pagina if row[1] == "Renomeado")
+    assert len(linhas) == 2
+
+
+def test_itens_de_varios_pedidos_agrupados_por_pedido(db_path, clientes, monkeypatch):
+    pedidos = [db.execute("INSERT INTO pedidos (cliente_id, data, total) VALUES (?, '2024-01-01', 0)",
+                          (clientes[0],), db_path=db_path) for _ in range(5)]
+    for pedido_id in pedidos[:4]:
+        db.executemany("INSERT INTO itens_pedido (pedido_id, produto, quantidade, preco_unit) VALUES (?, ?, ?, 1)",
+                       [(pedido_id, f"P{pedido_id}-{n}", n) for n in (1, 2)], db_path=db_path)
+    monkeypatch.setattr(db, "MAX_PARAMS_IN", 2)  # Força mais de um bloco de ids
+
+    itens = db.get_itens_por_pedidos(pedidos + pedidos[:1], db_path=db_path)
+
+    assert list(itens) == pedidos
+    assert itens[pedidos[0]] == [(f"P{pedidos[0]}-1", 1, 1.0), (f"P{pedidos[0]}-2", 2, 1.0)]
+    assert itens[pedidos[4]] == []  # Pedido sem itens
+    assert all(itens[p] == db.get_itens_pedido(p, db_path=db_path) for p in pedidos)
@@ -0,0 +1,85 @@
+import sqlite3
+
+import pytest
+
+import db
+
+
+def _nomes(db_path):
+    return [r[0] for r in db.query("SELECT nome FROM clientes ORDER BY id", db_path=db_path)]
+
+
+def test_transacao_confirma_tudo_junto(db_path):
+    with db.transaction(db_path):
+        db.execute("INSERT INTO clientes (nome) VALUES (?)", ("A",), db_path=db_path)
+        db.execute("INSERT INTO clientes (nome) VALUES (?)", ("B",), db_path=db_path)
+    assert _nomes(db_path) == ["A", "B"]
+
+
+def test_erro_desfaz_a_transacao_inteira(db_path):
+    with pytest.raises(RuntimeError):
+        with db.transaction(db_path):
+            db.execute("INSERT INTO clientes (nome) VALUES (?)", ("A",), db_path=db_path)
+            raise RuntimeError("falha")
+    assert _nomes(db_path) == []
+
+
+def test_falha_aninhada_nao_derruba_a_transacao_externa(db_path):
+    with db.transaction(db_path) as conn:
+        db.execute("INSERT INTO clientes (nome) VALUES (?)", ("externo 1",), db_path=db_path)
+        with pytest.raises(sqlite3.IntegrityError):
+            with db.transaction(db_path):
+                db.execute("INSERT INTO clientes (nome) VALUES (?)", ("aninhado",), db_path=db_path)
+                db.execute("INSERT INTO clientes (nome) VALUES (NULL)", db_path=db_path)
+        # Só a unidade aninhada foi desfeita; a externa continua aberta
+        assert conn.in_transaction
+        db.execute("INSERT INTO clientes (nome) VALUES (?)", ("externo 2",), db_path=db_path)
+    assert _nomes(db_path) == ["externo 1", "externo 2"]
+
+
+def test_execute_com_erro_dentro_da_transacao_nao_a_encerra(db_path):
+    with pytest.raises(RuntimeError):
+        with db.transaction(db_path) as conn:
+            db.execute("INSERT INTO clientes (nome) VALUES (?)", ("A",), db_path=db_path)
+            with pytest.raises(sqlite3.IntegrityError):
+                db.execute("INSERT INTO clientes (nome) VALUES (NULL)", db_path=db_path)
+            assert conn.in_transaction
+            db.execute("INSERT INTO clientes (nome) VALUES (?)", ("B",), db_path=db_path)
+            raise RuntimeError("desiste")
+    # Nada foi confirmado sozinho (autocommit) depois do erro
+    assert _nomes(db_path) == []
+
+
+def test_aninhada_confirmada_so_com_a_externa(db_path):
+    with pytest.raises(RuntimeError):
+        with db.transaction(db_path):
+            with db.transaction(db_path):
+                db.execute("INSERT INTO clientes (nome) VALUES (?)", ("A",), db_path=db_path)
+            raise RuntimeError("falha")
+    assert _nomes(db_path) == []
+
+
+# --- Retorno de execute na conexão reaproveitada ---
+
+def test_execute_retorna_rowcount_em_update_e_delete_depois_de_insert(db_path):
+    id_b = None
+    for nome in ("A", "B"):
+        id_b = db.execute("INSERT INTO clientes (nome) VALUES (?)", (nome,), db_path=db_path)
+    assert id_b == 2
+
+    # Mesma thread, mesma conexão: o lastrowid do INSERT anterior não pode vazar
+    assert db.execute("UPDATE clientes SET nome = ? WHERE id = ?", ("X", 99), db_path=db_path) == 0
+    assert db.execute("UPDATE clientes SET email = ?", ("a@b.c",), db_path=db_path) == 2
+    assert db.execute("DELETE FROM clientes WHERE id = ?", (99,), db_path=db_path) == 0
+    assert db.execute("DELETE FROM clientes WHERE id = ?", (1,), db_path=db_path) == 1
+
+
+def test_insert_ignorado_nao_publica_o_id_de_outra_linha(db_path):
+    db.execute("INSERT INTO clientes (id, nome) VALUES (?, ?)", (1, "A"), db_path=db_path)
+    eventos = []
+    token = db.subscribe_changes(eventos.append, ["clientes"])
+    try:
+        assert db.execute("INSERT OR IGNORE INTO clientes (id, nome) VALUES (?, ?)", (1, "B"), db_path=db_path) == 0
+    finally:
+        db.unsubscribe_changes(token)
+    assert [e.id for e in eventos] == [None]
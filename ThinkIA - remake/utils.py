@@ -1,13 +1,15 @@
 import os
-import datetime
+import hashlib
+import sqlite3
+import threading
 import logging
 from tkinter import messagebox
-# Troca: from openai import OpenAI
-from google import genai # Importa o SDK do Google Gemini
-from google.genai.errors import APIError # Importa a classe de erro
-from typing import Any, Optional
+from typing import Any, Dict, Optional
+import db
+import log_acoes
+from log_acoes import (LOG_PATH, escritor, TIPO_INFO, TIPO_ERRO, TIPO_CRIACAO, TIPO_ALTERACAO,
+                        TIPO_EXCLUSAO, TIPO_EXPORTACAO, TIPO_IA)
 
-LOG_PATH = "logs/app.log"
 logger = logging.getLogger(__name__)
 
 
@@ -29,7 +31,7 @@ def erro(master: Any, titulo: str, mensagem: str) -> None:
 
 def log_and_alert(master: Any, titulo: str, mensagem: str) -> None:
     """Registra erro no log e exibe alerta."""
-    registrar_acao(f"ERRO: {mensagem}")
+    registrar_acao(f"ERRO: {mensagem}", TIPO_ERRO)
     messagebox.showerror(titulo, mensagem, parent=master)
 
 
@@ -42,14 +44,14 @@ def confirmar(master: Any, titulo: str, mensagem: str) -> bool:
 # LOGS
 # --------------------------
 
-def registrar_acao(acao: str) -> None:
-    """Registra ação no arquivo de log."""
-    os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
-    try:
-        with open(LOG_PATH, "a", encoding="utf-8") as f:
-            f.write(f"[{datetime.datetime.now():%Y-%m-%d %H:%M:%S}] {acao}\n")
-    except Exception as e:
-        logger.error(f"Falha ao registrar log: {e}")
+def registrar_acao(acao: str, tipo: str = TIPO_INFO, entidade: Optional[str] = None, id: Optional[int] = None,
+                   relacionados: Optional[Dict[str, int]] = None) -> None:
+    """
+    Registra ação no log (logs/acoes.jsonl) como registro estruturado; entidade
+    e id (ex.: "pedidos", 5) permitem buscar depois as ações sobre o registro.
+    A gravação é feita em segundo plano (log_acoes.escritor); o horário é o do registro.
+    """
+    log_acoes.registrar(acao, tipo, entidade, id, relacionados)
 
 def log(msg: str) -> None:
     """Atalho para registrar ação no log."""
@@ -60,11 +62,64 @@ def log(msg: str) -> None:
 # INTEGRAÇÃO COM IA (GEMINI)
 # --------------------------
 
-def analisar_pedidos(pedidos: str) -> Optional[str]:
+GEMINI_MODEL = "gemini-2.5-flash"  # Modelo rápido e eficiente
+
+# Cliente do Gemini reaproveitado entre as análises (conexões HTTP e autenticação
+# mantidas); recriado só se a chave mudar
+_gemini_client: Any = None
+_gemini_api_key: Optional[str] = None
+_gemini_lock = threading.Lock()
+
+
+def get_gemini_client(genai: Any, api_key: str) -> Any:
+    """Cliente do Gemini para api_key, criado na primeira chamada e reaproveitado nas seguintes."""
+    global _gemini_client, _gemini_api_key
+    with _gemini_lock:
+        if _gemini_client is None or _gemini_api_key != api_key:
+            _gemini_client = genai.Client(api_key=api_key)
+            _gemini_api_key = api_key
+        return _gemini_client
+
+
+def chave_cache_ia(prompt: str, modelo: str) -> str:
+    """Impressão digital da análise: hash do modelo e do prompt (que contém os pedidos)."""
+    return hashlib.sha256(f"{modelo}\0{prompt}".encode("utf-8")).hexdigest()
+
+
+def analisar_pedidos(pedidos: str, usar_cache: bool = True) -> Optional[str]:
     """
     Recebe os pedidos formatados como string e gera insights via IA (Gemini).
     A chave deve estar configurada na variável de ambiente GEMINI_API_KEY.
+    Com usar_cache, os mesmos pedidos (e modelo) analisados dentro da validade
+    do cache (db.IA_CACHE_TTL_S) devolvem a resposta guardada, sem chamar a API.
     """
+    model_name = GEMINI_MODEL
+    prompt = (
+        "Você é um excelente analista de vendas. Analise os seguintes pedidos e gere um resumo conciso em português. "
+        "Inclua: produtos mais recorrentes, valor médio, padrões e qualquer insight relevante.\\n\\n"
+        f"{pedidos}"
+    )
+    chave = chave_cache_ia(prompt, model_name)
+
+    if usar_cache:
+        try:
+            texto = db.get_resposta_ia(chave)
+        except sqlite3.Error:
+            logger.exception("Falha ao consultar o cache de respostas da IA")
+            texto = None
+        if texto is not None:
+            registrar_acao("Análise de pedidos reaproveitada do cache (pedidos inalterados).", TIPO_IA)
+            return texto
+
+    # O SDK do Gemini é pesado e só é necessário aqui: importado na primeira análise,
+    # não na abertura do app
+    try:
+        from google import genai  # Importa o SDK do Google Gemini
+        from google.genai.errors import APIError  # Importa a classe de erro
+    except ImportError as e:
+        registrar_acao(f"SDK do Gemini (google-genai) não disponível: {e}", TIPO_ERRO)
+        return None
+
     try:
         # 1. OBTÉM A CHAVE DIRETAMENTE DA VARIÁVEL DE AMBIENTE
         api_key = os.getenv("GEMINI_API_KEY")
@@ -73,15 +128,8 @@ def analisar_pedidos(pedidos: str) -> Optional[str]:
             # Lança um erro se a chave não for encontrada, facilitando a depuração
             raise ValueError("Chave GEMINI_API_KEY não encontrada no ambiente. Configure-a antes de rodar o app.")
 
-        # 2. Inicializa o cliente, passando a chave explicitamente
-        client = genai.Client(api_key=api_key)
-        model_name = "gemini-2.5-flash"  # Modelo rápido e eficiente
-
-        prompt = (
-            "Você é um excelente analista de vendas. Analise os seguintes pedidos e gere um resumo conciso em português. "
-            "Inclua: produtos mais recorrentes, valor médio, padrões e qualquer insight relevante.\\n\\n"
-            f"{pedidos}"
-        )
+        # 2. Cliente persistente, passando a chave explicitamente
+        client = get_gemini_client(genai, api_key)
 
         response = client.models.generate_content(
             model=model_name,
@@ -89,19 +137,23 @@ def analisar_pedidos(pedidos: str) -> Optional[str]:
         )
 
         texto = response.text.strip()
-        registrar_acao("Análise de pedidos realizada via IA (Gemini).")
+        registrar_acao("Análise de pedidos realizada via IA (Gemini).", TIPO_IA)
+        try:
+            db.salvar_resposta_ia(chave, model_name, texto)
+        except sqlite3.Error:
+            logger.exception("Falha ao guardar a resposta da IA no cache")
         return texto
 
     except ValueError as ve:
         # Captura a falha de configuração que definimos
-        registrar_acao(f"Falha na configuração da chave Gemini: {ve}")
+        registrar_acao(f"Falha na configuração da chave Gemini: {ve}", TIPO_ERRO)
         return None
     except APIError as e:
-        registrar_acao(f"Falha na integração com Gemini API: {e}")
+        registrar_acao(f"Falha na integração com Gemini API: {e}", TIPO_ERRO)
         # A API pode retornar 401 Unauthorized se a chave for inválida ou tiver expirado.
         if "API key" in str(e):
             return "Falha na comunicação com a API (código de erro 400+). A chave GEMINI_API_KEY pode estar inválida, incorreta ou expirada."
         return None
     except Exception as e:
-        registrar_acao(f"Falha geral na integração com IA: {e}")
+        registrar_acao(f"Falha geral na integração com IA: {e}", TIPO_ERRO)
         return None
\ No newline at end of file
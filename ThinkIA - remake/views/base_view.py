@@ -0,0 +1,365 @@
+import customtkinter as ctk
+import db
+import utils
+from worker import worker, Job
+from views.virtual_grid import Linha, VirtualGrid
+from typing import Any, Callable, Iterable, List, Optional, Set, Tuple
+
+
+# Intervalo da verificação de alterações externas (PRAGMA data_version) nas listas
+INTERVALO_VERIFICACAO_MS = 2000
+
+
+class AsyncViewMixin:
+    """
+    Mixin para frames CustomTkinter que buscam dados em segundo plano.
+    Fornece run_in_background() e um indicador de carregamento padrão
+    sobreposto ao frame enquanto houver tarefas pendentes.
+    """
+
+    _loading_count = 0
+    _loading_overlay: Optional[ctk.CTkFrame] = None
+    _change_tokens: Optional[List[int]] = None
+    _oculto = False
+    _ao_exibir: Optional[List[Callable[[], None]]] = None
+
+    def run_in_background(self, func: Callable[..., Any], *args: Any,
+                          on_success: Optional[Callable[[Any], None]] = None,
+                          on_error: Optional[Callable[[BaseException], None]] = None,
+                          mensagem: str = "Carregando...", **kwargs: Any) -> Job:
+        """Executa func no DbWorker exibindo o estado de carregamento até a resposta."""
+        self.show_loading(mensagem)
+
+        def sucesso(resultado: Any):
+            self.hide_loading()
+            if on_success:
+                on_success(resultado)
+
+        def falha(erro: BaseException):
+            self.hide_loading()
+            if on_error:
+                on_error(erro)
+            else:
+                utils.log_and_alert(self, "Erro", f"Falha ao carregar dados: {erro}")
+
+        return worker.submit(self, func, *args, on_success=sucesso, on_error=falha, **kwargs)
+
+    def cancel_job(self, job: Optional[Job]) -> None:
+        """Cancela uma tarefa específica ainda não entregue."""
+        if job is not None and worker.is_pending(job):
+            job.cancel()
+            self.hide_loading()
+
+    def cancel_background(self) -> None:
+        """Cancela as tarefas pendentes deste frame e remove o indicador."""
+        worker.cancel_owner(self)
+        self._loading_count = 0
+        self._destroy_overlay()
+
+    # --- Alterações de dados (db.change_bus) ---
+
+    def subscribe_changes(self, callback: Callable[[db.ChangeEvent], None],
+                          entities: Optional[Iterable[str]] = None) -> None:
+        """
+        Recebe os eventos de alteração das tabelas em entities enquanto o frame
+        existir. O callback sempre roda na thread do Tk.
+        """
+        if self._change_tokens is None:
+            self._change_tokens = []
+        self._change_tokens.append(
+            db.subscribe_changes(lambda evento: worker.post(self, callback, evento), entities))
+
+    def unsubscribe_changes(self) -> None:
+        for token in self._change_tokens or ():
+            db.unsubscribe_changes(token)
+        self._change_tokens = None
+
+    def destroy(self) -> None:
+        self.unsubscribe_changes()
+        super().destroy()
+
+    # --- Visibilidade (pool de telas do App) ---
+
+    def on_hide(self) -> None:
+        """Chamado pelo App ao esconder a tela (grid_remove) sem destruí-la."""
+        self._oculto = True
+
+    def on_show(self) -> None:
+        """Chamado pelo App ao reexibir a tela; executa as recargas adiadas enquanto oculta."""
+        self._oculto = False
+        pendentes, self._ao_exibir = self._ao_exibir or [], None
+        for func in pendentes:
+            func()
+
+    def is_hidden(self) -> bool:
+        return self._oculto
+
+    def when_visible(self, func: Callable[[], None]) -> None:
+        """
+        Executa func agora se a tela está visível; se estiver oculta, uma única
+        vez quando voltar a ser exibida (recargas não rodam para telas escondidas).
+        """
+        if not self._oculto:
+            func()
+            return
+        if self._ao_exibir is None:
+            self._ao_exibir = []
+        if func not in self._ao_exibir:
+            self._ao_exibir.append(func)
+
+    # --- Indicador de carregamento ---
+
+    def show_loading(self, mensagem: str = "Carregando...") -> None:
+        self._loading_count += 1
+        if self._loading_overlay is not None:
+            self._loading_label.configure(text=mensagem)
+            return
+
+        self._loading_overlay = ctk.CTkFrame(self, corner_radius=10, fg_color="#2d2d30")
+        self._loading_overlay.place(relx=0.5, rely=0.5, anchor="center")
+
+        self._loading_label = ctk.CTkLabel(self._loading_overlay, text=mensagem, font=ctk.CTkFont(size=14))
+        self._loading_label.grid(row=0, column=0, padx=20, pady=(15, 5))
+
+        self._loading_bar = ctk.CTkProgressBar(self._loading_overlay, mode="indeterminate", width=200)
+        self._loading_bar.grid(row=1, column=0, padx=20, pady=(5, 15))
+        self._loading_bar.start()
+
+    def hide_loading(self) -> None:
+        self._loading_count = max(0, self._loading_count - 1)
+        if self._loading_count == 0:
+            self._destroy_overlay()
+
+    def _destroy_overlay(self) -> None:
+        if self._loading_overlay is not None:
+            self._loading_bar.stop()
+            self._loading_overlay.destroy()
+            self._loading_overlay = None
+
+
+class GridPager:
+    """
+    Fonte de dados paginada para uma VirtualGrid, usando as funções de
+    paginação por chave do db (get_*_page). As linhas já buscadas ficam em
+    memória (apenas as visíveis são formatadas e desenhadas) e a próxima página
+    é buscada em segundo plano quando a grade se aproxima do fim.
+    As linhas devem começar pelo id, usado para descartar repetições.
+
+    A lista assina o db.change_bus: a cada evento de entity só a linha alterada
+    é aplicada (insert_row, update_row, remove_row), relida com fetch_row(id);
+    sort_key/descending reproduzem a ordenação da consulta para posicioná-la.
+
+    Das tabelas de depends_on (ex.: nome do cliente exibido nos pedidos), as
+    inclusões são ignoradas (nenhuma linha exibida aponta para um registro
+    novo) e a alteração de um registro relê só as linhas que dependem dele,
+    com fetch_dependentes(tabela, id). A lista inteira só é recarregada por
+    eventos sem id, pelas demais alterações de depends_on ou quando PRAGMA
+    data_version indica um commit feito fora do app.
+    """
+
+    def __init__(self, view: AsyncViewMixin, grid: VirtualGrid,
+                 fetch_page: Callable[[Optional[Tuple], int], db.Pagina],
+                 format_row: Callable[[Tuple], Linha],
+                 sort_key: Callable[[Tuple], Tuple],
+                 entity: str,
+                 fetch_row: Callable[[Any], Optional[Tuple]],
+                 depends_on: Iterable[str] = (),
+                 fetch_dependentes: Optional[Callable[[str, Any], List[Tuple]]] = None,
+                 descending: bool = False,
+                 count: Optional[Callable[[], int]] = None,
+                 on_count: Optional[Callable[[int], None]] = None,
+                 page_size: int = db.PAGE_SIZE,
+                 mensagem: str = "Carregando..."):
+        self.view = view
+        self.grid = grid
+        self.fetch_page = fetch_page
+        self.format_row = format_row
+        self.sort_key = sort_key
+        self.entity = entity
+        self.fetch_row = fetch_row
+        self.depends_on = tuple(depends_on)
+        self.fetch_dependentes = fetch_dependentes
+        self.descending = descending
+        self.count = count
+        self.on_count = on_count
+        self.page_size = page_size
+        self.mensagem = mensagem
+
+        self.rows: List[Tuple] = []
+        self.total: Optional[int] = None
+        self._ids: Set[Any] = set()
+        self._after: Optional[Tuple] = None
+        self._fim = False
+        self._job: Optional[Job] = None
+        self._count_job: Optional[Job] = None
+        self._data_version: Optional[int] = None
+        self._vigiando = False
+        self._reset_agendado = False
+        self.on_error: Callable[[BaseException], None] = \
+            lambda e: utils.log_and_alert(self.view, "Erro de Carga", f"Falha ao carregar dados: {e}")
+
+        self.grid.on_need_more = self.load_next
+        view.subscribe_changes(self._on_change, (entity, *self.depends_on))
+
+    def reset(self) -> None:
+        """Descarta as linhas carregadas e busca a primeira página (e o total)."""
+        self.view.cancel_job(self._job)
+        self.view.cancel_job(self._count_job)
+        self._reset_agendado = False
+        self._job = None
+        self._after = None
+        self._fim = False
+        self.rows = []
+        self._ids = set()
+        self._data_version = db.get_data_version()
+        self.grid.set_source(lambda: len(self.rows), self._linhas)
+        self.load_next()
+
+        if self.count and self.on_count:
+            self._count_job = self.view.run_in_background(
+                self.count, on_success=self._set_total, on_error=self.on_error, mensagem=self.mensagem)
+
+        if not self._vigiando:
+            self._vigiando = True
+            self.grid.after(INTERVALO_VERIFICACAO_MS, self._vigiar)
+
+    def load_next(self) -> None:
+        """Busca a próxima página, se houver e se nenhuma estiver a caminho."""
+        if self._fim or (self._job is not None and worker.is_pending(self._job)):
+            return
+        self._job = self.view.run_in_background(
+            self.fetch_page, self._after, self.page_size,
+            on_success=self._append, on_error=self.on_error, mensagem=self.mensagem)
+
+    def _linhas(self, inicio: int, fim: int) -> List[Linha]:
+        return [self.format_row(row) for row in self.rows[inicio:fim]]
+
+    def _append(self, pagina: db.Pagina) -> None:
+        rows, proxima = pagina
+        for row in rows:
+            if row[0] not in self._ids:
+                self._ids.add(row[0])
+                self.rows.append(row)
+        self._after = proxima
+        self._fim = proxima is None
+        self.grid.refresh()
+
+    def _set_total(self, total: int) -> None:
+        self.total = total
+        if self.on_count:
+            self.on_count(total)
+
+    # --- Atualização incremental ---
+
+    def _on_change(self, evento: db.ChangeEvent) -> None:
+        if self._reset_agendado:
+            return
+        if evento.entity in self.depends_on and evento.id is not None:
+            if evento.operation == db.OP_INSERT:
+                return
+            if evento.operation == db.OP_UPDATE and self.fetch_dependentes is not None:
+                self.update_rows(self.fetch_dependentes(evento.entity, evento.id))
+                return
+        if evento.entity != self.entity or evento.id is None:
+            # Vários eventos do mesmo COMMIT resultam em uma única recarga,
+            # adiada até a tela ser exibida se ela estiver oculta
+            self._reset_agendado = True
+            self.view.when_visible(lambda: self.grid.after_idle(self.reset))
+        elif evento.operation == db.OP_DELETE:
+            self.remove_row(evento.id)
+        else:
+            row = self.fetch_row(evento.id)
+            if row is None:
+                self.remove_row(evento.id)
+            elif evento.operation == db.OP_INSERT:
+                self.insert_row(row)
+            else:
+                self.update_row(row)
+
+    def check_external(self) -> bool:
+        """Recarrega a lista se outra conexão alterou o banco desde a última carga."""
+        if db.get_data_version() != self._data_version:
+            self.reset()
+            return True
+        return False
+
+    def _vigiar(self) -> None:
+        try:
+            if not self.grid.winfo_exists():
+                return
+        except Exception:
+            return
+        self.view.when_visible(self.check_external)
+        self.grid.after(INTERVALO_VERIFICACAO_MS, self._vigiar)
+
+    def insert_row(self, row: Tuple) -> None:
+        """Inclui uma linha recém-gravada na posição da ordenação."""
+        if self.check_external():
+            return
+        if row[0] in self._ids:
+            self.update_row(row)
+            return
+        self._posicionar(row)
+        self._ajustar_total(1)
+        self.grid.refresh()
+
+    def update_row(self, row: Tuple) -> None:
+        """Substitui a linha de mesmo id, movendo-a se a chave de ordenação mudou."""
+        if self.check_external():
+            return
+        self._remover(row[0])
+        self._posicionar(row)
+        self.grid.refresh()
+
+    def update_rows(self, rows: List[Tuple]) -> None:
+        """Substitui, em uma passada, as linhas já carregadas que estão em rows."""
+        if self.check_external():
+            return
+        novas = {row[0]: row for row in rows if row[0] in self._ids}
+        if not novas:
+            return
+        reordenar = False
+        for indice, row in enumerate(self.rows):
+            nova = novas.get(row[0])
+            if nova is not None:
+                reordenar = reordenar or self.sort_key(nova) != self.sort_key(row)
+                self.rows[indice] = nova
+        if reordenar:
+            self.rows.sort(key=self.sort_key, reverse=self.descending)
+        self.grid.refresh()
+
+    def remove_row(self, id: Any) -> None:
+        """Retira a linha do id excluído."""
+        if self.check_external():
+            return
+        self._remover(id)
+        self._ajustar_total(-1)
+        self.grid.refresh()
+
+    def _posicionar(self, row: Tuple) -> None:
+        chave = self.sort_key(row)
+        inicio, fim = 0, len(self.rows)
+        while inicio < fim:
+            meio = (inicio + fim) // 2
+            chave_meio = self.sort_key(self.rows[meio])
+            if (chave_meio > chave) if self.descending else (chave_meio < chave):
+                inicio = meio + 1
+            else:
+                fim = meio
+        # Depois da última linha carregada, a linha virá com a próxima página
+        if inicio < len(self.rows) or self._fim:
+            self.rows.insert(inicio, row)
+            self._ids.add(row[0])
+
+    def _remover(self, id: Any) -> None:
+        if id not in self._ids:
+            return
+        self._ids.discard(id)
+        for indice, row in enumerate(self.rows):
+            if row[0] == id:
+                del self.rows[indice]
+                break
+
+    def _ajustar_total(self, delta: int) -> None:
+        if self.total is not None:
+            self._set_total(self.total + delta)
@@ -1,12 +1,14 @@
 import customtkinter as ctk
-from tkinter import ttk, StringVar, END
+from tkinter import StringVar, END
 import db
 import utils
 from models import Cliente
+from views.base_view import AsyncViewMixin, GridPager
+from views.virtual_grid import VirtualGrid
 from typing import List, Tuple, Optional, Any
 
 
-class ClientesFrame(ctk.CTkFrame):
+class ClientesFrame(AsyncViewMixin, ctk.CTkFrame):
     def __init__(self, master: ctk.CTkFrame):
         super().__init__(master)
         self.grid_columnconfigure(0, weight=1)
@@ -38,32 +40,29 @@ class ClientesFrame(ctk.CTkFrame):
         tree_frame.grid_columnconfigure(0, weight=1)
         tree_frame.grid_rowconfigure(0, weight=1)
 
-        columns = ("id", "nome", "email", "telefone")
-        self.tree = ttk.Treeview(
-            tree_frame,
-            columns=columns,
-            show="headings",
-            style="Treeview"  # Usa o estilo dark configurado em main.py
+        # Grade virtual: só as linhas visíveis são desenhadas (usa o estilo dark de app.py)
+        columns = [
+            ("id", "ID", 30, "center"),
+            ("nome", "Nome", 200, "w"),
+            ("email", "E-mail", 150, "w"),
+            ("telefone", "Telefone", 100, "center"),
+        ]
+        self.tabela = VirtualGrid(tree_frame, columns, on_select=self.on_select)
+        self.tabela.grid(row=0, column=0, sticky="nsew")
+
+        # Total de registros (as linhas são carregadas por página conforme a rolagem)
+        self.contagem_label = ctk.CTkLabel(tree_frame, text="", anchor="w")
+        self.contagem_label.grid(row=1, column=0, sticky="ew", padx=5)
+
+        self.pager = GridPager(
+            self, self.tabela,
+            fetch_page=db.get_clientes_page,
+            format_row=lambda row: (row[0], tuple("" if v is None else v for v in row)),
+            sort_key=lambda row: (row[1], row[0]),  # ORDER BY nome, id
+            entity="clientes", fetch_row=db.get_cliente_row,
+            count=db.count_clientes,
+            on_count=lambda total: self.contagem_label.configure(text=f"{total} cliente(s)"),
         )
-        self.tree.grid(row=0, column=0, sticky="nsew")
-
-        # Configurações das colunas
-        self.tree.heading("id", text="ID")
-        self.tree.column("id", width=30, anchor="center")
-        self.tree.heading("nome", text="Nome")
-        self.tree.column("nome", width=200, anchor="w")
-        self.tree.heading("email", text="E-mail")
-        self.tree.column("email", width=150, anchor="w")
-        self.tree.heading("telefone", text="Telefone")
-        self.tree.column("telefone", width=100, anchor="center")
-
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        scrollbar.grid(row=0, column=1, sticky="ns")
-        self.tree.configure(yscrollcommand=scrollbar.set)
-
-        # Bind para seleção
-        self.tree.bind("<<TreeviewSelect>>", self.on_select)
 
     # --- Formulário CRUD ---
 
@@ -114,37 +113,21 @@ class ClientesFrame(ctk.CTkFrame):
     # --- Lógica CRUD ---
 
     def load_clientes(self):
-        """Carrega todos os clientes do banco e preenche a Treeview."""
-        # Limpa Treeview
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        """Recarrega a lista a partir da primeira página de clientes (ordem por nome)."""
+        self.pager.reset()
 
-        try:
-            # Assumindo que db.query retorna (id, nome, email, telefone)
-            clientes = db.query("SELECT id, nome, email, telefone FROM clientes ORDER BY nome")
-            for row in clientes:
-                self.tree.insert("", "end", iid=row[0], values=row)
-        except Exception as e:
-            utils.log_and_alert(self, "Erro de Carga", f"Falha ao carregar clientes: {e}")
-
-    def on_select(self, event: Any):
+    def on_select(self, linha: Tuple[Any, Tuple]):
         """Preenche o formulário quando uma linha é selecionada."""
-        selected_item = self.tree.focus()
-        if selected_item:
-            values = self.tree.item(selected_item, 'values')
-            if values:
-                self.current_cliente_id = int(values[0])
-                self.nome_entry.delete(0, END)
-                self.nome_entry.insert(0, values[1])
-                self.email_entry.delete(0, END)
-                self.email_entry.insert(0, values[2])
-                self.telefone_entry.delete(0, END)
-                self.telefone_entry.insert(0, values[3])
-
-                self.set_buttons_state("edit")
-        else:
-            self.set_buttons_state("add")
-            self.clear_form()
+        values = linha[1]
+        self.current_cliente_id = int(values[0])
+        self.nome_entry.delete(0, END)
+        self.nome_entry.insert(0, values[1])
+        self.email_entry.delete(0, END)
+        self.email_entry.insert(0, values[2])
+        self.telefone_entry.delete(0, END)
+        self.telefone_entry.insert(0, values[3])
+
+        self.set_buttons_state("edit")
 
     def add_cliente(self):
         nome = self.nome_entry.get().strip()
@@ -162,10 +145,10 @@ class ClientesFrame(ctk.CTkFrame):
                 (novo_cliente.nome, novo_cliente.email, novo_cliente.telefone)
             )
 
-            self.load_clientes()
             self.clear_form()
             utils.info(self, "Sucesso", f"Cliente '{nome}' adicionado com ID {cliente_id}.")
-            utils.registrar_acao(f"Cliente adicionado: {nome} (ID: {cliente_id})")
+            utils.registrar_acao(f"Cliente adicionado: {nome} (ID: {cliente_id})", utils.TIPO_CRIACAO,
+                                 "clientes", cliente_id)
 
         except Exception as e:
             utils.log_and_alert(self, "Erro de Inserção", f"Falha ao adicionar cliente: {e}")
@@ -189,10 +172,11 @@ class ClientesFrame(ctk.CTkFrame):
                 (nome, email, telefone, self.current_cliente_id)
             )
 
-            self.load_clientes()
+            cliente_id = self.current_cliente_id
             self.clear_form()
-            utils.info(self, "Sucesso", f"Cliente '{nome}' (ID: {self.current_cliente_id}) atualizado.")
-            utils.registrar_acao(f"Cliente atualizado: {nome} (ID: {self.current_cliente_id})")
+            utils.info(self, "Sucesso", f"Cliente '{nome}' (ID: {cliente_id}) atualizado.")
+            utils.registrar_acao(f"Cliente atualizado: {nome} (ID: {cliente_id})", utils.TIPO_ALTERACAO,
+                                 "clientes", cliente_id)
 
         except Exception as e:
             utils.log_and_alert(self, "Erro de Atualização", f"Falha ao atualizar cliente: {e}")
@@ -207,12 +191,13 @@ class ClientesFrame(ctk.CTkFrame):
         if utils.confirmar(self, "Confirmação",
                            f"Tem certeza que deseja deletar o cliente '{cliente_nome}' (ID: {self.current_cliente_id})?\nIsso pode deletar pedidos relacionados."):
             try:
-                db.execute("DELETE FROM clientes WHERE id = ?", (self.current_cliente_id,))
+                cliente_id = self.current_cliente_id
+                db.execute("DELETE FROM clientes WHERE id = ?", (cliente_id,))
 
-                self.load_clientes()
                 self.clear_form()
                 utils.info(self, "Sucesso", f"Cliente '{cliente_nome}' deletado.")
-                utils.registrar_acao(f"Cliente deletado: {cliente_nome} (ID: {self.current_cliente_id})")
+                utils.registrar_acao(f"Cliente deletado: {cliente_nome} (ID: {cliente_id})", utils.TIPO_EXCLUSAO,
+                                     "clientes", cliente_id)
 
             except Exception as e:
                 utils.log_and_alert(self, "Erro de Exclusão", f"Falha ao deletar cliente: {e}")
@@ -226,9 +211,8 @@ class ClientesFrame(ctk.CTkFrame):
         self.email_entry.delete(0, END)
         self.telefone_entry.delete(0, END)
 
-        # Remove seleção da Treeview
-        for item in self.tree.selection():
-            self.tree.selection_remove(item)
+        # Remove seleção da lista
+        self.tabela.clear_selection()
 
         self.set_buttons_state("add")
 
@@ -1,10 +1,11 @@
 import customtkinter as ctk
 import db
 import utils
+from views.base_view import AsyncViewMixin
 from typing import Dict, Any
 
 
-class DashboardFrame(ctk.CTkFrame):
+class DashboardFrame(AsyncViewMixin, ctk.CTkFrame):
     def __init__(self, master: ctk.CTkFrame):
         super().__init__(master)
         self.grid_columnconfigure(0, weight=1)
@@ -27,39 +28,28 @@ class DashboardFrame(ctk.CTkFrame):
         self.detail_frame.grid_columnconfigure((0, 1), weight=1, uniform="metric_detail")
         self.detail_frame.grid_rowconfigure((0, 1), weight=1)  # Garante que os cards internos tenham altura decente
 
+        # Métricas recalculadas quando pedidos, itens, clientes ou produtos mudam
+        self._recarga_agendada = False
+        self.subscribe_changes(self.on_data_change, ("clientes", "pedidos", "itens_pedido", "produtos"))
+
         self.load_metrics()
 
+    def on_data_change(self, evento: db.ChangeEvent):
+        """
+        Agenda uma única recarga para todos os eventos de um mesmo COMMIT (ou,
+        com o dashboard oculto, para quando ele voltar a ser exibido).
+        """
+        if not self._recarga_agendada:
+            self._recarga_agendada = True
+            self.when_visible(lambda: self.after_idle(self.load_metrics))
+
     def get_metrics(self) -> Dict[str, Any]:
-        """Calcula métricas agregadas do banco de dados."""
+        """Lê as métricas agregadas do banco de dados."""
         metrics = {}
         try:
-            # [cite_start]Total de Clientes [cite: 33]
-            metrics['total_clientes'] = db.query("SELECT COUNT(id) FROM clientes")[0][0]
-
-            # [cite_start]Total de Pedidos [cite: 31]
-            metrics['total_pedidos'] = db.query("SELECT COUNT(id) FROM pedidos")[0][0]
-
-            # [cite_start]Faturamento Total [cite: 31]
-            metrics['faturamento_total'] = db.query("SELECT SUM(total) FROM pedidos")[0][0] or 0.0
-
-            # [cite_start]Produtos Mais Vendidos (Top 1) [cite: 30]
-            top_produto = db.query("""
-                                   SELECT produto, SUM(quantidade) AS total_vendido
-                                   FROM itens_pedido
-                                   GROUP BY produto
-                                   ORDER BY total_vendido DESC LIMIT 1
-                                   """)
-            metrics['top_produto'] = top_produto[0][0] if top_produto else "N/A"
-
-            # [cite_start]Cliente com Maior Gasto [cite: 31, 33]
-            top_cliente = db.query("""
-                                   SELECT c.nome, SUM(p.total) AS total_gasto
-                                   FROM pedidos p
-                                            JOIN clientes c ON p.cliente_id = c.id
-                                   GROUP BY c.id
-                                   ORDER BY total_gasto DESC LIMIT 1
-                                   """)
-            metrics['top_cliente'] = top_cliente[0][0] if top_cliente and top_cliente[0][0] else "N/A"
+            # Totais, produto mais vendido e cliente com maior gasto vêm das tabelas
+            # de resumo mantidas por triggers (db.rebuild_resumos reconcilia divergências)
+            metrics = db.get_dashboard_metrics()
 
         except Exception as e:
             utils.log(f"Erro ao calcular métricas do dashboard: {e}")
@@ -99,16 +89,20 @@ class DashboardFrame(ctk.CTkFrame):
         return card
 
     def load_metrics(self):
-        """Preenche o dashboard com as métricas calculadas."""
+        """Calcula as métricas em segundo plano e preenche o dashboard ao terminar."""
+        self._recarga_agendada = False
+        self.run_in_background(self.get_metrics, on_success=self.render_metrics,
+                               mensagem="Calculando métricas...")
 
-        # Limpa frames de métricas existentes
+    def render_metrics(self, metrics: Dict[str, Any]):
+        """Cria os cards com as métricas já calculadas."""
+
+        # Limpa os cards anteriores só agora, para não piscar durante o cálculo
         for widget in self.top_metrics_frame.winfo_children():
             widget.destroy()
         for widget in self.detail_frame.winfo_children():
             widget.destroy()
 
-        metrics = self.get_metrics()
-
         # --- CARDS PRINCIPAIS (3 COLUNAS) ---
 
         # 1. Total de Clientes
@@ -1,40 +1,368 @@
 import customtkinter as ctk
 import os
+import re
+import threading
+from datetime import datetime
 import utils
-from typing import Any
+import log_acoes
+from log_acoes import (escritor, ler_registro, formatar_registro, ler_pagina_anterior, ler_linhas_novas,
+                       PAGINA_BYTES)
+from worker import tarefas_longas
+from typing import List, Optional, Tuple
+
+INTERVALO_TAIL_MS = 1000  # Verificação de novas linhas no log (como tail -f)
+MAX_ATRASO_BYTES = PAGINA_BYTES * 16  # Mais que isso de linhas novas: recarrega do fim em vez de acrescentar
+MAX_RESULTADOS_EXIBIDOS = 5000  # A pesquisa continua contando além disso, mas só exibe estes
+ENTIDADES = ("Todas", "clientes", "produtos", "pedidos")
+
+
+def _pesquisar_gravado(*args, **kwargs) -> int:
+    """log_acoes.pesquisar depois de gravar as ações ainda na fila (flush espera o escritor, fora do Tk)."""
+    escritor.flush()
+    return log_acoes.pesquisar(*args, **kwargs)
 
 
 class HistoricoView(ctk.CTkFrame):
+    """
+    Histórico do log de ações. O log é lido do fim para o começo em páginas
+    de PAGINA_BYTES: a abertura mostra só a página mais recente, as anteriores
+    são carregadas ao rolar até o topo e as linhas gravadas depois são
+    acrescentadas a cada INTERVALO_TAIL_MS enquanto a tela está visível.
+
+    A barra de pesquisa procura texto, expressão regular, período e
+    entidade/ID no log e nos arquivos rotacionados (log_acoes.pesquisar) em
+    segundo plano; os resultados aparecem à medida que são encontrados.
+    """
+
     def __init__(self, master: ctk.CTkFrame):
         super().__init__(master)
         self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(1, weight=1)
+        self.grid_rowconfigure(2, weight=1)
 
-        ctk.CTkLabel(self, text="Histórico de Ações (logs/app.log)", font=ctk.CTkFont(size=24, weight="bold")).grid(
+        ctk.CTkLabel(self, text=f"Histórico de Ações ({utils.LOG_PATH})", font=ctk.CTkFont(size=24, weight="bold")).grid(
             row=0, column=0, pady=(10, 10), sticky="w")
 
         # Botão para Recarregar (melhoria de UX)
         reload_button = ctk.CTkButton(self, text="Recarregar Log", command=self.load_log)
-        reload_button.grid(row=0, column=0, pady=(10, 10), padx=10, sticky="e")
+        reload_button.grid(row=0, column=0, columnspan=2, pady=(10, 10), padx=10, sticky="e")
+
+        self.create_search_widgets()
+
+        # Barra de rolagem própria: o topo da rolagem dispara a carga da página anterior
+        self.textbox = ctk.CTkTextbox(self, wrap="none", font=("Consolas", 10),  # Wrap="none" para logs longos
+                                      activate_scrollbars=False)
+        self.textbox.grid(row=2, column=0, sticky="nsew", padx=(10, 0), pady=10)
+        self.scrollbar = ctk.CTkScrollbar(self, command=self.textbox.yview)
+        self.scrollbar.grid(row=2, column=1, sticky="ns", padx=(0, 10), pady=10)
+        self.textbox.configure(yscrollcommand=self.on_scroll)
+
+        # Resultados da pesquisa: ocupam o lugar do log enquanto exibidos
+        self.resultados_box = ctk.CTkTextbox(self, wrap="none", font=("Consolas", 10))
+        self.resultados_box.grid(row=2, column=0, columnspan=2, sticky="nsew", padx=10, pady=10)
+        self.resultados_box.grid_remove()
 
-        self.textbox = ctk.CTkTextbox(self, wrap="none", font=("Consolas", 10))  # Wrap="none" para logs longos
-        self.textbox.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
+        self._inicio = 0  # Posição (bytes) no log da linha mais antiga exibida
+        self._fim = 0  # Posição logo depois da linha mais recente exibida
+        self._arquivo_id: Optional[Tuple[int, int]] = None  # Muda quando o log é rotacionado
+        self._carregando_anterior = False
+        self._tail_job = None
+        self._busca_cancel: Optional[threading.Event] = None  # Identifica a pesquisa em curso
+        self._busca_total = 0
 
         self.load_log()
+        self._agendar_tail()
+
+    def on_show(self):
+        """
+        Chamado pelo App ao reexibir a tela: acrescenta o que foi gravado enquanto
+        estava oculta. Só lê o que já está no arquivo (sem esperar o escritor, que
+        pode estar compactando uma rotação); o restante chega pelo tail.
+        """
+        self.seguir_log()
+        self._agendar_tail()
+
+    def on_hide(self):
+        self._cancelar_tail()
+
+    def destroy(self):
+        self._cancelar_tail()
+        if self._busca_cancel is not None:
+            self._busca_cancel.set()
+        super().destroy()
+
+    def create_search_widgets(self):
+        busca_frame = ctk.CTkFrame(self)
+        busca_frame.grid(row=1, column=0, columnspan=2, sticky="ew", padx=10)
+        busca_frame.grid_columnconfigure(0, weight=1)
+
+        self.busca_entry = ctk.CTkEntry(busca_frame, placeholder_text="Palavras ou expressão regular")
+        self.busca_entry.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
+        self.busca_entry.bind("<Return>", lambda event: self.buscar())
+
+        self.regex_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(busca_frame, text="Regex", variable=self.regex_var, width=70).grid(
+            row=0, column=1, padx=5, pady=5)
+
+        self.de_entry = ctk.CTkEntry(busca_frame, placeholder_text="De: AAAA-MM-DD", width=120)
+        self.de_entry.grid(row=0, column=2, padx=5, pady=5)
+        self.ate_entry = ctk.CTkEntry(busca_frame, placeholder_text="Até: AAAA-MM-DD", width=120)
+        self.ate_entry.grid(row=0, column=3, padx=5, pady=5)
+
+        self.entidade_var = ctk.StringVar(value=ENTIDADES[0])
+        ctk.CTkComboBox(busca_frame, variable=self.entidade_var, values=list(ENTIDADES), state="readonly",
+                        width=110).grid(row=0, column=4, padx=5, pady=5)
+        self.id_entry = ctk.CTkEntry(busca_frame, placeholder_text="ID", width=60)
+        self.id_entry.grid(row=0, column=5, padx=5, pady=5)
+
+        self.busca_button = ctk.CTkButton(busca_frame, text="Buscar", width=80, command=self.buscar)
+        self.busca_button.grid(row=0, column=6, padx=5, pady=5)
+        self.busca_cancel_button = ctk.CTkButton(busca_frame, text="Cancelar", width=80, state="disabled",
+                                                 command=self.cancelar_busca)
+        self.busca_cancel_button.grid(row=0, column=7, padx=5, pady=5)
+        ctk.CTkButton(busca_frame, text="Limpar", width=80, command=self.limpar_busca).grid(
+            row=0, column=8, padx=5, pady=5)
+
+        self.busca_label = ctk.CTkLabel(busca_frame, text="")
+        self.busca_label.grid(row=1, column=0, columnspan=9, padx=5, sticky="w")
+
+    @staticmethod
+    def get_log_stat() -> Optional[os.stat_result]:
+        try:
+            return os.stat(utils.LOG_PATH)
+        except OSError:
+            return None
+
+    @staticmethod
+    def formatar_linhas(linhas: List[bytes]) -> str:
+        texto = []
+        for linha in linhas:
+            registro = ler_registro(linha)
+            # Linhas que não são registros (ex.: gravação interrompida) aparecem como estão
+            if registro is None:
+                texto.append(linha.decode("utf-8", "replace").rstrip("\r"))
+            else:
+                texto.append(formatar_registro(registro))
+        return "\n".join(texto)
+
+    # --- Página mais recente ---
 
     def load_log(self):
-        """Carrega o conteúdo do arquivo de log e exibe no Textbox."""
+        """Exibe a página mais recente do log de ações (as anteriores são lidas ao rolar)."""
         self.textbox.delete("1.0", "end")
+        self._inicio = self._fim = 0
+        st = self.get_log_stat()
+        self._arquivo_id = (st.st_dev, st.st_ino) if st else None
 
-        if not os.path.exists(utils.LOG_PATH):
+        if st is None:
             self.textbox.insert("1.0", "Arquivo de log não encontrado. Nenhuma ação registrada ainda.")
             return
 
         try:
-            with open(utils.LOG_PATH, 'r', encoding='utf-8') as f:
-                content = f.read()
-                self.textbox.insert("1.0", content)
+            self._inicio, self._fim, linhas = ler_pagina_anterior(utils.LOG_PATH)
+            self.textbox.insert("1.0", self.formatar_linhas(linhas))
             self.textbox.see("end")  # Rola para o final
         except Exception as e:
             self.textbox.insert("1.0", f"Erro ao ler arquivo de log: {e}")
-            utils.log(f"Falha ao ler log para exibição: {e}")
\ No newline at end of file
+            utils.log(f"Falha ao ler log para exibição: {e}")
+
+    # --- Páginas anteriores (rolagem) ---
+
+    def on_scroll(self, first: str, last: str):
+        self.scrollbar.set(first, last)
+        # Topo alcançado (ou página que não enche a tela): carrega a anterior
+        if float(first) <= 0 and self._inicio > 0 and not self._carregando_anterior:
+            self._carregando_anterior = True
+            self.after_idle(self.load_older)
+
+    def load_older(self):
+        """Insere no topo a página que termina na linha mais antiga exibida, mantendo a posição da rolagem."""
+        self._carregando_anterior = False
+        if self._inicio <= 0 or not self.winfo_exists():
+            return
+        try:
+            inicio, _, linhas = ler_pagina_anterior(utils.LOG_PATH, self._inicio)
+        except OSError as e:
+            utils.log(f"Falha ao ler log para exibição: {e}")
+            return
+        self._inicio = inicio
+        if not linhas:
+            return
+
+        topo = int(self.textbox.index("@0,0").split(".")[0])
+        self.textbox.insert("1.0", self.formatar_linhas(linhas) + "\n")
+        # As linhas que estavam no topo da tela continuam lá
+        self.textbox.yview(f"{topo + len(linhas)}.0")
+
+    # --- Novas linhas (tail -f) ---
+
+    def _agendar_tail(self):
+        self._cancelar_tail()
+        self._tail_job = self.after(INTERVALO_TAIL_MS, self._tail)
+
+    def _cancelar_tail(self):
+        if self._tail_job is not None:
+            self.after_cancel(self._tail_job)
+            self._tail_job = None
+
+    def _tail(self):
+        self._tail_job = None
+        self.seguir_log()
+        self._agendar_tail()
+
+    def seguir_log(self):
+        """Acrescenta as linhas gravadas depois da última exibida; rola junto se o fim estava à vista."""
+        st = self.get_log_stat()
+        arquivo_id = (st.st_dev, st.st_ino) if st else None
+        if arquivo_id != self._arquivo_id or (st and st.st_size < self._fim):
+            self.load_log()  # Log rotacionado, criado ou truncado
+            return
+        if st is None or st.st_size == self._fim:
+            return
+        if st.st_size - self._fim > MAX_ATRASO_BYTES:
+            self.load_log()  # Muito atrasado: só a página mais recente interessa
+            return
+
+        try:
+            fim, linhas = ler_linhas_novas(utils.LOG_PATH, self._fim)
+        except OSError as e:
+            utils.log(f"Falha ao ler log para exibição: {e}")
+            return
+        if not linhas:
+            return
+
+        no_fim = self.textbox.yview()[1] >= 1.0
+        texto = self.formatar_linhas(linhas)
+        self.textbox.insert("end", ("\n" + texto) if self._fim > self._inicio else texto)
+        self._fim = fim
+        if no_fim:
+            self.textbox.see("end")
+
+    # --- Pesquisa ---
+
+    def get_filtros_busca(self) -> Optional[Tuple[str, bool, Optional[str], Optional[str], Optional[str], Optional[int]]]:
+        """Filtros da barra de pesquisa validados, ou None (com aviso) se algum for inválido."""
+        texto = self.busca_entry.get().strip()
+        regex = self.regex_var.get()
+        de = self.de_entry.get().strip() or None
+        ate = self.ate_entry.get().strip() or None
+        entidade = self.entidade_var.get()
+        entidade = None if entidade == ENTIDADES[0] else entidade
+        id_str = self.id_entry.get().strip()
+
+        for rotulo, data in (("inicial", de), ("final", ate)):
+            if data:
+                try:
+                    datetime.strptime(data, "%Y-%m-%d")
+                except ValueError:
+                    utils.erro(self, "Filtro Inválido", f"A data {rotulo} não está no formato AAAA-MM-DD.")
+                    return None
+        if regex:
+            try:
+                re.compile(texto)
+            except re.error as e:
+                utils.erro(self, "Filtro Inválido", f"Expressão regular inválida: {e}")
+                return None
+        id = None
+        if id_str:
+            if not id_str.isdigit():
+                utils.erro(self, "Filtro Inválido", "O ID deve ser um número inteiro.")
+                return None
+            if entidade is None:
+                utils.erro(self, "Filtro Inválido", "Escolha a entidade (clientes, produtos ou pedidos) do ID.")
+                return None
+            id = int(id_str)
+        if not (texto or de or ate or entidade):
+            utils.erro(self, "Pesquisa", "Informe um texto, um período ou uma entidade para pesquisar.")
+            return None
+        return texto, regex, de, ate, entidade, id
+
+    def buscar(self):
+        """Inicia a pesquisa no log e nos arquivos rotacionados, em segundo plano."""
+        filtros = self.get_filtros_busca()
+        if filtros is None:
+            return
+        if self._busca_cancel is not None:
+            self._busca_cancel.set()  # Uma pesquisa por vez: a anterior é descartada
+
+        cancelar = threading.Event()
+        self._busca_cancel = cancelar
+        self._busca_total = 0
+
+        self.textbox.grid_remove()
+        self.scrollbar.grid_remove()
+        self.resultados_box.delete("1.0", "end")
+        self.resultados_box.grid()
+        self.busca_cancel_button.configure(state="normal")
+        self.busca_label.configure(text="Pesquisando...")
+
+        # Os callbacks recebem cancelar para ignorar o que chegar de uma pesquisa já substituída
+        tarefas_longas.submit(
+            self, _pesquisar_gravado, *filtros, path=utils.LOG_PATH,
+            on_resultados=lambda registros: tarefas_longas.post(self, self.on_resultados, cancelar, registros),
+            on_progress=lambda feitos, total: tarefas_longas.post(self, self.on_busca_progress, cancelar, feitos,
+                                                                  total),
+            cancelado=cancelar.is_set,
+            # Repassado pela mesma fila dos resultados, para chegar depois do último lote
+            on_success=lambda total: tarefas_longas.post(self, self.on_busca_done, cancelar, total),
+            on_error=lambda erro: self.on_busca_error(cancelar, erro),
+        )
+
+    def on_resultados(self, cancelar: threading.Event, registros: List[log_acoes.Registro]):
+        if cancelar is not self._busca_cancel:
+            return
+        exibir = registros[:max(0, MAX_RESULTADOS_EXIBIDOS - self._busca_total)]
+        if exibir:
+            texto = "\n".join(formatar_registro(registro) for registro in exibir)
+            self.resultados_box.insert("end", ("\n" + texto) if self._busca_total else texto)
+        self._busca_total += len(registros)
+
+    def on_busca_progress(self, cancelar: threading.Event, feitos: int, total: int):
+        if cancelar is not self._busca_cancel or cancelar.is_set():
+            return
+        self.busca_label.configure(
+            text=f"Pesquisando... arquivo {min(feitos + 1, total)} de {total}: {self._busca_total} ocorrências")
+
+    def _resumo_busca(self) -> str:
+        resumo = f"{self._busca_total} ocorrências"
+        if self._busca_total > MAX_RESULTADOS_EXIBIDOS:
+            resumo += f" (exibindo as primeiras {MAX_RESULTADOS_EXIBIDOS})"
+        return resumo
+
+    def on_busca_done(self, cancelar: threading.Event, total: int):
+        if cancelar is not self._busca_cancel:
+            return
+        self.busca_cancel_button.configure(state="disabled")
+        if cancelar.is_set():
+            self.busca_label.configure(text=f"Pesquisa cancelada: {self._resumo_busca()} até o momento")
+        else:
+            self.busca_label.configure(text=self._resumo_busca())
+            if not total:
+                self.resultados_box.insert("1.0", "Nenhuma ação encontrada.")
+
+    def on_busca_error(self, cancelar: threading.Event, erro: BaseException):
+        if cancelar is not self._busca_cancel:
+            return
+        self.busca_cancel_button.configure(state="disabled")
+        self.busca_label.configure(text="")
+        utils.log_and_alert(self, "Erro de Pesquisa", f"Falha ao pesquisar no log: {erro}")
+
+    def cancelar_busca(self):
+        """Interrompe a pesquisa em curso; os resultados já encontrados continuam exibidos."""
+        if self._busca_cancel is not None and not self._busca_cancel.is_set():
+            self._busca_cancel.set()
+            self.busca_cancel_button.configure(state="disabled")
+            self.busca_label.configure(text="Cancelando...")
+
+    def limpar_busca(self):
+        """Descarta a pesquisa e volta a exibir o log."""
+        if self._busca_cancel is not None:
+            self._busca_cancel.set()
+        self._busca_cancel = None
+        self._busca_total = 0
+        self.busca_cancel_button.configure(state="disabled")
+        self.busca_label.configure(text="")
+        self.resultados_box.delete("1.0", "end")
+        self.resultados_box.grid_remove()
+        self.textbox.grid()
+        self.scrollbar.grid()
+        self.textbox.see("end")
@@ -1,10 +1,14 @@
 import customtkinter as ctk
 import db
 import utils
-from typing import Any
+from itertools import groupby
+from typing import Optional, Tuple
+from views.base_view import AsyncViewMixin
 
+TEXTO_BOTAO = "Gerar Análise (Pode demorar e requer GEMINI_API_KEY)"
 
-class IAView(ctk.CTkFrame):
+
+class IAView(AsyncViewMixin, ctk.CTkFrame):
     def __init__(self, master: ctk.CTkFrame):
         super().__init__(master)
         self.grid_columnconfigure(0, weight=1)
@@ -13,11 +17,18 @@ class IAView(ctk.CTkFrame):
         ctk.CTkLabel(self, text="Análise Inteligente de Pedidos (Gemini)",
                      font=ctk.CTkFont(size=24, weight="bold")).grid(row=0, column=0, pady=(10, 20), sticky="w")
 
-        # Botão de Ação
-        # Nota: O texto do botão foi ajustado
-        self.analyze_button = ctk.CTkButton(self, text="Gerar Análise (Pode demorar e requer GEMINI_API_KEY)",
-                                            command=self.run_analysis)
-        self.analyze_button.grid(row=1, column=0, padx=10, pady=(0, 10), sticky="ew")
+        # Botão de Ação e opção de cache, na mesma linha
+        acao_frame = ctk.CTkFrame(self, fg_color="transparent")
+        acao_frame.grid(row=1, column=0, padx=10, pady=(0, 10), sticky="ew")
+        acao_frame.grid_columnconfigure(0, weight=1)
+
+        self.analyze_button = ctk.CTkButton(acao_frame, text=TEXTO_BOTAO, command=self.run_analysis)
+        self.analyze_button.grid(row=0, column=0, sticky="ew")
+
+        # Sem ela, pedidos inalterados desde a última análise reaproveitam a resposta guardada
+        self.nova_analise_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(acao_frame, text="Ignorar cache", variable=self.nova_analise_var).grid(
+            row=0, column=1, padx=(10, 0))
 
         # Textbox de Resultado
         self.result_textbox = ctk.CTkTextbox(self, font=("Arial", 12))
@@ -30,30 +41,20 @@ class IAView(ctk.CTkFrame):
     def format_pedidos_for_ia(self) -> str:
         """Busca pedidos e itens e formata em uma string para a IA."""
         try:
-            # Busca todos os pedidos
-            pedidos_raw = db.query("""
-                                   SELECT p.id, c.nome, p.data, p.total
-                                   FROM pedidos p
-                                            JOIN clientes c ON p.cliente_id = c.id
-                                   ORDER BY p.data DESC
-                                   """)
-
-            if not pedidos_raw:
-                return ""
-
-            # Constrói o texto
-            texto_pedidos = "Lista de Pedidos:\n"
-            for p_id, c_nome, p_data, p_total in pedidos_raw:
-                texto_pedidos += f"\n--- Pedido ID: {p_id}, Cliente: {c_nome}, Data: {p_data}, Total: R$ {p_total:.2f} ---\n"
+            # Pedidos e itens em uma única query lida em streaming; as linhas de
+            # cada pedido chegam juntas, então o texto é montado sem agrupar em memória
+            detalhes = db.iter_relatorio_detalhado("", "", None)
 
-                # Busca itens para o pedido
-                itens_raw = db.query("SELECT produto, quantidade FROM itens_pedido WHERE pedido_id = ?", (p_id,))
+            partes = []
+            for (p_id, c_nome, p_data, p_total), rows in groupby(detalhes, key=lambda r: r[:4]):
+                partes.append(f"\n--- Pedido ID: {p_id}, Cliente: {c_nome}, Data: {p_data}, Total: R$ {p_total:.2f} ---\n")
+                partes.append(", ".join(f"{r[4]} (Qtd: {r[5]})" for r in rows if r[4] is not None))
 
-                itens_list = []
-                for produto, quantidade in itens_raw:
-                    itens_list.append(f"{produto} (Qtd: {quantidade})")
+            if not partes:
+                return ""
 
-                texto_pedidos += ", ".join(itens_list)
+            # Constrói o texto
+            texto_pedidos = "Lista de Pedidos:\n" + "".join(partes)
 
             return texto_pedidos
 
@@ -61,8 +62,18 @@ class IAView(ctk.CTkFrame):
             utils.log(f"Erro ao formatar pedidos para IA: {e}")
             return "Erro ao carregar dados do banco."
 
+    def coletar_e_analisar(self, usar_cache: bool) -> Tuple[bool, Optional[str]]:
+        """
+        Roda no DbWorker: monta o texto dos pedidos e chama a IA (ou o cache).
+        Retorna (havia pedidos, resposta da IA ou None em caso de falha).
+        """
+        pedidos_text = self.format_pedidos_for_ia()
+        if not pedidos_text or "Erro" in pedidos_text:
+            return False, None
+        return True, utils.analisar_pedidos(pedidos_text, usar_cache=usar_cache)
+
     def run_analysis(self):
-        """Coleta dados, chama a função de análise da IA e exibe o resultado."""
+        """Coleta os dados e chama a IA em segundo plano; o resultado é exibido ao terminar."""
 
         # Desabilita o botão para evitar cliques múltiplos
         self.analyze_button.configure(state="disabled", text="Analisando com Gemini... Por favor, aguarde.")
@@ -70,24 +81,22 @@ class IAView(ctk.CTkFrame):
         # Habilita o textbox para limpar e inserir status
         self.result_textbox.configure(state="normal")
         self.result_textbox.delete("1.0", "end")
-        self.result_textbox.insert("1.0", "Coletando dados dos pedidos...")
-
-        pedidos_text = self.format_pedidos_for_ia()
-
-        if not pedidos_text or "Erro" in pedidos_text:
-            self.result_textbox.insert("end", "\nFalha ao coletar pedidos ou não há dados para analisar.")
-            self.analyze_button.configure(state="normal", text="Gerar Análise (Pode demorar e requer GEMINI_API_KEY)")
-            self.result_textbox.configure(state="disabled")
-            return
-
-        self.result_textbox.insert("end", "\nEnviando dados para o Gemini...")
+        self.result_textbox.insert("1.0", "Coletando dados dos pedidos e enviando para o Gemini...")
+        self.result_textbox.configure(state="disabled")
 
-        # Chama a função utilitária com a lógica da API
-        result = utils.analisar_pedidos(pedidos_text)
+        # A variável do Tk é lida aqui, na thread do Tk
+        self.run_in_background(self.coletar_e_analisar, not self.nova_analise_var.get(),
+                               on_success=self.exibir_resultado, on_error=self.on_analysis_error,
+                               mensagem="Analisando com Gemini...")
 
+    def exibir_resultado(self, resultado: Tuple[bool, Optional[str]]):
+        havia_pedidos, result = resultado
+        self.result_textbox.configure(state="normal")
         self.result_textbox.delete("1.0", "end")
 
-        if result:
+        if not havia_pedidos:
+            self.result_textbox.insert("1.0", "Falha ao coletar pedidos ou não há dados para analisar.")
+        elif result:
             self.result_textbox.insert("1.0", "✅ Análise Gemini Concluída:\n\n")
             self.result_textbox.insert("end", result)
             utils.info(self, "Sucesso", "Análise de IA concluída e exibida.")
@@ -98,4 +107,8 @@ class IAView(ctk.CTkFrame):
             utils.erro(self, "Erro de IA", "Falha na comunicação com a API do Gemini. Verifique os logs.")
 
         self.result_textbox.configure(state="disabled")
-        self.analyze_button.configure(state="normal", text="Gerar Análise (Pode demorar e requer GEMINI_API_KEY)")
\ No newline at end of file
+        self.analyze_button.configure(state="normal", text=TEXTO_BOTAO)
+
+    def on_analysis_error(self, erro: BaseException):
+        self.analyze_button.configure(state="normal", text=TEXTO_BOTAO)
+        utils.log_and_alert(self, "Erro de IA", f"Falha ao gerar a análise: {erro}")
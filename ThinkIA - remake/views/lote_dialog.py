@@ -0,0 +1,140 @@
+import customtkinter as ctk
+import tkinter as tk
+from tkinter import filedialog
+import exportacao
+from typing import Callable, List, Set, Tuple
+
+ATRASO_FILTRO_MS = 200  # Espera da digitação no filtro antes de refazer a lista
+
+
+class LoteDialog(ctk.CTkToplevel):
+    """
+    Janela de escolha do lote de relatórios por cliente: quais clientes (todos
+    marcados de início), o formato e a pasta de destino. Ao confirmar chama
+    on_confirm(clientes, formato, pasta) com os (id, nome) marcados.
+
+    Os clientes ficam em um Listbox de seleção múltipla (um widget só, mesmo
+    com dezenas de milhares de nomes); o filtro restringe a lista exibida e as
+    marcações são guardadas pelo id, valendo também para os clientes ocultos.
+    """
+
+    def __init__(self, master, periodo: str, clientes: List[Tuple[int, str]],
+                 on_confirm: Callable[[List[Tuple[int, str]], str, str], None]):
+        super().__init__(master)
+        self.title("Relatórios por Cliente")
+        self.geometry("420x560")
+        self.transient(master.winfo_toplevel())
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(2, weight=1)
+
+        self.on_confirm = on_confirm
+        self.clientes = clientes
+        self.marcados: Set[int] = {cliente_id for cliente_id, _ in clientes}
+        self.exibidos: List[Tuple[int, str]] = clientes  # Clientes que passam pelo filtro, na ordem da lista
+        self._filtro_job = None
+
+        ctk.CTkLabel(self, text=f"Período: {periodo}\n{len(clientes)} clientes com pedidos",
+                     font=ctk.CTkFont(size=14, weight="bold")).grid(row=0, column=0, padx=15, pady=(15, 5))
+
+        self.filtro_entry = ctk.CTkEntry(self, placeholder_text="Filtrar clientes pelo nome")
+        self.filtro_entry.grid(row=1, column=0, sticky="ew", padx=15, pady=5)
+        self.filtro_entry.bind("<KeyRelease>", lambda event: self.agendar_filtro())
+
+        # Clientes (marcados por padrão)
+        lista_frame = ctk.CTkFrame(self)
+        lista_frame.grid(row=2, column=0, sticky="nsew", padx=15, pady=5)
+        lista_frame.grid_columnconfigure(0, weight=1)
+        lista_frame.grid_rowconfigure(0, weight=1)
+        self.lista = tk.Listbox(lista_frame, selectmode="multiple", exportselection=False, activestyle="none",
+                                borderwidth=0, highlightthickness=0, background="#2b2b2b", foreground="#dce4ee",
+                                selectbackground="#1f6aa5", selectforeground="white")
+        self.lista.grid(row=0, column=0, sticky="nsew", padx=(5, 0), pady=5)
+        scrollbar = ctk.CTkScrollbar(lista_frame, command=self.lista.yview)
+        scrollbar.grid(row=0, column=1, sticky="ns", pady=5)
+        self.lista.configure(yscrollcommand=scrollbar.set)
+        self.lista.bind("<<ListboxSelect>>", lambda event: self.on_lista_select())
+
+        self.contagem_label = ctk.CTkLabel(self, text="")
+        self.contagem_label.grid(row=3, column=0, padx=15, sticky="w")
+
+        marcar_frame = ctk.CTkFrame(self, fg_color="transparent")
+        marcar_frame.grid(row=4, column=0, sticky="ew", padx=15)
+        marcar_frame.grid_columnconfigure((0, 1), weight=1)
+        ctk.CTkButton(marcar_frame, text="Marcar Exibidos", command=lambda: self.marcar_todos(True)).grid(
+            row=0, column=0, padx=5, pady=5, sticky="ew")
+        ctk.CTkButton(marcar_frame, text="Desmarcar Exibidos", command=lambda: self.marcar_todos(False)).grid(
+            row=0, column=1, padx=5, pady=5, sticky="ew")
+
+        # Formato e confirmação
+        self.formato_var = ctk.StringVar(value=exportacao.FORMATOS_LOTE[0])
+        ctk.CTkSegmentedButton(self, values=list(exportacao.FORMATOS_LOTE), variable=self.formato_var).grid(
+            row=5, column=0, padx=15, pady=10)
+
+        ctk.CTkButton(self, text="Escolher Pasta e Gerar", command=self.confirmar).grid(
+            row=6, column=0, padx=15, pady=(5, 15), sticky="ew")
+
+        self.preencher_lista()
+        self.after(100, self.focus_force)
+
+    # --- Lista e filtro ---
+
+    def agendar_filtro(self):
+        if self._filtro_job is not None:
+            self.after_cancel(self._filtro_job)
+        self._filtro_job = self.after(ATRASO_FILTRO_MS, self.aplicar_filtro)
+
+    def aplicar_filtro(self):
+        self._filtro_job = None
+        termo = self.filtro_entry.get().strip().casefold()
+        self.exibidos = [c for c in self.clientes if termo in c[1].casefold()] if termo else self.clientes
+        self.preencher_lista()
+
+    def preencher_lista(self):
+        """Recria os itens do Listbox com os clientes exibidos e restaura as marcações."""
+        self.lista.delete(0, "end")
+        if self.exibidos:
+            self.lista.insert("end", *(nome for _, nome in self.exibidos))
+        # Uma chamada por trecho contínuo de marcados, não uma por cliente
+        inicio = None
+        for indice, (cliente_id, _) in enumerate(self.exibidos + [(None, "")]):
+            marcado = cliente_id in self.marcados
+            if marcado and inicio is None:
+                inicio = indice
+            elif not marcado and inicio is not None:
+                self.lista.selection_set(inicio, indice - 1)
+                inicio = None
+        self.atualizar_contagem()
+
+    def on_lista_select(self):
+        selecionados = set(self.lista.curselection())
+        for indice, (cliente_id, _) in enumerate(self.exibidos):
+            if indice in selecionados:
+                self.marcados.add(cliente_id)
+            else:
+                self.marcados.discard(cliente_id)
+        self.atualizar_contagem()
+
+    def atualizar_contagem(self):
+        self.contagem_label.configure(
+            text=f"{len(self.marcados)} de {len(self.clientes)} marcados ({len(self.exibidos)} exibidos)")
+
+    def marcar_todos(self, valor: bool):
+        """Marca ou desmarca os clientes exibidos (os que passam pelo filtro)."""
+        ids = {cliente_id for cliente_id, _ in self.exibidos}
+        if valor:
+            self.marcados |= ids
+            self.lista.selection_set(0, "end")
+        else:
+            self.marcados -= ids
+            self.lista.selection_clear(0, "end")
+        self.atualizar_contagem()
+
+    def confirmar(self):
+        clientes = [cliente for cliente in self.clientes if cliente[0] in self.marcados]
+        if not clientes:
+            return
+        pasta = filedialog.askdirectory(parent=self, title="Pasta dos Relatórios")
+        if not pasta:
+            return
+        self.destroy()
+        self.on_confirm(clientes, self.formato_var.get(), pasta)
@@ -3,10 +3,12 @@ from tkinter import ttk, END
 import db
 import utils
 from models import ItemPedido, Pedido
+from views.base_view import AsyncViewMixin, GridPager
+from views.virtual_grid import VirtualGrid
 from typing import List, Tuple, Optional, Any
 from datetime import date
 
-class PedidosFrame(ctk.CTkFrame):
+class PedidosFrame(AsyncViewMixin, ctk.CTkFrame):
     def __init__(self, master: ctk.CTkFrame):
         super().__init__(master)
         self.grid_columnconfigure(0, weight=1)
@@ -16,6 +18,7 @@ class PedidosFrame(ctk.CTkFrame):
         self.current_itens: List[ItemPedido] = []
         self.clientes_map = {}  # {nome: id}
         self.produtos_map = {}  # {nome: preco}
+        self.produtos_ids = {}  # {nome: id}
 
         main_container = ctk.CTkFrame(self)
         main_container.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
@@ -32,27 +35,35 @@ class PedidosFrame(ctk.CTkFrame):
         self.load_dependencies()
         self.load_pedidos()
 
+        # Combos atualizados quando clientes ou produtos mudam (nesta ou em outra tela)
+        self.subscribe_changes(lambda evento: self.when_visible(self.load_dependencies), ("clientes", "produtos"))
+
     def load_dependencies(self):
-        """Carrega clientes e produtos para combobox/referência."""
+        """
+        Carrega clientes e produtos para combobox/referência (db.cached_query só
+        volta ao banco se as tabelas mudaram). A seleção atual é mantida se ainda existir.
+        """
         try:
             # Clientes
-            clientes = db.query("SELECT id, nome FROM clientes ORDER BY nome")
+            clientes = db.cached_query("SELECT id, nome FROM clientes ORDER BY nome")
             self.clientes_map = {nome: id for id, nome in clientes}
             
             # Produtos
-            produtos = db.query("SELECT nome, preco_unit FROM produtos ORDER BY nome")
-            self.produtos_map = {nome: preco for nome, preco in produtos}
+            produtos = db.cached_query("SELECT id, nome, preco_unit FROM produtos ORDER BY nome")
+            self.produtos_map = {nome: preco for _id, nome, preco in produtos}
+            self.produtos_ids = {nome: id for id, nome, _preco in produtos}
             
             # Atualiza Comboboxes
             nomes_clientes = list(self.clientes_map.keys())
-            if nomes_clientes:
-                self.cliente_combobox.configure(values=nomes_clientes)
+            self.cliente_combobox.configure(values=nomes_clientes)
+            if nomes_clientes and self.cliente_var.get() not in self.clientes_map:
                 self.cliente_var.set(nomes_clientes[0])
 
             nomes_produtos = list(self.produtos_map.keys())
+            self.produto_combobox.configure(values=nomes_produtos)
             if nomes_produtos:
-                self.produto_combobox.configure(values=nomes_produtos)
-                self.produto_var.set(nomes_produtos[0])
+                if self.produto_var.get() not in self.produtos_map:
+                    self.produto_var.set(nomes_produtos[0])
                 # Bind para atualizar o preço quando o produto muda
                 self.produto_combobox.bind("<<ComboboxSelected>>", self.on_produto_select)
 
@@ -67,25 +78,34 @@ class PedidosFrame(ctk.CTkFrame):
         tree_frame.grid_columnconfigure(0, weight=1)
         tree_frame.grid_rowconfigure(0, weight=1)
 
-        columns = ("id", "cliente", "data", "total")
-        self.pedidos_tree = ttk.Treeview(tree_frame, columns=columns, show="headings", style="Treeview")
-        self.pedidos_tree.grid(row=0, column=0, sticky="nsew")
-
-        # Configurações das colunas
-        self.pedidos_tree.heading("id", text="ID")
-        self.pedidos_tree.column("id", width=40, anchor="center")
-        self.pedidos_tree.heading("cliente", text="Cliente")
-        self.pedidos_tree.column("cliente", width=200, anchor="w")
-        self.pedidos_tree.heading("data", text="Data")
-        self.pedidos_tree.column("data", width=100, anchor="center")
-        self.pedidos_tree.heading("total", text="Total")
-        self.pedidos_tree.column("total", width=100, anchor="e")
-        
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.pedidos_tree.yview)
-        scrollbar.grid(row=0, column=1, sticky="ns")
-        self.pedidos_tree.configure(yscrollcommand=scrollbar.set)
-        
-        self.pedidos_tree.bind("<<TreeviewSelect>>", self.on_pedido_select)
+        # Grade virtual: só as linhas visíveis são desenhadas
+        columns = [
+            ("id", "ID", 40, "center"),
+            ("cliente", "Cliente", 200, "w"),
+            ("data", "Data", 100, "center"),
+            ("total", "Total", 100, "e"),
+        ]
+        self.pedidos_tabela = VirtualGrid(tree_frame, columns, on_select=self.on_pedido_select)
+        self.pedidos_tabela.grid(row=0, column=0, sticky="nsew")
+
+        # Total de registros (as linhas são carregadas por página conforme a rolagem)
+        self.contagem_label = ctk.CTkLabel(tree_frame, text="", anchor="w")
+        self.contagem_label.grid(row=1, column=0, sticky="ew", padx=5)
+
+        self.pager = GridPager(
+            self, self.pedidos_tabela,
+            fetch_page=db.get_pedidos_page,
+            format_row=self.format_pedido_row,
+            sort_key=lambda row: (row[2], row[0]),  # ORDER BY data DESC, id DESC
+            descending=True,
+            entity="pedidos", fetch_row=db.get_pedido_row,
+            depends_on=("clientes",),
+            fetch_dependentes=lambda tabela, cliente_id: db.get_pedido_rows_do_cliente(cliente_id),
+            count=db.count_pedidos,
+            on_count=lambda total: self.contagem_label.configure(text=f"{total} pedido(s)"),
+            mensagem="Carregando pedidos...",
+        )
+        self.pager.on_error = lambda e: utils.log_and_alert(self, "Erro de Carga", f"Falha ao carregar pedidos: {e}")
 
     # --- Formulário Principal e Itens ---
 
@@ -197,22 +217,19 @@ class PedidosFrame(ctk.CTkFrame):
     # --- Lógica de Dados ---
 
     def load_pedidos(self):
-        """Carrega todos os pedidos do banco e preenche a Treeview."""
-        for item in self.pedidos_tree.get_children():
-            self.pedidos_tree.delete(item)
-            
-        try:
-            # Query que busca pedidos com o nome do cliente
-            pedidos = db.query("""
-                SELECT p.id, c.nome, p.data, p.total 
-                FROM pedidos p JOIN clientes c ON p.cliente_id = c.id 
-                ORDER BY p.data DESC
-            """)
-            for id, cliente_nome, data, total in pedidos:
-                total_formatado = f"R$ {total:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                self.pedidos_tree.insert("", "end", iid=id, values=(id, cliente_nome, data, total_formatado))
-        except Exception as e:
-            utils.log_and_alert(self, "Erro de Carga", f"Falha ao carregar pedidos: {e}")
+        """
+        Recarrega a lista de pedidos (mais recentes primeiro). Apenas a primeira
+        página é buscada agora; as seguintes vêm conforme a rolagem (GridPager).
+        Uma nova carga substitui a anterior, se ainda estiver pendente.
+        """
+        self.pager.reset()
+
+    @staticmethod
+    def format_pedido_row(row: Tuple) -> Tuple[Any, Tuple]:
+        """Converte (id, cliente, data, total) em (iid, valores exibidos)."""
+        id, cliente_nome, data, total = row
+        total_formatado = f"R$ {total:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        return id, (id, cliente_nome, data, total_formatado)
 
     def on_produto_select(self, event: Any):
         """Atualiza o campo de preço ao selecionar um produto."""
@@ -249,7 +266,8 @@ class PedidosFrame(ctk.CTkFrame):
                 pedido_id=self.current_pedido_id, 
                 produto=produto_nome, 
                 quantidade=quantidade, 
-                preco_unit=preco_unit
+                preco_unit=preco_unit,
+                produto_id=self.produtos_ids.get(produto_nome)
             )
             self.current_itens.append(novo_item)
             
@@ -282,8 +300,7 @@ class PedidosFrame(ctk.CTkFrame):
 
     def update_itens_treeview(self):
         """Atualiza a Treeview de itens com base em self.current_itens."""
-        for item in self.itens_tree.get_children():
-            self.itens_tree.delete(item)
+        self.itens_tree.delete(*self.itens_tree.get_children())
             
         for i, item in enumerate(self.current_itens):
             subtotal = item.quantidade * item.preco_unit
@@ -319,57 +336,33 @@ class PedidosFrame(ctk.CTkFrame):
         else:
             self._insert_pedido(cliente_id, data_str, total)
 
+    def _build_pedido(self, pedido_id: Optional[int], cliente_id: int, data_str: str, total: float) -> Pedido:
+        """Monta o Pedido com os itens atuais do formulário."""
+        return Pedido(id=pedido_id, cliente_id=cliente_id, data=data_str, total=total, itens=list(self.current_itens))
+
     def _insert_pedido(self, cliente_id: int, data_str: str, total: float):
         try:
-            # 1. Insere o Pedido
-            pedido_id = db.execute(
-                "INSERT INTO pedidos (cliente_id, data, total) VALUES (?, ?, ?)",
-                (cliente_id, data_str, total)
-            )
+            # Pedido e itens em uma única transação
+            pedido_id = db.salvar_pedido(self._build_pedido(None, cliente_id, data_str, total))
 
-            # 2. Insere os Itens do Pedido
-            itens_to_insert = [
-                (pedido_id, i.produto, i.quantidade, i.preco_unit) 
-                for i in self.current_itens
-            ]
-            db.executemany(
-                "INSERT INTO itens_pedido (pedido_id, produto, quantidade, preco_unit) VALUES (?, ?, ?, ?)",
-                itens_to_insert
-            )
-
-            self.load_pedidos()
             self.clear_form()
             utils.info(self, "Sucesso", f"Pedido {pedido_id} criado.")
-            utils.registrar_acao(f"Pedido criado: ID {pedido_id}, Cliente ID {cliente_id}")
+            utils.registrar_acao(f"Pedido criado: ID {pedido_id}, Cliente ID {cliente_id}", utils.TIPO_CRIACAO,
+                                 "pedidos", pedido_id, {"clientes": cliente_id})
 
         except Exception as e:
             utils.log_and_alert(self, "Erro de Inserção", f"Falha ao salvar novo pedido: {e}")
 
     def _update_pedido(self, cliente_id: int, data_str: str, total: float):
+        pedido_id = self.current_pedido_id
         try:
-            # 1. Atualiza o Pedido
-            db.execute(
-                "UPDATE pedidos SET cliente_id = ?, data = ?, total = ? WHERE id = ?",
-                (cliente_id, data_str, total, self.current_pedido_id)
-            )
+            # Atualiza o pedido e substitui os itens em uma única transação
+            db.salvar_pedido(self._build_pedido(pedido_id, cliente_id, data_str, total))
 
-            # 2. Deleta e Reinsere todos os Itens
-            db.execute("DELETE FROM itens_pedido WHERE pedido_id = ?", (self.current_pedido_id,))
-            
-            itens_to_insert = [
-                (self.current_pedido_id, i.produto, i.quantidade, i.preco_unit) 
-                for i in self.current_itens
-            ]
-            if itens_to_insert:
-                db.executemany(
-                    "INSERT INTO itens_pedido (pedido_id, produto, quantidade, preco_unit) VALUES (?, ?, ?, ?)",
-                    itens_to_insert
-                )
-
-            self.load_pedidos()
             self.clear_form()
-            utils.info(self, "Sucesso", f"Pedido {self.current_pedido_id} atualizado.")
-            utils.registrar_acao(f"Pedido atualizado: ID {self.current_pedido_id}, Cliente ID {cliente_id}")
+            utils.info(self, "Sucesso", f"Pedido {pedido_id} atualizado.")
+            utils.registrar_acao(f"Pedido atualizado: ID {pedido_id}, Cliente ID {cliente_id}", utils.TIPO_ALTERACAO,
+                                 "pedidos", pedido_id, {"clientes": cliente_id})
 
         except Exception as e:
             utils.log_and_alert(self, "Erro de Atualização", f"Falha ao atualizar pedido: {e}")
@@ -381,58 +374,54 @@ class PedidosFrame(ctk.CTkFrame):
 
         if utils.confirmar(self, "Confirmação", f"Tem certeza que deseja deletar o Pedido ID {self.current_pedido_id}?"):
             try:
+                pedido_id = self.current_pedido_id
                 # O DELETE CASCADE no banco deve cuidar dos itens
-                db.execute("DELETE FROM pedidos WHERE id = ?", (self.current_pedido_id,))
+                db.execute("DELETE FROM pedidos WHERE id = ?", (pedido_id,))
                 
-                self.load_pedidos()
                 self.clear_form()
-                utils.info(self, "Sucesso", f"Pedido ID {self.current_pedido_id} deletado.")
-                utils.registrar_acao(f"Pedido deletado: ID {self.current_pedido_id}")
+                utils.info(self, "Sucesso", f"Pedido ID {pedido_id} deletado.")
+                utils.registrar_acao(f"Pedido deletado: ID {pedido_id}", utils.TIPO_EXCLUSAO, "pedidos", pedido_id)
 
             except Exception as e:
                 utils.log_and_alert(self, "Erro de Exclusão", f"Falha ao deletar pedido: {e}")
 
     # --- Funções de Interface ---
 
-    def on_pedido_select(self, event: Any):
+    def on_pedido_select(self, linha: Tuple[Any, Tuple]):
         """Carrega os dados do pedido selecionado no formulário."""
-        selected_item = self.pedidos_tree.focus()
-        if selected_item:
-            values = self.pedidos_tree.item(selected_item, 'values')
-            if values:
-                self.current_pedido_id = int(values[0])
-                
-                # Preenche campos
-                cliente_nome = values[1]
-                data = values[2]
-                
-                self.cliente_var.set(cliente_nome)
-                self.data_entry.delete(0, END)
-                self.data_entry.insert(0, data)
+        values = linha[1]
+        self.current_pedido_id = int(values[0])
+
+        # Preenche campos
+        cliente_nome = values[1]
+        data = values[2]
+
+        self.cliente_var.set(cliente_nome)
+        self.data_entry.delete(0, END)
+        self.data_entry.insert(0, data)
+
+        # Carrega itens
+        self.load_itens_for_edit(self.current_pedido_id)
+
+        self.save_button.configure(text="Atualizar Pedido")
+        self.delete_button.configure(state="normal")
 
-                # Carrega itens
-                self.load_itens_for_edit(self.current_pedido_id)
-                
-                self.save_button.configure(text="Atualizar Pedido")
-                self.delete_button.configure(state="normal")
-        else:
-            self.clear_form()
-    
     def load_itens_for_edit(self, pedido_id: int):
         """Carrega itens do banco para o estado self.current_itens."""
         self.current_itens = []
         try:
             itens_raw = db.query(
-                "SELECT produto, quantidade, preco_unit FROM itens_pedido WHERE pedido_id = ?", 
+                "SELECT produto, quantidade, preco_unit, produto_id FROM itens_pedido WHERE pedido_id = ? ORDER BY id", 
                 (pedido_id,)
             )
-            for produto, quantidade, preco_unit in itens_raw:
+            for produto, quantidade, preco_unit, produto_id in itens_raw:
                  self.current_itens.append(ItemPedido(
                     id=None, 
                     pedido_id=pedido_id, 
                     produto=produto, 
                     quantidade=quantidade, 
-                    preco_unit=preco_unit
+                    preco_unit=preco_unit,
+                    produto_id=produto_id
                 ))
             
             self.update_itens_treeview()
@@ -454,11 +443,8 @@ class PedidosFrame(ctk.CTkFrame):
         
         # Reseta o total e as treeviews
         self.total_label.configure(text="TOTAL: R$ 0,00")
-        for item in self.itens_tree.get_children():
-            self.itens_tree.delete(item)
-            
-        for item in self.pedidos_tree.selection():
-            self.pedidos_tree.selection_remove(item)
+        self.itens_tree.delete(*self.itens_tree.get_children())
+        self.pedidos_tabela.clear_selection()
             
         # Reseta botões
         self.save_button.configure(text="Salvar Pedido")
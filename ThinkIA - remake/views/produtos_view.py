@@ -1,11 +1,13 @@
 import customtkinter as ctk
-from tkinter import ttk, END
+from tkinter import END
 import db
 import utils
 from models import Produto
-from typing import Optional, Any
+from views.base_view import AsyncViewMixin, GridPager
+from views.virtual_grid import VirtualGrid
+from typing import Optional, Any, Tuple
 
-class ProdutosFrame(ctk.CTkFrame):
+class ProdutosFrame(AsyncViewMixin, ctk.CTkFrame):
     def __init__(self, master: ctk.CTkFrame):
         super().__init__(master)
         self.grid_columnconfigure(0, weight=1)
@@ -35,29 +37,28 @@ class ProdutosFrame(ctk.CTkFrame):
         tree_frame.grid_columnconfigure(0, weight=1)
         tree_frame.grid_rowconfigure(0, weight=1)
 
-        columns = ("id", "nome", "preco_unit")
-        self.tree = ttk.Treeview(
-            tree_frame, 
-            columns=columns, 
-            show="headings",
-            style="Treeview" 
+        # Grade virtual: só as linhas visíveis são desenhadas
+        columns = [
+            ("id", "ID", 30, "center"),
+            ("nome", "Nome do Produto", 300, "w"),
+            ("preco_unit", "Preço Unitário", 150, "e"),
+        ]
+        self.tabela = VirtualGrid(tree_frame, columns, on_select=self.on_select)
+        self.tabela.grid(row=0, column=0, sticky="nsew")
+
+        # Total de registros (as linhas são carregadas por página conforme a rolagem)
+        self.contagem_label = ctk.CTkLabel(tree_frame, text="", anchor="w")
+        self.contagem_label.grid(row=1, column=0, sticky="ew", padx=5)
+
+        self.pager = GridPager(
+            self, self.tabela,
+            fetch_page=db.get_produtos_page,
+            format_row=self.format_produto_row,
+            sort_key=lambda row: (row[1], row[0]),  # ORDER BY nome, id
+            entity="produtos", fetch_row=db.get_produto_row,
+            count=db.count_produtos,
+            on_count=lambda total: self.contagem_label.configure(text=f"{total} produto(s)"),
         )
-        self.tree.grid(row=0, column=0, sticky="nsew")
-
-        # Configurações das colunas
-        self.tree.heading("id", text="ID")
-        self.tree.column("id", width=30, anchor="center")
-        self.tree.heading("nome", text="Nome do Produto")
-        self.tree.column("nome", width=300, anchor="w")
-        self.tree.heading("preco_unit", text="Preço Unitário")
-        self.tree.column("preco_unit", width=150, anchor="e")
-        
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        scrollbar.grid(row=0, column=1, sticky="ns")
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        
-        self.tree.bind("<<TreeviewSelect>>", self.on_select)
 
     # --- Formulário CRUD ---
 
@@ -100,39 +101,30 @@ class ProdutosFrame(ctk.CTkFrame):
     # --- Lógica CRUD ---
 
     def load_produtos(self):
-        """Carrega todos os produtos do banco e preenche a Treeview."""
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        try:
-            produtos = db.query("SELECT id, nome, preco_unit FROM produtos ORDER BY nome")
-            for id, nome, preco in produtos:
-                preco_formatado = f"R$ {preco:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                self.tree.insert("", "end", iid=id, values=(id, nome, preco_formatado))
-        except Exception as e:
-            utils.log_and_alert(self, "Erro de Carga", f"Falha ao carregar produtos: {e}")
+        """Recarrega a lista a partir da primeira página de produtos (ordem por nome)."""
+        self.pager.reset()
+
+    @staticmethod
+    def format_produto_row(row: Tuple) -> Tuple[Any, Tuple]:
+        id, nome, preco = row
+        preco_formatado = f"R$ {preco:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+        return id, (id, nome, preco_formatado)
 
-    def on_select(self, event: Any):
+    def on_select(self, linha: Tuple[Any, Tuple]):
         """Preenche o formulário quando uma linha é selecionada."""
-        selected_item = self.tree.focus()
-        if selected_item:
-            values = self.tree.item(selected_item, 'values')
-            if values:
-                self.current_produto_id = int(values[0])
-                
-                # O preço está formatado (R$ X.XXX,XX), precisamos do valor original no banco para edição (float)
-                produto_raw = db.query("SELECT preco_unit FROM produtos WHERE id = ?", (self.current_produto_id,))
-                preco_float = produto_raw[0][0] if produto_raw else 0.0
-                
-                self.nome_entry.delete(0, END)
-                self.nome_entry.insert(0, values[1])
-                self.preco_entry.delete(0, END)
-                self.preco_entry.insert(0, str(preco_float))
-                
-                self.set_buttons_state("edit")
-        else:
-            self.set_buttons_state("add")
-            self.clear_form()
+        values = linha[1]
+        self.current_produto_id = int(values[0])
+
+        # O preço está formatado (R$ X.XXX,XX), precisamos do valor original no banco para edição (float)
+        produto_raw = db.query("SELECT preco_unit FROM produtos WHERE id = ?", (self.current_produto_id,))
+        preco_float = produto_raw[0][0] if produto_raw else 0.0
+
+        self.nome_entry.delete(0, END)
+        self.nome_entry.insert(0, values[1])
+        self.preco_entry.delete(0, END)
+        self.preco_entry.insert(0, str(preco_float))
+
+        self.set_buttons_state("edit")
 
     def get_form_data(self):
         """Valida e retorna os dados do formulário."""
@@ -162,10 +154,10 @@ class ProdutosFrame(ctk.CTkFrame):
                 (produto_data.nome, produto_data.preco_unit)
             )
             
-            self.load_produtos()
             self.clear_form()
             utils.info(self, "Sucesso", f"Produto '{produto_data.nome}' adicionado com ID {produto_id}.")
-            utils.registrar_acao(f"Produto adicionado: {produto_data.nome} (ID: {produto_id})")
+            utils.registrar_acao(f"Produto adicionado: {produto_data.nome} (ID: {produto_id})", utils.TIPO_CRIACAO,
+                                 "produtos", produto_id)
 
         except Exception as e:
             utils.log_and_alert(self, "Erro de Inserção", f"Falha ao adicionar produto: {e}")
@@ -184,10 +176,11 @@ class ProdutosFrame(ctk.CTkFrame):
                 (produto_data.nome, produto_data.preco_unit, self.current_produto_id)
             )
             
-            self.load_produtos()
+            produto_id = self.current_produto_id
             self.clear_form()
-            utils.info(self, "Sucesso", f"Produto '{produto_data.nome}' (ID: {self.current_produto_id}) atualizado.")
-            utils.registrar_acao(f"Produto atualizado: {produto_data.nome} (ID: {self.current_produto_id})")
+            utils.info(self, "Sucesso", f"Produto '{produto_data.nome}' (ID: {produto_id}) atualizado.")
+            utils.registrar_acao(f"Produto atualizado: {produto_data.nome} (ID: {produto_id})", utils.TIPO_ALTERACAO,
+                                 "produtos", produto_id)
 
         except Exception as e:
             utils.log_and_alert(self, "Erro de Atualização", f"Falha ao atualizar produto: {e}")
@@ -200,12 +193,13 @@ class ProdutosFrame(ctk.CTkFrame):
         produto_nome = self.nome_entry.get()
         if utils.confirmar(self, "Confirmação", f"Tem certeza que deseja deletar o produto '{produto_nome}'?"):
             try:
-                db.execute("DELETE FROM produtos WHERE id = ?", (self.current_produto_id,))
+                produto_id = self.current_produto_id
+                db.execute("DELETE FROM produtos WHERE id = ?", (produto_id,))
                 
-                self.load_produtos()
                 self.clear_form()
                 utils.info(self, "Sucesso", f"Produto '{produto_nome}' deletado.")
-                utils.registrar_acao(f"Produto deletado: {produto_nome} (ID: {self.current_produto_id})")
+                utils.registrar_acao(f"Produto deletado: {produto_nome} (ID: {produto_id})", utils.TIPO_EXCLUSAO,
+                                     "produtos", produto_id)
 
             except Exception as e:
                 utils.log_and_alert(self, "Erro de Exclusão", f"Falha ao deletar produto: {e}")
@@ -218,8 +212,7 @@ class ProdutosFrame(ctk.CTkFrame):
         self.nome_entry.delete(0, END)
         self.preco_entry.delete(0, END)
         
-        for item in self.tree.selection():
-            self.tree.selection_remove(item)
+        self.tabela.clear_selection()
             
         self.set_buttons_state("add")
 
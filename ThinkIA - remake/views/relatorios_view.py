@@ -1,25 +1,41 @@
 import customtkinter as ctk
-from tkinter import ttk, filedialog, messagebox
-from datetime import date
+from tkinter import filedialog
 import os
+import threading
 import db  # Importa o db atualizado com as funções de repositório
+import exportacao
 import utils
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
-import csv
-from typing import List, Any
+from views.base_view import AsyncViewMixin
+from views.lote_dialog import LoteDialog
+from views.virtual_grid import NIVEL_FILHO, NIVEL_PAI, Linha, VirtualGrid
+from worker import tarefas_longas
+from typing import Dict, List, Optional, Set, Tuple
 
+ITENS_POR_BUSCA = 50  # Pedidos com itens buscados juntos ao abrir um: o aberto e os seguintes
 
-class RelatoriosFrame(ctk.CTkFrame):
+
+def _moeda(valor: float) -> str:
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+class RelatoriosFrame(AsyncViewMixin, ctk.CTkFrame):
     def __init__(self, master):
         super().__init__(master)
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(2, weight=1)  # Treeview ocupa a maior parte
 
         self.clientes_map = {}  # {nome: id}
+        self._report_job = None
+        # Relatório exibido: pedidos (NIVEL_PAI, row) seguidos, se abertos, pelos seus
+        # itens (NIVEL_FILHO, pedido_id, item); itens já buscados ficam em _itens
+        self._linhas: List[Tuple] = []
+        self._itens: Dict[int, List[Tuple]] = {}
+        self._itens_buscando: Set[int] = set()  # Pedidos com itens a caminho
+        self._geracao = 0  # Descarta itens que chegam depois de um novo relatório
+        self._export_cancel: Optional[threading.Event] = None  # Sinal de cancelamento da exportação em curso
+        self._export_formato = ""
+        self._export_unidade = "linhas"
+        self._filtros: Optional[Tuple[str, str, Optional[int]]] = None  # Filtros do relatório exibido
 
         # 1. Componentes de Filtro
         self.create_filter_widgets()
@@ -34,6 +50,15 @@ class RelatoriosFrame(ctk.CTkFrame):
         self.load_clientes()
         self.run_report()
 
+        # Combo de clientes atualizado quando a tabela muda
+        self.subscribe_changes(lambda evento: self.when_visible(self.load_clientes), ("clientes",))
+
+    def destroy(self):
+        # A exportação roda em outra thread: sem o sinal ela seguiria até o fim
+        if self._export_cancel is not None:
+            self._export_cancel.set()
+        super().destroy()
+
     def load_clientes(self):
         """Carrega clientes para o Combobox usando a função do db."""
         try:
@@ -41,7 +66,8 @@ class RelatoriosFrame(ctk.CTkFrame):
             clientes = db.get_all_clientes_for_combo()
             self.clientes_map = {nome: id for id, nome in clientes}
             nomes_clientes = ["TODOS"] + list(self.clientes_map.keys())
-            self.cliente_var.set("TODOS")
+            if self.cliente_var.get() not in nomes_clientes:
+                self.cliente_var.set("TODOS")
             self.cliente_combobox.configure(values=nomes_clientes)
         except Exception as e:
             utils.log_and_alert(self, "Erro de Carga", f"Falha ao carregar clientes: {e}")
@@ -79,51 +105,64 @@ class RelatoriosFrame(ctk.CTkFrame):
         tree_frame.grid_columnconfigure(0, weight=1)
         tree_frame.grid_rowconfigure(0, weight=1)
 
-        # Treeview (usando ttk.Treeview e o estilo dark configurado em main.py)
-        columns = ("id", "cliente", "data", "itens", "total")
-        self.tree = ttk.Treeview(
-            tree_frame,
-            columns=columns,
-            show="headings",
-            style="Treeview"
-        )
-        self.tree.grid(row=0, column=0, sticky="nsew")
-
-        # Configurações das colunas
-        self.tree.heading("id", text="ID", anchor="center")
-        self.tree.column("id", width=40, anchor="center")
-        self.tree.heading("cliente", text="Cliente")
-        self.tree.column("cliente", width=200, anchor="w")
-        self.tree.heading("data", text="Data")
-        self.tree.column("data", width=100, anchor="center")
-        self.tree.heading("itens", text="Itens (Produto x Qtd)")
-        self.tree.column("itens", width=350, anchor="w")
-        self.tree.heading("total", text="Total")
-        self.tree.column("total", width=100, anchor="e")
-
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        scrollbar.grid(row=0, column=1, sticky="ns")
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Grade virtual (Treeview com o estilo dark de app.py): só as linhas visíveis são desenhadas.
+        # Cada pedido pode ser aberto; seus itens só são buscados nesse momento
+        columns = [
+            ("id", "ID", 40, "center"),
+            ("cliente", "Cliente", 200, "w"),
+            ("data", "Data", 100, "center"),
+            ("itens", "Itens (Produto x Qtd)", 350, "w"),
+            ("total", "Total", 100, "e"),
+        ]
+        self.tabela = VirtualGrid(tree_frame, columns, on_open=self.open_pedido, on_close=self.close_pedido)
+        self.tabela.grid(row=0, column=0, sticky="nsew")
 
     def create_export_widgets(self):
         export_frame = ctk.CTkFrame(self)
         export_frame.grid(row=3, column=0, sticky="ew", padx=10, pady=(5, 10))
-        export_frame.grid_columnconfigure((0, 1), weight=1)
+        export_frame.grid_columnconfigure((0, 3), weight=1)
+
+        self.gzip_var = ctk.BooleanVar(value=False)
+        self.gzip_checkbox = ctk.CTkCheckBox(export_frame, text="Compactar CSV (gzip)", variable=self.gzip_var)
+        self.gzip_checkbox.grid(row=0, column=0, padx=5, pady=5, sticky="e")
 
         self.export_csv_button = ctk.CTkButton(export_frame, text="Exportar CSV", command=self.export_csv)
-        self.export_csv_button.grid(row=0, column=0, padx=5, pady=5, sticky="e")
+        self.export_csv_button.grid(row=0, column=1, padx=5, pady=5)
 
         self.export_pdf_button = ctk.CTkButton(export_frame, text="Exportar PDF", command=self.export_pdf)
-        self.export_pdf_button.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+        self.export_pdf_button.grid(row=0, column=2, padx=5, pady=5)
+
+        self.export_lote_button = ctk.CTkButton(export_frame, text="Relatórios por Cliente",
+                                                command=self.export_lote)
+        self.export_lote_button.grid(row=0, column=3, padx=5, pady=5, sticky="w")
+
+        # Progresso da exportação (exibido só durante a exportação)
+        self.export_progress_frame = ctk.CTkFrame(export_frame, fg_color="transparent")
+        self.export_progress_frame.grid(row=1, column=0, columnspan=4, sticky="ew", padx=5, pady=(0, 5))
+        self.export_progress_frame.grid_columnconfigure(1, weight=1)
+
+        self.export_progress_label = ctk.CTkLabel(self.export_progress_frame, text="")
+        self.export_progress_label.grid(row=0, column=0, padx=5, sticky="w")
+
+        self.export_progress_bar = ctk.CTkProgressBar(self.export_progress_frame, mode="determinate")
+        self.export_progress_bar.grid(row=0, column=1, padx=5, sticky="ew")
+
+        self.export_cancel_button = ctk.CTkButton(self.export_progress_frame, text="Cancelar", width=90,
+                                                  fg_color="#D32F2F", hover_color="#B71C1C",
+                                                  command=self.cancel_export)
+        self.export_cancel_button.grid(row=0, column=2, padx=5)
+        self.export_progress_frame.grid_remove()
 
     # --- Lógica de Dados e Exibição ---
 
     def run_report(self):
-        """Executa a query com os filtros e atualiza a Treeview."""
-        # Limpa a Treeview
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        """Executa a query com os filtros em segundo plano e atualiza a lista."""
+        self._linhas = []
+        self._itens = {}
+        self._itens_buscando = set()
+        self._geracao += 1
+        self.tabela.clear()
+        self._filtros = None
 
         data_inicial = self.data_inicial_entry.get().strip()
         data_final = self.data_final_entry.get().strip()
@@ -133,45 +172,128 @@ class RelatoriosFrame(ctk.CTkFrame):
         if not self.validate_dates(data_inicial, data_final):
             return
 
-        try:
-            # db.query_relatorio_pedidos é a nova função no db.py
-            pedidos_data = db.query_relatorio_pedidos(data_inicial, data_final, cliente_id)
-
-            if not pedidos_data:
-                utils.info(self, "Relatório", "Nenhum pedido encontrado com os filtros aplicados.")
-                return
-
-            for id, cliente_nome, data, total in pedidos_data:
-                # Busca os itens para o resumo na Treeview 
-                itens_resumo = self.format_itens_resumo(id)
-                # Formata total para exibir corretamente no Treeview
-                total_formatado = f"R$ {total:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-
-                # Insere o pedido como item pai na Treeview
-                self.tree.insert(
-                    "",
-                    "end",
-                    iid=id,  # Usa o ID do pedido como identificador
-                    values=(id, cliente_nome, data, itens_resumo, total_formatado)
-                )
+        # Um novo filtro substitui o relatório anterior, se ainda estiver pendente
+        self.cancel_job(self._report_job)
+        self._filtros = (data_inicial, data_final, cliente_id)
+        self._report_job = self.run_in_background(
+            db.query_relatorio_pedidos, data_inicial, data_final, cliente_id,
+            on_success=self.fill_report,
+            on_error=lambda e: utils.log_and_alert(self, "Erro no Relatório", f"Falha ao gerar relatório: {e}"),
+            mensagem="Gerando relatório..."
+        )
 
-        except Exception as e:
-            utils.log_and_alert(self, "Erro no Relatório", f"Falha ao gerar relatório: {e}")
+    def fill_report(self, pedidos: List[Tuple]):
+        """Exibe os pedidos (id, cliente, data, total, qtd_itens) de db.query_relatorio_pedidos, fechados."""
+        if not pedidos:
+            utils.info(self, "Relatório", "Nenhum pedido encontrado com os filtros aplicados.")
+            return
 
-    def format_itens_resumo(self, pedido_id: int) -> str:
-        """Busca itens do pedido e retorna uma string resumida."""
-        try:
-            # db.get_itens_pedido é a nova função no db.py
-            itens = db.get_itens_pedido(pedido_id)
-            resumo = [f"{i[0]} x {i[1]}" for i in itens]
-            # Limita a 3 itens para visualização
-            resumo_str = ", ".join(resumo[:3])
-            if len(resumo) > 3:
-                resumo_str += f", (+{len(resumo) - 3} mais)"
-            return resumo_str
-        except Exception as e:
-            utils.log(f"Erro ao buscar itens do pedido {pedido_id}: {e}")
-            return "Erro ao carregar itens"
+        self._linhas = [(NIVEL_PAI, row) for row in pedidos]
+        # A formatação ocorre só para as linhas visíveis, ao rolar
+        self.tabela.set_source(lambda: len(self._linhas),
+                               lambda inicio, fim: [self.format_report_row(e) for e in self._linhas[inicio:fim]])
+
+    @staticmethod
+    def format_report_row(entrada: Tuple) -> Linha:
+        """
+        Formata um pedido (chave: ID do pedido) ou um item aberto dele
+        (chave: (ID do pedido, posição)) para exibição.
+        """
+        if entrada[0] == NIVEL_PAI:
+            id, cliente_nome, data, total, qtd_itens = entrada[1]
+            itens = "1 item" if qtd_itens == 1 else f"{qtd_itens} itens"
+            return id, (id, cliente_nome, data, itens, _moeda(total)), NIVEL_PAI
+
+        _, pedido_id, posicao, item = entrada
+        if item is None:
+            return (pedido_id, posicao), ("", "", "", "(sem itens)", ""), NIVEL_FILHO
+        produto, quantidade, preco_unit = item
+        return ((pedido_id, posicao),
+                ("", "", "", f"{produto} x {quantidade} ({_moeda(preco_unit)})", _moeda(quantidade * preco_unit)),
+                NIVEL_FILHO)
+
+    # --- Itens sob demanda (<<TreeviewOpen>>) ---
+
+    def open_pedido(self, linha: Linha):
+        """
+        Mostra os itens do pedido aberto, buscando-os na primeira vez junto com
+        os dos pedidos seguintes (uma query para ITENS_POR_BUSCA pedidos), que
+        costumam ser os próximos abertos.
+        """
+        pedido_id = linha[0]
+        if pedido_id in self._itens:
+            self.insert_itens(pedido_id)
+            return
+        if pedido_id in self._itens_buscando:
+            return  # Exibidos quando a busca em curso terminar
+
+        ids = self._pedidos_sem_itens(pedido_id)
+        self._itens_buscando.update(ids)
+        geracao = self._geracao
+        self.run_in_background(
+            db.get_itens_por_pedidos, ids,
+            on_success=lambda itens: self.on_itens_loaded(geracao, itens),
+            on_error=lambda e: self.on_itens_error(geracao, ids, e),
+            mensagem="Carregando itens..."
+        )
+
+    def _pedidos_sem_itens(self, pedido_id: int) -> List[int]:
+        """pedido_id e os pedidos seguintes do relatório cujos itens ainda não foram buscados."""
+        ids = [pedido_id]
+        indice = self._indice_pedido(pedido_id)
+        if indice is None:
+            return ids
+        for entrada in self._linhas[indice + 1:]:
+            if len(ids) >= ITENS_POR_BUSCA:
+                break
+            if entrada[0] == NIVEL_PAI and entrada[1][0] not in self._itens \
+                    and entrada[1][0] not in self._itens_buscando:
+                ids.append(entrada[1][0])
+        return ids
+
+    def on_itens_loaded(self, geracao: int, itens: Dict[int, List[Tuple]]):
+        if geracao != self._geracao:
+            return  # Chegou depois de um novo relatório
+        self._itens.update(itens)
+        self._itens_buscando.difference_update(itens)
+        for pedido_id in itens:
+            if self.tabela.is_open(pedido_id):
+                self.insert_itens(pedido_id)
+
+    def on_itens_error(self, geracao: int, ids: List[int], erro: BaseException):
+        if geracao == self._geracao:
+            self._itens_buscando.difference_update(ids)  # Podem ser buscados de novo na próxima abertura
+        utils.log_and_alert(self, "Erro no Relatório", f"Falha ao carregar itens: {erro}")
+
+    def insert_itens(self, pedido_id: int):
+        indice = self._indice_pedido(pedido_id)
+        if indice is None or self._fim_itens(indice) > indice + 1:
+            return  # Pedido fora do relatório ou itens já exibidos
+        itens = self._itens[pedido_id] or [None]
+        self._linhas[indice + 1:indice + 1] = [(NIVEL_FILHO, pedido_id, posicao, item)
+                                               for posicao, item in enumerate(itens)]
+        self.tabela.refresh()
+
+    def close_pedido(self, linha: Linha):
+        """Retira os itens do pedido fechado (continuam em _itens para a próxima abertura)."""
+        indice = self._indice_pedido(linha[0])
+        if indice is None:
+            return
+        del self._linhas[indice + 1:self._fim_itens(indice)]
+        self.tabela.refresh()
+
+    def _indice_pedido(self, pedido_id: int) -> Optional[int]:
+        for indice, entrada in enumerate(self._linhas):
+            if entrada[0] == NIVEL_PAI and entrada[1][0] == pedido_id:
+                return indice
+        return None
+
+    def _fim_itens(self, indice: int) -> int:
+        """Índice seguinte ao último item exibido do pedido em indice."""
+        fim = indice + 1
+        while fim < len(self._linhas) and self._linhas[fim][0] == NIVEL_FILHO:
+            fim += 1
+        return fim
 
     def validate_dates(self, start_date_str, end_date_str) -> bool:
         """Valida se as strings de data são datas válidas, se preenchidas."""
@@ -192,69 +314,44 @@ class RelatoriosFrame(ctk.CTkFrame):
 
     # --- Funções de Exportação ---
 
-    def get_all_data_for_export(self) -> List[List[Any]]:
-        """Prepara os dados da Treeview e busca itens completos para exportação."""
-        data = []
-        # Cabeçalhos
-        data.append(["ID Pedido", "Cliente", "Data", "Total", "Produto", "Quantidade", "Preço Unitário Item"])
-
-        for pedido_iid in self.tree.get_children():
-            # (id, cliente_nome, data, itens_resumo, total_formatado)
-            pedido_vals = self.tree.item(pedido_iid, "values")
-            pedido_id = int(pedido_vals[0])
-            cliente_nome = pedido_vals[1]
-            data_pedido = pedido_vals[2]
-            # Remove formatação R$ para exportar como valor numérico no CSV/PDF
-            total = pedido_vals[4].replace("R$ ", "").replace(".", "").replace(",", ".")
-
-            # Busca itens completos para a exportação
-            itens = db.get_itens_pedido(pedido_id)
-
-            if itens:
-                for produto, quantidade, preco_unit in itens:
-                    # Linha do relatório (repete dados do pedido para cada item)
-                    data.append([
-                        pedido_id,
-                        cliente_nome,
-                        data_pedido,
-                        total,
-                        produto,
-                        quantidade,
-                        preco_unit
-                    ])
-            else:
-                # Linha para pedidos sem itens (embora não deva acontecer)
-                data.append([pedido_id, cliente_nome, data_pedido, total, "N/A", 0, 0.00])
-
-        return data
+    def get_filtros_exportacao(self) -> Optional[Tuple[str, str, Optional[int]]]:
+        """Retorna os filtros do relatório exibido ou avisa que não há relatório gerado."""
+        if self._filtros is None:
+            utils.erro(self, "Exportação", "Gere o relatório antes de exportar.")
+        return self._filtros
 
     def export_csv(self):
-        """Exporta os dados filtrados para um arquivo CSV e abre-o."""
+        """
+        Exporta o relatório filtrado para CSV (opcionalmente .csv.gz) em segundo
+        plano, direto do banco, com barra de progresso e opção de cancelar.
+        """
+        filtros = self.get_filtros_exportacao()
+        if filtros is None:
+            return
+
+        compactar = self.gzip_var.get()
         file_path = filedialog.asksaveasfilename(
             defaultextension=".csv",
-            filetypes=[("Arquivos CSV", "*.csv")],
+            filetypes=[("Arquivos CSV compactados", "*.csv.gz")] if compactar else [("Arquivos CSV", "*.csv")],
             title="Salvar Relatório CSV"
         )
         if not file_path:
             return
+        if compactar and not file_path.endswith(".gz"):
+            file_path += ".gz"
 
-        try:
-            data = self.get_all_data_for_export()
-            with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                # Usando ';' como delimitador para evitar problemas com vírgulas em números e nomes de produtos
-                writer = csv.writer(f, delimiter=';')
-                writer.writerows(data)
-
-            utils.info(self, "Exportação Concluída", f"Relatório CSV gerado com sucesso:\n{file_path}")
-            # Tenta abrir o arquivo no sistema operacional
-            os.startfile(file_path)
-            utils.registrar_acao(f"Relatório exportado para CSV: {file_path}")
-
-        except Exception as e:
-            utils.log_and_alert(self, "Erro de Exportação", f"Falha ao exportar CSV: {e}")
+        self.start_export("CSV", exportacao.exportar_csv, file_path, filtros, compactar=compactar,
+                          on_success=lambda linhas: self.on_file_exported("CSV", file_path, linhas))
 
     def export_pdf(self):
-        """Exporta os dados filtrados para um arquivo PDF usando ReportLab e abre-o."""
+        """
+        Exporta o relatório filtrado para PDF (ReportLab), desenhado página a
+        página em um processo separado, com barra de progresso e opção de cancelar.
+        """
+        filtros = self.get_filtros_exportacao()
+        if filtros is None:
+            return
+
         file_path = filedialog.asksaveasfilename(
             defaultextension=".pdf",
             filetypes=[("Arquivos PDF", "*.pdf")],
@@ -263,63 +360,119 @@ class RelatoriosFrame(ctk.CTkFrame):
         if not file_path:
             return
 
-        try:
-            doc = SimpleDocTemplate(file_path, pagesize=A4)
-            styles = getSampleStyleSheet()
-            elements = []
-
-            # Título
-            elements.append(Paragraph("Relatório de Pedidos - ThinkIA", styles['h1']))
-            elements.append(Paragraph(f"Gerado em: {date.today():%Y-%m-%d}", styles['Normal']))
-            elements.append(Paragraph("<br/>", styles['Normal']))
-
-            # Preparar dados para a tabela do PDF
-            raw_data = self.get_all_data_for_export()
-
-            # Formatação para o PDF: remove colunas desnecessárias e formata valores
-            pdf_data = []
-            for row in raw_data:
-                if row[0] == "ID Pedido":  # Cabeçalho
-                    pdf_data.append(["ID", "Cliente", "Data", "Total Pedido", "Produto", "Qtd", "Preço Unit."])
-                else:
-                    # row: [ID Pedido, Cliente, Data, Total, Produto, Quantidade, Preço Unitário Item]
-                    # Formata o total do pedido e o preço unitário para moeda
-                    total_formatado = f"R$ {float(row[3]):,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
-                    preco_unit_formatado = f"R$ {float(row[6]):,.2f}".replace(",", "X").replace(".", ",").replace("X",
-                                                                                                                  ".")
-
-                    pdf_data.append([
-                        row[0],
-                        row[1],
-                        row[2],
-                        total_formatado,
-                        row[4],
-                        row[5],
-                        preco_unit_formatado
-                    ])
-
-            # Tabela
-            table = Table(pdf_data)
-
-            # Estilo da tabela
-            style = TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0078d4')),  # Azul CTk
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
-                ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
-            ])
-            table.setStyle(style)
-            elements.append(table)
-
-            doc.build(elements)
-
-            utils.info(self, "Exportação Concluída", f"Relatório PDF gerado com sucesso:\n{file_path}")
-            os.startfile(file_path)  # Abre o arquivo
-            utils.registrar_acao(f"Relatório exportado para PDF: {file_path}")
+        self.start_export("PDF", exportacao.exportar_pdf, file_path, filtros,
+                          on_success=lambda linhas: self.on_file_exported("PDF", file_path, linhas))
 
-        except Exception as e:
+    def export_lote(self):
+        """
+        Gera um relatório por cliente (PDF ou CSV) no período dos filtros de data,
+        em um pool de processos. Os clientes com pedidos no período são buscados
+        em segundo plano e escolhidos no LoteDialog.
+        """
+        data_inicial = self.data_inicial_entry.get().strip()
+        data_final = self.data_final_entry.get().strip()
+        if not self.validate_dates(data_inicial, data_final):
+            return
+
+        self.run_in_background(
+            db.get_clientes_com_pedidos, data_inicial, data_final,
+            on_success=lambda clientes: self.open_lote_dialog(data_inicial, data_final, clientes),
+            mensagem="Buscando clientes..."
+        )
+
+    def open_lote_dialog(self, data_inicial: str, data_final: str, clientes: List[Tuple[int, str]]):
+        if not clientes:
+            utils.info(self, "Relatórios por Cliente", "Nenhum cliente com pedidos no período informado.")
+            return
+        periodo = f"{data_inicial or 'início'} a {data_final or 'hoje'}"
+        LoteDialog(self, periodo, clientes, on_confirm=lambda selecionados, formato, pasta: self.start_export(
+            "Lote", exportacao.exportar_lote, pasta, data_inicial, data_final, selecionados,
+            formato=formato, unidade="relatórios", on_success=self.on_lote_done))
+
+    def on_lote_done(self, resumo: exportacao.ResumoLote):
+        self.hide_export_progress()
+        utils.registrar_acao(f"Relatórios por cliente gerados: {resumo.texto()}", utils.TIPO_EXPORTACAO)
+        if resumo.falhas:
+            utils.erro(self, "Relatórios por Cliente", resumo.texto())
+        else:
+            utils.info(self, "Relatórios por Cliente", resumo.texto())
+
+    def start_export(self, descricao: str, func, *args, on_success, unidade: str = "linhas", **kwargs):
+        """
+        Roda func(*args) (exportacao.exportar_*) em tarefas_longas, ligada à barra
+        de progresso e ao botão Cancelar; unidade é o que o progresso conta.
+        """
+        cancelar = threading.Event()
+        self._export_cancel = cancelar
+        self._export_formato = descricao
+        self._export_unidade = unidade
+        self.show_export_progress(f"Exportando {descricao}...")
+        tarefas_longas.submit(
+            self, func, *args,
+            # Chamado na thread da exportação: repassa para a thread do Tk
+            on_progress=lambda feitos, total: tarefas_longas.post(self, self.update_export_progress, feitos, total),
+            cancelado=cancelar.is_set,
+            on_success=on_success,
+            on_error=lambda erro: self.on_export_error(descricao, erro),
+            **kwargs
+        )
+
+    def cancel_export(self):
+        """Pede a interrupção da exportação em curso."""
+        if self._export_cancel is not None:
+            self._export_cancel.set()
+            self.export_cancel_button.configure(state="disabled")
+            self.export_progress_label.configure(text="Cancelando...")
+
+    def show_export_progress(self, mensagem: str):
+        # Uma exportação por vez: o botão Cancelar age sobre a exportação em curso
+        self.export_csv_button.configure(state="disabled")
+        self.export_pdf_button.configure(state="disabled")
+        self.export_lote_button.configure(state="disabled")
+        self.export_cancel_button.configure(state="normal")
+        self.export_progress_label.configure(text=mensagem)
+        self.export_progress_bar.set(0)
+        self.export_progress_frame.grid()
+
+    def update_export_progress(self, feitos: int, total: int):
+        if self._export_cancel is None or self._export_cancel.is_set():
+            return
+        self.export_progress_bar.set(feitos / total if total else 1)
+        self.export_progress_label.configure(
+            text=f"Exportando {self._export_formato}... {feitos} de {total} {self._export_unidade}")
+
+    def hide_export_progress(self):
+        self._export_cancel = None
+        self.export_progress_frame.grid_remove()
+        self.export_csv_button.configure(state="normal")
+        self.export_pdf_button.configure(state="normal")
+        self.export_lote_button.configure(state="normal")
+
+    def on_file_exported(self, formato: str, file_path: str, linhas: int):
+        self.hide_export_progress()
+        utils.log(f"{formato} exportado com {linhas} linhas: {file_path}")
+        self.on_export_done((formato, file_path))
+
+    def on_export_error(self, formato: str, erro: BaseException):
+        self.hide_export_progress()
+        if isinstance(erro, exportacao.ExportacaoCancelada):
+            utils.registrar_acao(f"Exportação {formato} cancelada: {erro}", utils.TIPO_EXPORTACAO)
+            utils.info(self, "Exportação", "Exportação cancelada.")
+        elif formato == "PDF":
             utils.log_and_alert(self, "Erro de Exportação",
-                                f"Falha ao exportar PDF. Verifique se o ReportLab está instalado: {e}")
\ No newline at end of file
+                                f"Falha ao exportar PDF. Verifique se o ReportLab está instalado: {erro}")
+        else:
+            utils.log_and_alert(self, "Erro de Exportação", f"Falha ao exportar {formato}: {erro}")
+
+    def on_export_done(self, resultado: Tuple[str, str]):
+        """Avisa o usuário e abre o arquivo exportado."""
+        formato, file_path = resultado
+        utils.info(self, "Exportação Concluída", f"Relatório {formato} gerado com sucesso:\n{file_path}")
+        utils.registrar_acao(f"Relatório exportado para {formato}: {file_path}", utils.TIPO_EXPORTACAO)
+        if file_path.endswith(".gz"):
+            return  # Arquivo compactado: não há o que abrir diretamente
+        try:
+            # Tenta abrir o arquivo no sistema operacional
+            os.startfile(file_path)
+        except Exception as e:
+            utils.log(f"Não foi possível abrir o arquivo exportado: {e}")
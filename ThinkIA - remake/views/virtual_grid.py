@@ -0,0 +1,335 @@
+"""
+views/virtual_grid.py
+Grade virtual sobre ttk.Treeview para listas grandes.
+
+A Treeview mantém apenas um item por linha visível; ao rolar, esses itens são
+reaproveitados com os valores da nova janela (tree.item(..., values=...)) em vez
+de inserir e remover milhares de itens. As linhas vêm de uma fonte de dados
+(row_count() e fetch_rows(inicio, fim)), consultada só para a janela visível
+mais uma margem de BUFFER_LINHAS linhas antes e depois.
+
+Com on_open a grade é hierárquica: linhas com nível NIVEL_PAI exibem o
+indicador de expansão e as de NIVEL_FILHO que as seguem na fonte são
+desenhadas como filhas delas. Os filhos não são carregados pela grade: ao
+abrir um pai (<<TreeviewOpen>>) on_open é chamado e a fonte passa a incluí-los.
+"""
+
+import customtkinter as ctk
+from tkinter import ttk
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+Linha = Tuple[Any, ...]  # (chave, valores exibidos) ou, em grades hierárquicas, (chave, valores, nível)
+Coluna = Tuple[str, str, int, str]  # (id, título, largura, alinhamento)
+
+BUFFER_LINHAS = 20  # Linhas buscadas além da janela visível
+ALTURA_LINHA_PADRAO = 20  # Usada até a primeira linha ser desenhada
+PASSO_ROLAGEM = 3  # Linhas por "clique" da roda do mouse
+LARGURA_INDICADOR = 28  # Coluna do indicador de expansão (grades hierárquicas)
+
+NIVEL_PAI = 0  # Linha expansível
+NIVEL_FILHO = 1  # Linha exibida dentro do pai que a precede
+
+
+class VirtualGrid(ctk.CTkFrame):
+    """
+    Lista com colunas (Treeview + Scrollbar) que desenha apenas as linhas visíveis.
+
+    on_select(linha) é chamado com (chave, valores) quando o usuário seleciona uma
+    linha; on_need_more() quando a janela se aproxima do fim das linhas
+    disponíveis (usado pela paginação em GridPager); on_open(linha) e
+    on_close(linha) quando o usuário abre ou fecha uma linha NIVEL_PAI.
+    """
+
+    def __init__(self, master: Any, columns: Sequence[Coluna],
+                 on_select: Optional[Callable[[Linha], None]] = None,
+                 on_need_more: Optional[Callable[[], None]] = None,
+                 on_open: Optional[Callable[[Linha], None]] = None,
+                 on_close: Optional[Callable[[Linha], None]] = None,
+                 buffer: int = BUFFER_LINHAS, style: str = "Treeview", **kwargs: Any):
+        kwargs.setdefault("fg_color", "transparent")
+        super().__init__(master, **kwargs)
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+
+        self.on_select = on_select
+        self.on_need_more = on_need_more
+        self.on_open = on_open
+        self.on_close = on_close
+        self.buffer = buffer
+        self._hierarquica = on_open is not None
+
+        # Fonte de dados
+        self._row_count: Callable[[], int] = lambda: 0
+        self._fetch_rows: Callable[[int, int], Sequence[Linha]] = lambda inicio, fim: []
+        self._total = 0
+
+        # Janela visível e linhas já buscadas ao redor dela
+        self._offset = 0
+        self._visiveis = 1
+        self._cache_inicio = 0
+        self._cache: List[Linha] = []
+
+        # Itens da Treeview reaproveitados (um por linha visível)
+        self._slots: List[str] = []
+        # Grades hierárquicas: chaves dos pais abertos e o filho vazio de cada item,
+        # necessário para a Treeview desenhar o indicador de um pai fechado
+        self._abertas: Set[Any] = set()
+        self._marcadores: Dict[str, str] = {}
+
+        # Seleção guardada pela chave, pois o item da Treeview muda ao rolar
+        self._selecionada: Optional[Linha] = None
+        self._indice_selecionado: Optional[int] = None
+
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in columns],
+                                 show="tree headings" if self._hierarquica else "headings",
+                                 style=style, selectmode="browse")
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        if self._hierarquica:
+            self.tree.column("#0", width=LARGURA_INDICADOR, minwidth=LARGURA_INDICADOR, stretch=False)
+        for coluna, titulo, largura, anchor in columns:
+            self.tree.heading(coluna, text=titulo)
+            self.tree.column(coluna, width=largura, anchor=anchor)
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<<TreeviewOpen>>", self._on_tree_open)
+        self.tree.bind("<<TreeviewClose>>", self._on_tree_close)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._rolar(-PASSO_ROLAGEM))
+        self.tree.bind("<Button-5>", lambda e: self._rolar(PASSO_ROLAGEM))
+        self.tree.bind("<Up>", lambda e: self._mover_selecao(-1))
+        self.tree.bind("<Down>", lambda e: self._mover_selecao(1))
+        self.tree.bind("<Prior>", lambda e: self._mover_selecao(-self._visiveis))
+        self.tree.bind("<Next>", lambda e: self._mover_selecao(self._visiveis))
+        self.tree.bind("<Home>", lambda e: self._mover_selecao(-self._total))
+        self.tree.bind("<End>", lambda e: self._mover_selecao(self._total))
+
+    # --- Fonte de dados ---
+
+    def set_source(self, row_count: Callable[[], int],
+                   fetch_rows: Callable[[int, int], Sequence[Linha]]) -> None:
+        """Troca a fonte de dados, volta ao topo e limpa a seleção."""
+        self._row_count = row_count
+        self._fetch_rows = fetch_rows
+        self._offset = 0
+        self._selecionada = None
+        self._indice_selecionado = None
+        self._abertas = set()
+        self.refresh()
+
+    def set_rows(self, rows: Sequence[Tuple], format_row: Optional[Callable[[Tuple], Linha]] = None) -> None:
+        """
+        Usa uma lista em memória como fonte. format_row converte cada linha em
+        (chave, valores) e só é chamado para as linhas desenhadas; por padrão a
+        chave é a primeira coluna.
+        """
+        formatar = format_row or (lambda row: (row[0], tuple(row)))
+        self.set_source(lambda: len(rows), lambda inicio, fim: [formatar(r) for r in rows[inicio:fim]])
+
+    def clear(self) -> None:
+        """Remove todas as linhas (custo proporcional às linhas visíveis, não ao total)."""
+        self.set_rows([])
+
+    def refresh(self) -> None:
+        """Relê a quantidade de linhas e redesenha a janela atual (ex.: após a fonte mudar)."""
+        self._cache = []
+        self._render()
+
+    # --- Seleção ---
+
+    def selected(self) -> Optional[Linha]:
+        """(chave, valores) da linha selecionada, mesmo que ela esteja fora da janela visível."""
+        return self._selecionada
+
+    def clear_selection(self) -> None:
+        """Remove a seleção sem chamar on_select."""
+        self._selecionada = None
+        self._indice_selecionado = None
+        self.tree.selection_set(())
+
+    def _linha_do_slot(self, slot: str) -> Optional[Tuple[int, Linha]]:
+        """(índice na fonte, linha) exibida no item slot da Treeview, se houver."""
+        if slot not in self._slots:
+            return None  # Ex.: filho vazio de um pai fechado
+        indice = self._offset + self._slots.index(slot)
+        if indice >= self._total:
+            return None
+        return indice, self._janela(indice, indice + 1)[0]
+
+    def _on_tree_select(self, event: Any) -> None:
+        selecao = self.tree.selection()
+        if not selecao:
+            # Seleção removida pelo redesenho (linha saiu da janela); a chave continua guardada
+            return
+        exibida = self._linha_do_slot(selecao[0])
+        if exibida is None:
+            return
+        indice, linha = exibida
+        if self._selecionada is not None and linha[0] == self._selecionada[0] and indice == self._indice_selecionado:
+            # Evento gerado pelo próprio redesenho ao restaurar a seleção
+            return
+        self._selecionar(indice, linha)
+
+    def _selecionar(self, indice: int, linha: Linha) -> None:
+        self._selecionada = linha
+        self._indice_selecionado = indice
+        if self.on_select:
+            self.on_select(linha)
+
+    def _mover_selecao(self, delta: int) -> str:
+        """Move a seleção pelo teclado, rolando a janela para mantê-la visível."""
+        if self._total == 0:
+            return "break"
+        atual = self._indice_selecionado if self._indice_selecionado is not None else self._offset - 1
+        indice = min(max(0, atual + delta), self._total - 1)
+        if indice < self._offset:
+            self._offset = indice
+        elif indice >= self._offset + self._visiveis:
+            self._offset = indice - self._visiveis + 1
+        self._selecionar(indice, self._janela(indice, indice + 1)[0])
+        self._render()
+        return "break"
+
+    # --- Expansão (grades hierárquicas) ---
+
+    def is_open(self, chave: Any) -> bool:
+        """True se a linha NIVEL_PAI de chave está aberta."""
+        return chave in self._abertas
+
+    def _on_tree_open(self, event: Any) -> None:
+        self._alternar(True)
+
+    def _on_tree_close(self, event: Any) -> None:
+        self._alternar(False)
+
+    def _alternar(self, abrir: bool) -> None:
+        # A Treeview foca o item antes de gerar <<TreeviewOpen>>/<<TreeviewClose>>
+        exibida = self._linha_do_slot(self.tree.focus())
+        if exibida is None or _nivel(exibida[1]) != NIVEL_PAI:
+            return
+        linha = exibida[1]
+        if abrir:
+            self._abertas.add(linha[0])
+        else:
+            self._abertas.discard(linha[0])
+        self._render()
+        callback = self.on_open if abrir else self.on_close
+        if callback:
+            callback(linha)
+
+    def _ajustar_marcador(self, slot: str, expansivel: bool, aberta: bool) -> None:
+        """Mostra o indicador de expansão (pai fechado) ou o remove (pai aberto, linhas comuns)."""
+        marcador = self._marcadores.get(slot)
+        if expansivel and not aberta:
+            if marcador is None:
+                self._marcadores[slot] = self.tree.insert(slot, "end")
+            else:
+                self.tree.move(marcador, slot, "end")
+        elif marcador is not None:
+            self.tree.detach(marcador)
+        self.tree.item(slot, open=expansivel and aberta)
+
+    # --- Rolagem ---
+
+    def _rolar(self, linhas: int) -> str:
+        self._offset += linhas
+        self._render()
+        return "break"
+
+    def _on_mousewheel(self, event: Any) -> str:
+        return self._rolar(-PASSO_ROLAGEM if event.delta > 0 else PASSO_ROLAGEM)
+
+    def _on_scrollbar(self, acao: str, valor: str, unidade: Optional[str] = None) -> None:
+        if acao == "moveto":
+            self._offset = int(float(valor) * self._total)
+        elif acao == "scroll":
+            self._offset += int(valor) * (self._visiveis if unidade == "pages" else 1)
+        self._render()
+
+    def _on_resize(self, event: Any) -> None:
+        visiveis = self._calcular_visiveis(event.height)
+        if visiveis != self._visiveis:
+            self._visiveis = visiveis
+            self._render()
+
+    def _calcular_visiveis(self, altura: int) -> int:
+        altura_linha = int(ttk.Style(self).lookup(self.tree.cget("style"), "rowheight") or ALTURA_LINHA_PADRAO)
+        cabecalho = altura_linha
+        if self._slots:
+            # Com uma linha desenhada, a caixa dela dá a altura real do cabeçalho e das linhas
+            bbox = self.tree.bbox(self._slots[0])
+            if bbox:
+                cabecalho, altura_linha = bbox[1], bbox[3]
+        return max(1, (altura - cabecalho) // altura_linha)
+
+    # --- Desenho ---
+
+    def _janela(self, inicio: int, fim: int) -> List[Linha]:
+        """Linhas [inicio, fim) da fonte, buscando de novo (com margem) só se saírem do cache."""
+        if inicio < self._cache_inicio or fim > self._cache_inicio + len(self._cache):
+            self._cache_inicio = max(0, inicio - self.buffer)
+            self._cache = list(self._fetch_rows(self._cache_inicio, min(self._total, fim + self.buffer)))
+        return self._cache[inicio - self._cache_inicio:fim - self._cache_inicio]
+
+    def _render(self) -> None:
+        self._total = self._row_count()
+        self._offset = min(max(0, self._offset), max(0, self._total - self._visiveis))
+
+        # Ajusta a quantidade de itens da Treeview à altura disponível
+        while len(self._slots) < self._visiveis:
+            self._slots.append(self.tree.insert("", "end"))
+        while len(self._slots) > self._visiveis:
+            slot = self._slots.pop()
+            # Filhos do item descartado são itens reaproveitados: não podem ir junto
+            for filho in self.tree.get_children(slot):
+                if filho in self._slots:
+                    self.tree.move(filho, "", "end")
+            self._marcadores.pop(slot, None)
+            self.tree.delete(slot)
+
+        linhas = self._janela(self._offset, min(self._total, self._offset + self._visiveis))
+        slot_selecionado = None
+        raiz = 0
+        pai_aberto = None  # Item do último pai aberto desenhado (recebe os filhos seguintes)
+        for posicao, slot in enumerate(self._slots):
+            if posicao < len(linhas):
+                chave, valores = linhas[posicao][:2]
+                nivel = _nivel(linhas[posicao])
+                self.tree.item(slot, values=valores)
+                if nivel == NIVEL_FILHO and pai_aberto is not None:
+                    self.tree.move(slot, pai_aberto, "end")
+                else:
+                    # Filho cujo pai ficou acima da janela é desenhado na raiz
+                    self.tree.move(slot, "", raiz)
+                    raiz += 1
+                    pai_aberto = slot if nivel == NIVEL_PAI and chave in self._abertas else None
+                if self._hierarquica:
+                    self._ajustar_marcador(slot, nivel == NIVEL_PAI, chave in self._abertas)
+                if self._selecionada is not None and chave == self._selecionada[0]:
+                    slot_selecionado = slot
+                    self._selecionada = linhas[posicao]
+                    self._indice_selecionado = self._offset + posicao
+            else:
+                self.tree.detach(slot)
+
+        if slot_selecionado is not None:
+            self.tree.selection_set(slot_selecionado)
+            self.tree.focus(slot_selecionado)
+        else:
+            self.tree.selection_set(())
+        self.tree.yview_moveto(0)
+
+        if self._total:
+            self.scrollbar.set(self._offset / self._total, min(1.0, (self._offset + self._visiveis) / self._total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+        if self.on_need_more and self._offset + self._visiveis + self.buffer >= self._total:
+            self.after_idle(self.on_need_more)
+
+
+def _nivel(linha: Linha) -> Optional[int]:
+    return linha[2] if len(linha) > 2 else None
@@ -0,0 +1,187 @@
+"""
+worker.py
+Execução de consultas ao banco (e outras tarefas demoradas) fora da thread do Tk.
+
+As funções rodam em um pool de threads; o resultado volta para a interface por
+um laço de after() na janela principal, de modo que os callbacks on_success e
+on_error sempre executam na thread do mainloop.
+
+worker atende as consultas curtas (páginas das listas, dashboard, relatórios);
+tarefas_longas, com uma thread só, as que podem levar minutos (exportações,
+pesquisa no log), para que elas não ocupem as threads das consultas curtas.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+POLL_MS = 50  # Intervalo de verificação de tarefas concluídas
+
+
+class Job:
+    """Tarefa submetida ao DbWorker, vinculada a um widget dono."""
+
+    def __init__(self, owner: Any, on_success: Optional[Callable[[Any], None]],
+                 on_error: Optional[Callable[[BaseException], None]]):
+        self.owner = owner
+        self.on_success = on_success
+        self.on_error = on_error
+        self.future: Optional[Future] = None
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """Cancela a tarefa. Se já estiver rodando, o resultado é descartado."""
+        self.cancelled = True
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+
+class DbWorker:
+    """Pool de threads para tarefas de banco com entrega de resultados via after()."""
+
+    def __init__(self, max_workers: int = 2, poll_ms: int = POLL_MS, thread_name_prefix: str = "db-worker"):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self.poll_ms = poll_ms
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._concluidos: "queue.Queue[Job]" = queue.Queue()
+        # Chamadas repassadas para a thread do Tk por post() (ex.: eventos do change_bus),
+        # como tuplas (owner, func, args)
+        self._chamadas: "queue.Queue[tuple]" = queue.Queue()
+        # Acessado apenas pela thread do Tk (submit, _poll e cancel_owner)
+        self._jobs: Dict[Any, Set[Job]] = {}
+        self._poll_root: Any = None
+        self._poll_id: Optional[str] = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix=self.thread_name_prefix)
+        return self._executor
+
+    def submit(self, owner: Any, func: Callable[..., Any], *args: Any,
+               on_success: Optional[Callable[[Any], None]] = None,
+               on_error: Optional[Callable[[BaseException], None]] = None, **kwargs: Any) -> Job:
+        """
+        Executa func(*args, **kwargs) em segundo plano. Deve ser chamado na thread do Tk.
+        owner é o widget que receberá o resultado; se ele for destruído ou tiver suas
+        tarefas canceladas (cancel_owner), os callbacks não são chamados.
+        """
+        job = Job(owner, on_success, on_error)
+        job.future = self._get_executor().submit(func, *args, **kwargs)
+        job.future.add_done_callback(lambda _f: self._concluidos.put(job))
+        self._jobs.setdefault(owner, set()).add(job)
+        self._agendar_poll(owner)
+        return job
+
+    def _agendar_poll(self, owner: Any) -> None:
+        if self._poll_id is None:
+            # Agenda na janela principal, que sobrevive à troca de telas
+            self._poll_root = owner.winfo_toplevel()
+            self._poll_id = self._poll_root.after(self.poll_ms, self._poll)
+
+    def _poll(self) -> None:
+        self._poll_id = None
+        while True:
+            try:
+                job = self._concluidos.get_nowait()
+            except queue.Empty:
+                break
+            self._entregar(job)
+        self._executar_chamadas()
+
+        if self.pending() or not self._chamadas.empty():
+            self._poll_id = self._poll_root.after(self.poll_ms, self._poll)
+
+    def post(self, owner: Any, func: Callable[..., Any], *args: Any) -> None:
+        """
+        Agenda func(*args) na thread do Tk; pode ser chamado de qualquer thread.
+        A entrega é feita pelo laço de poll (até poll_ms depois). Chamado na
+        thread do Tk, o laço é agendado aqui; de outra thread, ele já está ativo,
+        pois quem roda fora do Tk é uma tarefa pendente deste pool.
+        Descartada se owner já tiver sido destruído.
+        """
+        self._chamadas.put((owner, func, args))
+        if threading.current_thread() is threading.main_thread():
+            self._agendar_poll(owner)
+
+    def _executar_chamadas(self) -> None:
+        while True:
+            try:
+                owner, func, args = self._chamadas.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if not owner.winfo_exists():
+                    continue
+            except Exception:
+                continue
+            try:
+                func(*args)
+            except Exception:
+                logger.exception("Erro em chamada repassada à thread do Tk")
+
+    def _entregar(self, job: Job) -> None:
+        """Chama o callback da tarefa concluída na thread do Tk."""
+        jobs = self._jobs.get(job.owner)
+        if jobs is not None:
+            jobs.discard(job)
+            if not jobs:
+                del self._jobs[job.owner]
+
+        if job.cancelled or job.future.cancelled():
+            return
+        try:
+            if not job.owner.winfo_exists():
+                return
+        except Exception:
+            return
+
+        erro = job.future.exception()
+        if erro is not None:
+            if job.on_error:
+                job.on_error(erro)
+            else:
+                logger.error("Erro em tarefa de segundo plano: %s", erro)
+        elif job.on_success:
+            job.on_success(job.future.result())
+
+    def cancel_owner(self, owner: Any) -> None:
+        """Cancela todas as tarefas pendentes de um widget (ex.: ao sair da tela)."""
+        for job in self._jobs.pop(owner, ()):
+            job.cancel()
+
+    def is_pending(self, job: Job) -> bool:
+        """True se a tarefa ainda não foi entregue nem cancelada."""
+        return not job.cancelled and job in self._jobs.get(job.owner, ())
+
+    def pending(self, owner: Any = None) -> int:
+        """Quantidade de tarefas ainda não entregues (de um dono ou no total)."""
+        if owner is not None:
+            return len(self._jobs.get(owner, ()))
+        return sum(len(jobs) for jobs in self._jobs.values())
+
+    def shutdown(self) -> None:
+        """Cancela tudo e encerra o pool sem esperar tarefas em execução."""
+        for owner in list(self._jobs):
+            self.cancel_owner(owner)
+        if self._poll_id is not None and self._poll_root is not None:
+            try:
+                self._poll_root.after_cancel(self._poll_id)
+            except Exception:
+                pass
+            self._poll_id = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+worker = DbWorker()
+tarefas_longas = DbWorker(max_workers=1, thread_name_prefix="tarefa-longa")